@@ -0,0 +1,505 @@
+"""HTTP API for document extraction and quote comparison.
+
+Usage:
+    python api.py --port 8000
+    API_MAX_WORKERS=8 uvicorn api:app --port 8000
+
+Endpoints:
+    GET  /health                 Status and configured models
+    GET  /data-files             Documents available in the data directory
+    POST /extract                Extract text from a data file or URL
+    POST /extract/upload         Extract text from an uploaded document (raw body)
+    POST /compare                Compare two quotes; "stream": true streams events
+    POST /compare/batch          Run several comparisons concurrently
+    POST /compare/records        Rank any number of quotes from structured records
+
+Blocking work (extraction and model requests) runs on a fixed pool of
+API_MAX_WORKERS threads (default 4). Requests beyond API_MAX_QUEUE waiting jobs
+(default 64) are rejected with 503 and a Retry-After header.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from utils.constants import (
+    DEFAULT_MULTI_SYSTEM_MESSAGE,
+    DEFAULT_RECORD_NARRATIVE_PROMPT,
+    DEFAULT_RECORD_PROMPT,
+    DEFAULT_RECORD_SYSTEM_MESSAGE,
+)
+from utils.document_extraction import (
+    DocumentTooLargeError,
+    extract_document,
+    get_document_limits,
+    is_url,
+)
+from utils.file_helpers import (
+    load_data_files,
+    load_system_messages,
+    load_user_prompts,
+    save_completion,
+)
+from utils.openai_helpers import (
+    get_available_models,
+    get_completion_result,
+    get_model_id,
+    get_prompt_layout,
+    setup_client,
+    stream_completion,
+)
+from utils.quote_records import compare_quote_records
+
+load_dotenv()
+
+# Maximum number of comparisons in one batch request
+MAX_BATCH_SIZE = 50
+
+
+class WorkerPool:
+    """Run blocking jobs on a fixed number of threads with a bounded wait queue."""
+
+    def __init__(self, workers, max_queue):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="api-worker")
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(workers)
+        self._waiting = 0
+
+    async def acquire(self):
+        """Wait for a free worker, or raise 503 if too many jobs are waiting."""
+        if self._waiting >= self.max_queue:
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, retry later.",
+                headers={"Retry-After": "1"},
+            )
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+    def release(self):
+        """Free a worker taken with acquire."""
+        self._slots.release()
+
+    async def call(self, func, *args, **kwargs):
+        """Run func on a worker thread that has already been acquired."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """Acquire a worker, run func on it and release it."""
+        await self.acquire()
+        try:
+            return await self.call(func, *args, **kwargs)
+        finally:
+            self.release()
+
+
+pool = WorkerPool(
+    workers=int(os.getenv("API_MAX_WORKERS", "4")),
+    max_queue=int(os.getenv("API_MAX_QUEUE", "64")),
+)
+app = FastAPI(title="Quote Comparison API")
+
+
+class ExtractRequest(BaseModel):
+    """Document to extract: the name of a data file or an http(s) URL."""
+
+    data_file: Optional[str] = None
+    url: Optional[str] = None
+    use_document_intelligence: bool = True
+
+
+class CompareRequest(BaseModel):
+    """Two quotes to compare, with the prompts and model settings to use."""
+
+    data_file1: str
+    data_file2: str
+    system_message: str = "Default"
+    user_prompt: str = "Default"
+    model: Optional[str] = None
+    deployment_name: Optional[str] = None
+    temperature: float = Field(0.7, ge=0.0, le=2.0)
+    max_tokens: int = Field(1000, ge=1)
+    use_document_intelligence: bool = True
+    layout: Optional[Literal["inline", "documents_first"]] = None
+    save: bool = False
+    stream: bool = False
+
+
+class RecordsRequest(BaseModel):
+    """Quotes to extract into records and rank, with the model settings to use."""
+
+    data_files: List[str] = Field(..., min_length=2)
+    model: Optional[str] = None
+    deployment_name: Optional[str] = None
+    temperature: float = Field(0.7, ge=0.0, le=2.0)
+    max_tokens: int = Field(1000, ge=1)
+    use_document_intelligence: bool = True
+    narrative: bool = True
+
+
+class BatchCompareRequest(BaseModel):
+    """Several comparisons to run concurrently."""
+
+    comparisons: List[CompareRequest]
+
+
+def _data_file_path(name):
+    data_files = load_data_files()
+    if name not in data_files:
+        raise HTTPException(status_code=404, detail=f"Unknown data file: {name}")
+    return data_files[name]
+
+
+def _extract(file_path, use_document_intelligence):
+    try:
+        text, backend = extract_document(file_path, use_document_intelligence)
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e)) from e
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return {
+        "text": text,
+        "chars": len(text),
+        "backend": backend,
+    }
+
+
+def _resolve_model(request):
+    """Return the model name, model id and client for a request's model settings."""
+    available_models = get_available_models()
+    model = request.model or (available_models[0]["name"] if available_models else None)
+    if model is None and not request.deployment_name:
+        raise HTTPException(status_code=400, detail="No model configured.")
+    if request.model and request.model not in [m["name"] for m in available_models]:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {request.model}")
+    model_id = get_model_id(available_models, model)
+    client = setup_client(model_id)
+    if client is None:
+        raise HTTPException(
+            status_code=503, detail=f"Model {model} is not configured correctly."
+        )
+    return model, model_id, client
+
+
+def _prepare_comparison(request):
+    """Resolve the prompts, documents and model of a comparison request."""
+    system_messages = load_system_messages()
+    user_prompts = load_user_prompts()
+    if request.system_message not in system_messages:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown system message: {request.system_message}",
+        )
+    if request.user_prompt not in user_prompts:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown user prompt: {request.user_prompt}"
+        )
+
+    model, model_id, client = _resolve_model(request)
+
+    documents = {
+        field: _extract(_data_file_path(name), request.use_document_intelligence)[
+            "text"
+        ]
+        for field, name in (
+            ("quote1", request.data_file1),
+            ("quote2", request.data_file2),
+        )
+    }
+    return {
+        "client": client,
+        "model": model,
+        "params": {
+            "deployment_name": request.deployment_name or model,
+            "system_message": system_messages[request.system_message],
+            "user_prompt": user_prompts[request.user_prompt],
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+            "model_name": model_id,
+            "documents": documents,
+            "layout": request.layout or get_prompt_layout(),
+        },
+    }
+
+
+def _save(request, prepared, completion, latency_seconds, usage=None):
+    params = prepared["params"]
+    return save_completion(
+        {
+            "system_message": params["system_message"],
+            "user_prompt": params["user_prompt"].format(**params["documents"]),
+            "completion": completion,
+            "data_file1": request.data_file1,
+            "data_file2": request.data_file2,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+            "model": prepared["model"],
+            "latency_seconds": latency_seconds,
+            "usage": usage or {},
+            "layout": params["layout"],
+        }
+    )
+
+
+def _compare(request):
+    """Run one comparison and return its result."""
+    prepared = _prepare_comparison(request)
+    try:
+        result = get_completion_result(prepared["client"], **prepared["params"])
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        raise HTTPException(status_code=502, detail=str(e)) from e
+    if result["completion"].startswith("Error:"):
+        raise HTTPException(status_code=502, detail=result["completion"])
+
+    response = {"model": prepared["model"], **result}
+    if request.save:
+        response["saved_as"] = _save(
+            request,
+            prepared,
+            result["completion"],
+            result["latency_seconds"],
+            result["usage"],
+        )
+    return response
+
+
+def _compare_records(request):
+    """Extract, rank and optionally summarize the quotes of a records request."""
+    quote_files = {name: _data_file_path(name) for name in request.data_files}
+    model, model_id, client = _resolve_model(request)
+    try:
+        result = compare_quote_records(
+            client,
+            quote_files,
+            system_message=DEFAULT_MULTI_SYSTEM_MESSAGE,
+            record_system_message=DEFAULT_RECORD_SYSTEM_MESSAGE,
+            record_prompt=DEFAULT_RECORD_PROMPT,
+            narrative_prompt=DEFAULT_RECORD_NARRATIVE_PROMPT,
+            deployment_name=request.deployment_name or model,
+            model_name=model_id,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            use_document_intelligence=request.use_document_intelligence,
+            narrative=request.narrative,
+        )
+    except DocumentTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e)) from e
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        raise HTTPException(status_code=502, detail=str(e)) from e
+    return {
+        "model": model,
+        "records": {name: item["record"] for name, item in result["records"].items()},
+        **{
+            key: result[key]
+            for key in ("ranking", "table", "usage", "requests", "cost")
+        },
+        "narrative": result["completion"] if request.narrative else None,
+        "latency_seconds": result["latency_seconds"],
+    }
+
+
+def _event(data):
+    return f"data: {json.dumps(data)}\n\n"
+
+
+class WorkerLease:
+    """A worker acquired from the pool, released at most once."""
+
+    def __init__(self):
+        self._held = True
+
+    def release(self):
+        """Free the worker; later calls do nothing."""
+        if self._held:
+            self._held = False
+            pool.release()
+
+
+class LeasedStreamingResponse(StreamingResponse):
+    """Streaming response that releases its worker lease once it is sent.
+
+    The lease is also released if sending fails or the client disconnects before
+    the body starts, when the body generator never runs its cleanup.
+    """
+
+    def __init__(self, content, lease, **kwargs):
+        super().__init__(content, **kwargs)
+        self.lease = lease
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.lease.release()
+
+
+async def _stream_comparison(request, lease):
+    """Yield server-sent events with the completion text as it is generated.
+
+    The caller has already acquired the worker held by lease, which is released
+    when the stream ends.
+    """
+    start = time.perf_counter()
+    try:
+        try:
+            prepared = await pool.call(_prepare_comparison, request)
+            chunks = stream_completion(prepared["client"], **prepared["params"])
+            completion = []
+            while True:
+                chunk = await pool.call(next, chunks, None)
+                if chunk is None:
+                    break
+                completion.append(chunk)
+                yield _event({"delta": chunk})
+        except HTTPException as e:
+            yield _event({"error": e.detail, "status": e.status_code})
+            return
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            yield _event({"error": str(e), "status": 502})
+            return
+
+        latency_seconds = round(time.perf_counter() - start, 3)
+        done = {
+            "done": True,
+            "model": prepared["model"],
+            "latency_seconds": latency_seconds,
+        }
+        if request.save:
+            done["saved_as"] = await pool.call(
+                _save, request, prepared, "".join(completion), latency_seconds
+            )
+        yield _event(done)
+    finally:
+        lease.release()
+
+
+@app.get("/health")
+async def health():
+    """Report that the service is up and which models are configured."""
+    return {
+        "status": "ok",
+        "models": [model["name"] for model in get_available_models()],
+        "workers": pool.workers,
+    }
+
+
+@app.get("/data-files")
+async def data_files():
+    """List the documents in the data directory."""
+    return {"data_files": list(load_data_files())}
+
+
+@app.post("/extract")
+async def extract(request: ExtractRequest):
+    """Extract text from a data file or URL."""
+    if bool(request.data_file) == bool(request.url):
+        raise HTTPException(
+            status_code=400, detail="Provide exactly one of data_file and url."
+        )
+    if request.url and not is_url(request.url):
+        raise HTTPException(status_code=400, detail="url must be http(s).")
+    file_path = request.url or _data_file_path(request.data_file)
+    return await pool.run(_extract, file_path, request.use_document_intelligence)
+
+
+@app.post("/extract/upload")
+async def extract_upload(
+    request: Request, filename: str, use_document_intelligence: bool = True
+):
+    """Extract text from a document sent as the raw request body.
+
+    filename is only used for its extension, which selects the extractor.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    max_bytes, _ = get_document_limits()
+    fd, path = tempfile.mkstemp(suffix=extension)
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Document is above the "
+                        f"{max_bytes / (1024 * 1024):.0f} MB limit.",
+                    )
+                f.write(chunk)
+        return await pool.run(_extract, path, use_document_intelligence)
+    finally:
+        os.remove(path)
+
+
+@app.post("/compare")
+async def compare(request: CompareRequest):
+    """Compare two quotes, streaming the completion if requested."""
+    if request.stream:
+        # Acquire before responding, so a busy server still answers 503
+        await pool.acquire()
+        lease = WorkerLease()
+        return LeasedStreamingResponse(
+            _stream_comparison(request, lease),
+            lease=lease,
+            media_type="text/event-stream",
+        )
+    return await pool.run(_compare, request)
+
+
+@app.post("/compare/batch")
+async def compare_batch(request: BatchCompareRequest):
+    """Run several comparisons concurrently; each result has a status code."""
+    if len(request.comparisons) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_SIZE} comparisons per batch.",
+        )
+
+    async def run_one(comparison):
+        try:
+            return {"status": 200, **await pool.run(_compare, comparison)}
+        except HTTPException as e:
+            return {"status": e.status_code, "error": e.detail}
+
+    results = await asyncio.gather(
+        *(run_one(comparison) for comparison in request.comparisons)
+    )
+    return {"results": results}
+
+
+@app.post("/compare/records")
+async def compare_records(request: RecordsRequest):
+    """Rank quotes from cached structured records, with an optional summary."""
+    return await pool.run(_compare_records, request)
+
+
+def main():
+    """Serve the API with uvicorn."""
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,9 +19,11 @@ from utils.file_helpers import (
     load_data_files,
     load_completions,
 )
+from utils.text_store import estimate_size, get_text_store_stats
 
 # Import tab modules
 from tabs.run_completion import render as render_run_completion
+from tabs.compare_quotes import render as render_compare_quotes
 from tabs.manage_system_messages import render as render_manage_system_messages
 from tabs.manage_user_prompts import render as render_manage_user_prompts
 from tabs.completion_history import render as render_completion_history
@@ -88,9 +90,10 @@ def main():
     completions = load_completions()
 
     # Create tabs
-    tab1, tab2, tab3, tab4 = st.tabs(
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
         [
             "Run Completion",
+            "Compare Quotes",
             "Manage System Messages",
             "Manage User Prompts",
             "Completion History",
@@ -112,14 +115,33 @@ def main():
         )
 
     with tab2:
-        render_manage_system_messages(system_messages)
+        render_compare_quotes(
+            data_files,
+            available_models,
+            selected_model,
+            deployment_name,
+            temperature,
+            max_tokens,
+            save_completion_history,
+        )
 
     with tab3:
-        render_manage_user_prompts(user_prompts)
+        render_manage_system_messages(system_messages)
 
     with tab4:
+        render_manage_user_prompts(user_prompts)
+
+    with tab5:
         render_completion_history(completions)
 
+    # Report this session's memory and the text store shared by all sessions
+    stats = get_text_store_stats()
+    st.sidebar.caption(
+        f"Session state: {estimate_size(st.session_state.to_dict()) / 1024:.0f} KB. "
+        f"Shared text store: {stats['bytes'] / (1024 * 1024):.1f} of "
+        f"{stats['max_bytes'] / (1024 * 1024):.0f} MB ({stats['texts']} texts)."
+    )
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+"""Benchmark the single-pass DOCX extractor against the original python-docx algorithm.
+
+Generates a large synthetic DOCX (headings, paragraphs and a table with merged cells
+per page), then times both extractors and measures their peak Python memory. The
+two outputs must hold the same paragraphs and tables; only the table positions
+differ, as the original algorithm moved every table to the end of the text.
+
+Usage:
+    python -m benchmarks.docx_extraction
+    python -m benchmarks.docx_extraction --pages 1000 --iterations 5
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.run_benchmarks import percentile
+from benchmarks.synthetic_documents import write_docx
+
+
+def legacy_extract_docx(file_path):
+    """The original extractor: paragraphs first, then every table, via python-docx."""
+    import docx
+
+    doc = docx.Document(file_path)
+    text = ""
+
+    # Extract headers and preserve their level
+    for paragraph in doc.paragraphs:
+        if paragraph.style.name.startswith("Heading"):
+            level = paragraph.style.name.replace("Heading", "")
+            try:
+                level_num = int(level.strip())
+                text += "#" * level_num + " " + paragraph.text + "\n\n"
+            except ValueError:
+                text += paragraph.text + "\n\n"
+        else:
+            text += paragraph.text + "\n\n"
+
+    # Handle tables
+    for table in doc.tables:
+        text += "\n|"
+        for cell in table.rows[0].cells:
+            text += f" {cell.text} |"
+        text += "\n|"
+        for _ in table.rows[0].cells:
+            text += " --- |"
+        text += "\n"
+
+        for row in table.rows[1:]:
+            text += "|"
+            for cell in row.cells:
+                text += f" {cell.text} |"
+            text += "\n"
+        text += "\n"
+
+    return text
+
+
+def single_pass_extract_docx(file_path):
+    """The current extractor, joined into one string."""
+    from utils.document_extraction import iter_docx
+
+    return "".join(iter_docx(file_path))
+
+
+def _blocks(text):
+    """Return the multiset of paragraphs and table lines, ignoring their order."""
+    return Counter(line for line in text.split("\n") if line)
+
+
+def measure(func, path, iterations):
+    """Return timings and peak traced memory of func(path)."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        text = func(path)
+        timings.append(time.perf_counter() - start)
+
+    # Peak memory from one extra traced run, so tracing does not skew the timings
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return text, {
+        "p50_ms": round(percentile(timings, 50) * 1000, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "peak_memory_mb": round(peak / (1024 * 1024), 1),
+        "chars": len(text),
+    }
+
+
+def main():
+    """Generate the document, run both extractors and compare them."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"synthetic_{args.pages}p.docx")
+        start = time.perf_counter()
+        write_docx(path, args.pages)
+        print(
+            f"Generated {args.pages}-page DOCX "
+            f"({os.path.getsize(path) / (1024 * 1024):.1f} MB) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        results = {}
+        texts = {}
+        for name, func in [
+            ("legacy", legacy_extract_docx),
+            ("single_pass", single_pass_extract_docx),
+        ]:
+            texts[name], results[name] = measure(func, path, args.iterations)
+            print(f"{name:<12} {results[name]}")
+
+    speedup = results["legacy"]["p50_ms"] / results["single_pass"]["p50_ms"]
+    same = _blocks(texts["legacy"]) == _blocks(texts["single_pass"])
+    print(f"Speedup: {speedup:.1f}x, same content: {same}")
+    if not same:
+        raise SystemExit("The extractors produced different content.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Compare local extraction with Document Intelligence per file type.
+
+Times both backends on synthetic XLSX, PPTX, DOCX, PDF and HTML documents (plus
+images when local OCR is installed) and on any --files, and scores each backend's
+text by word recall: the share of the expected words it extracted. Synthetic
+documents are scored against the text they were generated from; other files are
+scored against the Document Intelligence text. The synthetic documents are all
+born-digital, so pass real (e.g. scanned) quotes with --files: they decide the
+recommendation for their file type.
+
+A file type is recommended for local extraction when the local text reaches
+--min-quality, or scores at least as well as Document Intelligence. --write-policy
+saves the recommendations to the extraction policy file read by the app.
+
+Without Azure credentials, or with --mock, Document Intelligence is the mock
+server: its timings follow --analyze-ms and its text is synthetic, so it is not
+scored, and --files are only timed.
+
+Usage:
+    python -m benchmarks.extraction_backends --mock
+    python -m benchmarks.extraction_backends --files data/quote.pdf --write-policy
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from benchmarks.mock_server import MockAzureServer
+from benchmarks.run_benchmarks import configure_environment, percentile
+from benchmarks.synthetic_documents import _page_lines, generate_documents
+from utils.constants import EXTRACTION_POLICY_PATH
+
+SYNTHETIC_EXTENSIONS = [".xlsx", ".pptx", ".docx", ".pdf", ".html", ".jpg", ".tiff"]
+
+
+def word_recall(text, reference):
+    """Return the share of the reference's words (with repeats) found in text."""
+    expected = Counter(re.findall(r"\w+", reference.lower()))
+    if not expected:
+        return None
+    found = Counter(re.findall(r"\w+", text.lower()))
+    return sum((expected & found).values()) / sum(expected.values())
+
+
+def synthetic_reference(pages, extension):
+    """Return the text a synthetic document of this type was generated from."""
+    if extension in (".jpg", ".bmp"):
+        pages = 1  # Single-page images
+    elif extension in (".tif", ".tiff"):
+        pages = min(pages, 3)
+    return "\n".join(
+        "\n".join(_page_lines(page, lines_per_page=40)) for page in range(pages)
+    )
+
+
+def time_backend(func, path, iterations):
+    """Return the text of func(path) and its timings, or the error it raised."""
+    timings = []
+    text = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            text = func(path)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return None, {"error": str(e)}
+        timings.append(time.perf_counter() - start)
+    return text, {
+        "p50_ms": round(percentile(timings, 50) * 1000, 1),
+        "chars": len(text),
+    }
+
+
+def compare_document(path, reference, iterations, remote, score_remote=True):
+    """Time and score both backends on one document.
+
+    Without a reference text, the local text is scored against the remote one
+    unless score_remote is False.
+    """
+    from utils.document_extraction import (
+        _file_extension,
+        extract_using_document_intelligence,
+        get_local_extractor,
+        iter_local_text,
+    )
+
+    result = {}
+    remote_text = None
+    if remote:
+        remote_text, result["remote"] = time_backend(
+            extract_using_document_intelligence, path, iterations
+        )
+    if reference is None and score_remote:
+        reference = remote_text
+    elif remote_text is not None and score_remote:
+        result["remote"]["quality"] = round(word_recall(remote_text, reference), 3)
+
+    if get_local_extractor(_file_extension(path)) is not None:
+        local_text, result["local"] = time_backend(
+            lambda p: "".join(iter_local_text(p)), path, iterations
+        )
+        if local_text is not None and reference is not None:
+            result["local"]["quality"] = round(word_recall(local_text, reference), 3)
+    return result
+
+
+def recommend(results, min_quality, real_files=()):
+    """Return {extension: "local" | "remote"} from the per-document results.
+
+    Real files decide the policy of their file type over the synthetic documents,
+    which are all born-digital.
+    """
+    real_extensions = {os.path.splitext(path)[1].lower() for path in real_files}
+    scores = {}
+    for path, result in results.items():
+        extension = os.path.splitext(path)[1].lower()
+        if extension in real_extensions and path not in real_files:
+            continue
+        local = result.get("local", {}).get("quality")
+        remote = result.get("remote", {}).get("quality")
+        if local is None:
+            continue
+        good = local >= min_quality or (remote is not None and local >= remote)
+        # One poor document is enough to keep a file type on Document Intelligence
+        scores[extension] = scores.get(extension, True) and good
+    return {
+        extension: "local" if good else "remote" for extension, good in scores.items()
+    }
+
+
+def main():
+    """Run both backends over the documents and print the recommended policy."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--files", nargs="*", default=[])
+    parser.add_argument("--min-quality", type=float, default=0.95)
+    parser.add_argument(
+        "--mock", action="store_true", help="Use the mock Document Intelligence"
+    )
+    parser.add_argument("--analyze-ms", type=float, default=2000)
+    parser.add_argument(
+        "--write-policy",
+        action="store_true",
+        help=f"Save the recommended policy to {EXTRACTION_POLICY_PATH}",
+    )
+    args = parser.parse_args()
+
+    load_dotenv()
+    from utils.document_extraction import (
+        DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS,
+        is_document_intelligence_available,
+        is_ocr_available,
+    )
+
+    use_mock = args.mock or not is_document_intelligence_available()
+    with contextlib.ExitStack() as stack:
+        if use_mock:
+            mock = stack.enter_context(
+                MockAzureServer("127.0.0.1", analyze_ms=args.analyze_ms)
+            )
+            configure_environment(mock.url)
+            print(f"Document Intelligence: mock server ({args.analyze_ms:.0f} ms)")
+        else:
+            print(
+                "Document Intelligence: "
+                + os.environ["AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT"]
+            )
+        print(f"Local OCR: {'available' if is_ocr_available() else 'not installed'}")
+
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        extensions = [
+            ext
+            for ext in SYNTHETIC_EXTENSIONS
+            if ext not in (".jpg", ".tiff") or is_ocr_available()
+        ]
+        documents = {
+            path: synthetic_reference(args.pages, os.path.splitext(path)[1])
+            for path in generate_documents(directory, args.pages, extensions).values()
+        }
+        documents.update({path: None for path in args.files})
+
+        results = {}
+        for path, reference in documents.items():
+            remote = (
+                os.path.splitext(path)[1].lower()
+                in DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS
+            )
+            results[path] = compare_document(
+                path, reference, args.iterations, remote, score_remote=not use_mock
+            )
+            print(f"{os.path.basename(path):<28} {results[path]}")
+
+    policy = recommend(results, args.min_quality, args.files)
+    print(f"Recommended policy: {json.dumps(policy)}")
+    if args.write_policy:
+        with open(EXTRACTION_POLICY_PATH, "w", encoding="utf-8") as f:
+            json.dump(policy, f, indent=2)
+        print(f"Saved to {EXTRACTION_POLICY_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Check import time and memory of the app's modules against a budget.
+
+Each module is imported in a fresh interpreter so results reflect a cold start.
+Extraction backends must stay out of ``sys.modules`` until a document is extracted.
+
+Usage:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --budget-ms 800
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+# Modules to measure and their import time budget in milliseconds
+IMPORT_BUDGETS_MS = {
+    "utils.document_extraction": 150,
+    "tabs.run_completion": 1000,
+}
+
+# Heavy backends that importing the app must not pull in
+LAZY_MODULES = [
+    "pypdf",
+    "docx",
+    "html2text",
+    "lxml",
+    "azure.ai.documentintelligence",
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+except ImportError:
+    peak_mb = None
+print(json.dumps({{
+    "import_ms": round(elapsed * 1000, 3),
+    "peak_rss_mb": peak_mb,
+    "loaded": [name for name in {lazy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure_import(module, repeats=3):
+    """Import module in fresh interpreters and return the fastest measurement."""
+    best = None
+    for _ in range(repeats):
+        output = subprocess.check_output(
+            [sys.executable, "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+            stderr=subprocess.DEVNULL,
+        )
+        result = json.loads(output.decode().strip().splitlines()[-1])
+        if best is None or result["import_ms"] < best["import_ms"]:
+            best = result
+    return best
+
+
+def measure_imports(budgets=None, repeats=3):
+    """Measure every budgeted module and flag budget or laziness violations."""
+    results = {}
+    for module, budget_ms in (budgets or IMPORT_BUDGETS_MS).items():
+        result = measure_import(module, repeats)
+        result["budget_ms"] = budget_ms
+        result["within_budget"] = (
+            result["import_ms"] <= budget_ms and not result["loaded"]
+        )
+        results[module] = result
+    return results
+
+
+def main():
+    """Print import measurements and exit non-zero if a budget is exceeded."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="Override the budget of every module",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    budgets = dict(IMPORT_BUDGETS_MS)
+    if args.budget_ms is not None:
+        budgets = {module: args.budget_ms for module in budgets}
+
+    results = measure_imports(budgets, args.repeats)
+    failed = False
+    for module, result in results.items():
+        status = "ok" if result["within_budget"] else "OVER BUDGET"
+        loaded = ""
+        if result["loaded"]:
+            loaded = f" eagerly loaded: {', '.join(result['loaded'])}"
+        print(
+            f"{module:<30} {result['import_ms']:>9.1f}ms "
+            f"(budget {result['budget_ms']}ms) "
+            f"rss={result['peak_rss_mb']:.1f}MB {status}{loaded}"
+        )
+        failed = failed or not result["within_budget"]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
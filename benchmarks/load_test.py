@@ -0,0 +1,153 @@
+"""Load test the HTTP API (api.py) against the mock Azure endpoints.
+
+Starts the mock server and the API in this process, fires concurrent comparison
+requests and reports throughput, latency percentiles, time to first event for
+streamed requests, and how many requests were rejected as busy.
+
+Usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --requests 500 --concurrency 50 --workers 8 --stream
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import httpx
+
+from benchmarks.mock_server import MockAzureServer
+from benchmarks.run_benchmarks import configure_environment, percentile
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_api(port):
+    """Run the API with uvicorn on a background thread and wait until it is up."""
+    import uvicorn
+
+    from api import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def _compare(client, payload, stream):
+    start = time.perf_counter()
+    if not stream:
+        response = await client.post("/compare", json=payload)
+        return response.status_code, time.perf_counter() - start, None
+
+    first_event = None
+    async with client.stream("POST", "/compare", json=payload) as response:
+        async for line in response.aiter_lines():
+            if first_event is None and line.startswith("data:"):
+                first_event = time.perf_counter() - start
+    return response.status_code, time.perf_counter() - start, first_event
+
+
+async def run_load(base_url, payload, requests, concurrency, stream):
+    """Send requests comparisons with at most concurrency in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=300, limits=limits
+    ) as client:
+
+        async def one():
+            async with semaphore:
+                return await _compare(client, payload, stream)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for status, latency, _ in results if status == 200]
+    first_events = [first for status, _, first in results if first is not None]
+    statuses = {}
+    for status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "stream": stream,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "first_event_p50_ms": (
+            round(percentile(first_events, 50) * 1000, 1) if first_events else None
+        ),
+        "statuses": statuses,
+    }
+
+
+def main():
+    """Run the load test and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4, help="API_MAX_WORKERS")
+    parser.add_argument("--max-queue", type=int, default=64, help="API_MAX_QUEUE")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--stream-chunk-ms", type=float, default=20)
+    parser.add_argument("--data-file1", default="quote_1.json")
+    parser.add_argument("--data-file2", default="quote_2.json")
+    args = parser.parse_args()
+
+    with MockAzureServer(
+        "127.0.0.1",
+        latency_ms=args.latency_ms,
+        stream_chunk_ms=args.stream_chunk_ms,
+    ) as mock:
+        configure_environment(mock.url)
+        # The API reads its pool size when it is imported
+        os.environ["API_MAX_WORKERS"] = str(args.workers)
+        os.environ["API_MAX_QUEUE"] = str(args.max_queue)
+        port = _free_port()
+        server, thread = start_api(port)
+        try:
+            payload = {
+                "data_file1": args.data_file1,
+                "data_file2": args.data_file2,
+                "use_document_intelligence": False,
+                "stream": args.stream,
+            }
+            result = asyncio.run(
+                run_load(
+                    f"http://127.0.0.1:{port}",
+                    payload,
+                    args.requests,
+                    args.concurrency,
+                    args.stream,
+                )
+            )
+        finally:
+            server.should_exit = True
+            thread.join()
+        result["mock_chat_requests"] = mock.stats["chat_requests"]
+        result["mock_rate_limited"] = mock.stats["rate_limited"]
+
+    for key, value in result.items():
+        print(f"{key:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""Local stand-in for the Azure OpenAI and Document Intelligence endpoints.
+
+The server mimics just enough of the REST surface used by the app:
+
+- ``POST /openai/deployments/<deployment>/chat/completions`` (plain, streamed
+  and JSON schema structured output)
+- ``POST /documentintelligence/documentModels/<model>:analyze``
+- ``GET /documentintelligence/documentModels/<model>/analyzeResults/<id>``
+
+Latency, streaming speed and 429 behaviour are configurable so benchmarks can
+reproduce slow or throttled deployments without any Azure quota. Repeated prompt
+prefixes are reported as cached tokens and skip the per-token prompt time, like
+Azure OpenAI prompt caching.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+CHAT_COMPLETIONS_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+ANALYZE_PATH = re.compile(
+    r"^/(?:documentintelligence|formrecognizer)/documentModels/([^/:]+):analyze$"
+)
+ANALYZE_RESULT_PATH = re.compile(
+    r"^/(?:documentintelligence|formrecognizer)/documentModels/([^/]+)"
+    r"/analyzeResults/([^/]+)$"
+)
+
+FILLER_WORDS = (
+    "quote cover excess premium policy buildings contents accidental damage "
+    "limit claim insurer benefit exclusion optional extra legal expenses"
+).split()
+
+DEFAULT_CONFIG = {
+    # Delay before the first byte of a chat completion response
+    "latency_ms": 200,
+    # Random extra delay added to every response
+    "jitter_ms": 0,
+    # Delay between streamed chunks
+    "stream_chunk_ms": 10,
+    # Number of words in a synthetic completion
+    "completion_words": 300,
+    # Words per streamed chunk
+    "words_per_chunk": 5,
+    # Fraction of requests answered with 429 Too Many Requests
+    "rate_limit_ratio": 0.0,
+    # Value of the retry-after-ms header sent with 429 responses
+    "retry_after_ms": 50,
+    # Time Document Intelligence spends "analyzing" a document
+    "analyze_ms": 300,
+    # Simulated upload bandwidth in bytes per second (0 disables it)
+    "upload_bytes_per_second": 0,
+    # Upper bound on the size of the synthetic analyze result
+    "max_result_chars": 200_000,
+    # Time spent per 1K prompt tokens not served from the prompt cache
+    "prompt_ms_per_1k_tokens": 0,
+    # Shortest prompt prefix that is cached, in tokens (cache hits round down to 128)
+    "prompt_cache_min_tokens": 1024,
+    "seed": 0,
+}
+
+
+def _synthetic_text(word_count, offset=0):
+    """Build deterministic filler text with the given number of words."""
+    return " ".join(
+        FILLER_WORDS[(offset + i) % len(FILLER_WORDS)] for i in range(word_count)
+    )
+
+
+def _synthetic_json(schema, rng):
+    """Build a value matching a JSON schema, with random numbers and filler text."""
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {
+            name: _synthetic_json(spec, rng)
+            for name, spec in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [_synthetic_json(schema.get("items", {}), rng) for _ in range(2)]
+    if kind == "number":
+        return rng.randrange(50, 100_000, 50)
+    if kind == "integer":
+        return rng.randrange(1, 100)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if kind == "string":
+        return _synthetic_text(3, offset=rng.randrange(len(FILLER_WORDS)))
+    return None
+
+
+class MockAzureServer:
+    """Threaded HTTP server that answers like Azure OpenAI and Document Intelligence."""
+
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown mock server options: {sorted(unknown)}")
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.stats = {
+            "chat_requests": 0,
+            "stream_requests": 0,
+            "analyze_requests": 0,
+            "poll_requests": 0,
+            "rate_limited": 0,
+            "bytes_received": 0,
+            "cached_tokens": 0,
+        }
+        self._operations = {}
+        self._prompt_prefixes = set()
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config["seed"])
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to use as the Azure endpoint."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        """Zero all request counters."""
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _cached_prompt_tokens(self, messages):
+        """Return how many leading prompt tokens were seen before, like a prompt cache.
+
+        Prefixes are tracked at message boundaries; each message counts len/4 tokens.
+        """
+        prefixes = []
+        digest = hashlib.sha256()
+        tokens = 0
+        for message in messages:
+            digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+            tokens += len(message.get("content") or "") // 4
+            prefixes.append((digest.hexdigest(), tokens))
+
+        cached = 0
+        with self._lock:
+            for key, prefix_tokens in prefixes:
+                if key in self._prompt_prefixes:
+                    cached = prefix_tokens
+                self._prompt_prefixes.add(key)
+        if cached < self.config["prompt_cache_min_tokens"]:
+            return 0
+        return cached - cached % 128
+
+    def _should_rate_limit(self):
+        with self._lock:
+            limited = self._random.random() < self.config["rate_limit_ratio"]
+            if limited:
+                self.stats["rate_limited"] += 1
+            return limited
+
+    def _jitter(self):
+        with self._lock:
+            return self._random.uniform(0, self.config["jitter_ms"]) / 1000
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Request handler bound to the owning MockAzureServer."""
+
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """Dispatch chat completion and analyze requests."""
+                path = urlparse(self.path).path
+                body = self._read_body()
+                if server._should_rate_limit():
+                    self._send_rate_limited()
+                    return
+                match = CHAT_COMPLETIONS_PATH.match(path)
+                if match:
+                    self._chat_completion(match.group(1), body)
+                    return
+                match = ANALYZE_PATH.match(path)
+                if match:
+                    self._analyze(match.group(1), body)
+                    return
+                self._send_json(404, {"error": {"code": "NotFound", "message": path}})
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Answer analyze result polling."""
+                path = urlparse(self.path).path
+                match = ANALYZE_RESULT_PATH.match(path)
+                if not match:
+                    self._send_json(
+                        404, {"error": {"code": "NotFound", "message": path}}
+                    )
+                    return
+                self._analyze_result(match.group(1), match.group(2))
+
+            def _read_body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server._count("bytes_received", len(body))
+                bandwidth = server.config["upload_bytes_per_second"]
+                if bandwidth:
+                    time.sleep(len(body) / bandwidth)
+                return body
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_rate_limited(self):
+                retry_after_ms = server.config["retry_after_ms"]
+                self._send_json(
+                    429,
+                    {
+                        "error": {
+                            "code": "429",
+                            "message": "Rate limit is exceeded. Try again later.",
+                        }
+                    },
+                    headers={
+                        "retry-after-ms": str(retry_after_ms),
+                        "Retry-After": str(max(1, round(retry_after_ms / 1000))),
+                    },
+                )
+
+            def _chat_completion(self, deployment, body):
+                request = json.loads(body or b"{}")
+                server._count("chat_requests")
+                prompt_chars = sum(
+                    len(message.get("content") or "")
+                    for message in request.get("messages", [])
+                )
+                prompt_tokens = max(1, prompt_chars // 4)
+                cached_tokens = min(
+                    prompt_tokens,
+                    server._cached_prompt_tokens(request.get("messages", [])),
+                )
+                server._count("cached_tokens", cached_tokens)
+                words = server.config["completion_words"]
+                text = _synthetic_text(words)
+                response_format = request.get("response_format") or {}
+                if response_format.get("type") == "json_schema":
+                    # Same prompt, same record, like a deterministic extraction
+                    rng = random.Random(body)
+                    schema = response_format["json_schema"].get("schema", {})
+                    text = json.dumps(_synthetic_json(schema, rng))
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": words,
+                    "total_tokens": prompt_tokens + words,
+                    "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                }
+                prefill_ms = (
+                    (prompt_tokens - cached_tokens)
+                    / 1000
+                    * server.config["prompt_ms_per_1k_tokens"]
+                )
+                time.sleep(
+                    (server.config["latency_ms"] + prefill_ms) / 1000 + server._jitter()
+                )
+
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                created = int(time.time())
+                if request.get("stream"):
+                    server._count("stream_requests")
+                    include_usage = (request.get("stream_options") or {}).get(
+                        "include_usage", False
+                    )
+                    self._stream_completion(
+                        completion_id,
+                        created,
+                        deployment,
+                        text,
+                        usage if include_usage else None,
+                    )
+                    return
+
+                self._send_json(
+                    200,
+                    {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": created,
+                        "model": deployment,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": text},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": usage,
+                    },
+                )
+
+            def _stream_completion(self, completion_id, created, model, text, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def chunk(delta, finish_reason=None, chunk_usage=None):
+                    payload = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": (
+                            []
+                            if chunk_usage
+                            else [
+                                {
+                                    "index": 0,
+                                    "delta": delta,
+                                    "finish_reason": finish_reason,
+                                }
+                            ]
+                        ),
+                    }
+                    if chunk_usage:
+                        payload["usage"] = chunk_usage
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+                    self.wfile.flush()
+
+                words = text.split(" ")
+                step = max(1, server.config["words_per_chunk"])
+                chunk({"role": "assistant", "content": ""})
+                for start in range(0, len(words), step):
+                    piece = " ".join(words[start : start + step])
+                    chunk({"content": piece if start == 0 else " " + piece})
+                    time.sleep(server.config["stream_chunk_ms"] / 1000)
+                chunk({}, finish_reason="stop")
+                if usage:
+                    chunk({}, chunk_usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _analyze(self, model_id, body):
+                server._count("analyze_requests")
+                result_id = uuid.uuid4().hex
+                result_chars = min(
+                    max(len(body) // 4, 200), server.config["max_result_chars"]
+                )
+                content = (
+                    "# Mock analysis\n\n"
+                    + _synthetic_text(result_chars // 7, offset=len(body))[
+                        :result_chars
+                    ]
+                )
+                with server._lock:
+                    server._operations[result_id] = {
+                        "ready_at": time.monotonic()
+                        + server.config["analyze_ms"] / 1000,
+                        "content": content,
+                        "model_id": model_id,
+                    }
+                host = self.headers.get("Host", "127.0.0.1")
+                query = urlparse(self.path).query
+                base_path = urlparse(self.path).path.rsplit(":", 1)[0]
+                operation_location = (
+                    f"http://{host}{base_path}/analyzeResults/{result_id}?{query}"
+                )
+                self.send_response(202)
+                self.send_header("Operation-Location", operation_location)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _analyze_result(self, model_id, result_id):
+                server._count("poll_requests")
+                with server._lock:
+                    operation = server._operations.get(result_id)
+                if operation is None:
+                    self._send_json(
+                        404, {"error": {"code": "NotFound", "message": result_id}}
+                    )
+                    return
+                now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                if time.monotonic() < operation["ready_at"]:
+                    self._send_json(
+                        200,
+                        {
+                            "status": "running",
+                            "createdDateTime": now,
+                            "lastUpdatedDateTime": now,
+                        },
+                    )
+                    return
+                with server._lock:
+                    server._operations.pop(result_id, None)
+                self._send_json(
+                    200,
+                    {
+                        "status": "succeeded",
+                        "createdDateTime": now,
+                        "lastUpdatedDateTime": now,
+                        "analyzeResult": {
+                            "apiVersion": "2024-11-30",
+                            "modelId": model_id,
+                            "stringIndexType": "textElements",
+                            "content": operation["content"],
+                            "contentFormat": "markdown",
+                            "pages": [],
+                        },
+                    },
+                )
+
+        return Handler
+
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for option, default in DEFAULT_CONFIG.items():
+        parser.add_argument(
+            f"--{option.replace('_', '-')}", type=type(default), default=default
+        )
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    server = MockAzureServer(host=host, port=port, **args)
+    print(f"Mock Azure endpoints listening on {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""Benchmark the extraction → prompt → completion pipeline against a mock Azure server.
+
+Starts ``benchmarks.mock_server`` locally, points the app's environment variables at
+it and drives ``extract_text``, ``get_completion`` and the two-quote comparison flow
+over the bundled ``data/`` documents plus synthetic large ones.
+
+Usage:
+    python -m benchmarks.run_benchmarks --iterations 20 --concurrency 4
+    python -m benchmarks.run_benchmarks --baseline benchmarks/results/<previous>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from benchmarks.import_budget import measure_imports
+from benchmarks.mock_server import DEFAULT_CONFIG, MockAzureServer
+from benchmarks.synthetic_documents import generate_documents
+from utils.constants import DATA_DIR, DEFAULT_SYSTEM_MESSAGE, DEFAULT_USER_PROMPT
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+MOCK_DEPLOYMENT = "mock-gpt"
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values using linear interpolation."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, if the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies, wall_time, errors, peak_bytes, extra=None):
+    """Build the result record for one scenario."""
+    summary = {
+        "calls": len(latencies) + len(errors),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "mean_ms": _ms(sum(latencies) / len(latencies)) if latencies else None,
+        "throughput_per_s": round(len(latencies) / wall_time, 3) if wall_time else None,
+        "wall_time_s": round(wall_time, 3),
+        "peak_traced_mb": round(peak_bytes / (1024 * 1024), 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    summary.update(extra or {})
+    return summary
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run_scenario(name, func, iterations, concurrency, trace_memory=True):
+    """Call func(iteration) iterations times with the given concurrency.
+
+    func may return a dict of extra timings (e.g. time to first token) which are
+    aggregated into percentiles alongside the overall latency. Peak memory is
+    measured on one additional call, as tracemalloc would distort the timings.
+    """
+    latencies, errors, extras = [], [], {}
+
+    def timed_call(iteration):
+        start = time.perf_counter()
+        try:
+            extra = func(iteration)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            errors.append(f"{type(e).__name__}: {str(e)}")
+            return
+        latencies.append(time.perf_counter() - start)
+        for key, value in (extra or {}).items():
+            extras.setdefault(key, []).append(value)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_call, range(iterations)))
+    wall_time = time.perf_counter() - start
+
+    peak_bytes = 0
+    if trace_memory and not errors:
+        tracemalloc.start()
+        try:
+            func(iterations)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    extra_summary = {}
+    for key, values in extras.items():
+        extra_summary[f"{key}_p50_ms"] = _ms(percentile(values, 50))
+        extra_summary[f"{key}_p95_ms"] = _ms(percentile(values, 95))
+    result = summarize(latencies, wall_time, errors, peak_bytes, extra_summary)
+    print(
+        f"{name:<55} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+        f"p99={result['p99_ms']}ms {result['throughput_per_s']}/s "
+        f"errors={result['errors']}"
+    )
+    return result
+
+
+def configure_environment(server_url):
+    """Point the app's Azure settings at the mock server."""
+    os.environ["AZURE_OPENAI_ENDPOINT"] = server_url
+    os.environ["AZURE_OPENAI_API_KEY"] = "mock-key"
+    os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"] = MOCK_DEPLOYMENT
+    os.environ["AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT"] = server_url
+    os.environ["AZURE_DOCUMENT_INTELLIGENCE_API_KEY"] = "mock-key"
+    os.environ.setdefault("DOCUMENT_INTELLIGENCE_POLLING_INTERVAL", "0.05")
+    # Measure extraction itself rather than disk cache hits
+    os.environ.setdefault("CACHE_ENABLED", "false")
+    # The uncompressed synthetic TIFF scan (about 150 MB) exceeds the default limit
+    os.environ.setdefault("DOCUMENT_MAX_SIZE_MB", "200")
+
+
+def collect_documents(synthetic_dir, synthetic_pages):
+    """Return {name: path} for the bundled data files and synthetic documents."""
+    documents = {}
+    for name in sorted(os.listdir(DATA_DIR)):
+        path = os.path.join(DATA_DIR, name)
+        if os.path.isfile(path):
+            documents[name] = path
+    if synthetic_pages:
+        documents.update(generate_documents(synthetic_dir, synthetic_pages))
+    return documents
+
+
+def benchmark_extraction(documents, iterations, concurrency, document_intelligence):
+    """Benchmark extract_text over every document."""
+    # pylint: disable=import-outside-toplevel
+    from utils.document_extraction import (
+        DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS,
+        extract_text,
+    )
+
+    backend = "document_intelligence" if document_intelligence else "local"
+    results = {}
+    for name, path in documents.items():
+        extension = os.path.splitext(path)[1].lower()
+        if document_intelligence and extension not in (
+            DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS
+        ):
+            continue
+
+        def extract(_, path=path):
+            text = extract_text(path, use_document_intelligence=document_intelligence)
+            return {"output_chars": len(text)}
+
+        scenario = f"extract_text[{backend}][{name}]"
+        results[scenario] = run_scenario(scenario, extract, iterations, concurrency)
+        results[scenario]["file_bytes"] = os.path.getsize(path)
+    return results
+
+
+def benchmark_image_preprocessing(documents, iterations, concurrency):
+    """Compare Document Intelligence extraction of images with and without preprocessing."""
+    # pylint: disable=import-outside-toplevel
+    from utils.document_extraction import extract_using_document_intelligence
+    from utils.image_preprocessing import IMAGE_FORMATS, preprocess_image
+
+    results = {}
+    for name, path in documents.items():
+        if os.path.splitext(path)[1].lower() not in IMAGE_FORMATS:
+            continue
+
+        def extract(_, path=path):
+            extract_using_document_intelligence(path)
+
+        timings = {}
+        for enabled in ("false", "true"):
+            os.environ["DOCUMENT_INTELLIGENCE_PREPROCESS_IMAGES"] = enabled
+            scenario = f"image_preprocessing[{enabled}][{name}]"
+            results[scenario] = run_scenario(scenario, extract, iterations, concurrency)
+            timings[enabled] = results[scenario]["p50_ms"]
+        os.environ.pop("DOCUMENT_INTELLIGENCE_PREPROCESS_IMAGES")
+
+        _, stats = preprocess_image(path)
+        results[f"image_preprocessing[true][{name}]"].update(stats)
+        if timings["false"] and timings["true"]:
+            results[f"image_preprocessing[true][{name}]"]["p50_change_ms"] = round(
+                timings["true"] - timings["false"], 3
+            )
+        print(
+            f"{'':<55} {stats['bytes_saved']} bytes saved, "
+            f"{stats['duplicate_pages']} duplicate pages dropped"
+        )
+    return results
+
+
+def benchmark_completion(prompt, iterations, concurrency):
+    """Benchmark get_completion with a prebuilt prompt."""
+    # pylint: disable=import-outside-toplevel
+    from utils.openai_helpers import get_completion, setup_client
+
+    client = setup_client()
+
+    def complete(_):
+        completion = get_completion(
+            client=client,
+            deployment_name=MOCK_DEPLOYMENT,
+            system_message=DEFAULT_SYSTEM_MESSAGE,
+            user_prompt=prompt,
+        )
+        if completion.startswith("Error:"):
+            raise RuntimeError(completion)
+
+    name = "get_completion"
+    return {name: run_scenario(name, complete, iterations, concurrency)}
+
+
+def benchmark_streaming(prompt, iterations, concurrency):
+    """Benchmark a streamed chat completion, reporting time to first token."""
+    # pylint: disable=import-outside-toplevel
+    from utils.openai_helpers import setup_client
+
+    client = setup_client()
+
+    def stream(_):
+        start = time.perf_counter()
+        first_token = None
+        response = client.chat.completions.create(
+            model=MOCK_DEPLOYMENT,
+            messages=[
+                {"role": "system", "content": DEFAULT_SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt},
+            ],
+            stream=True,
+        )
+        for chunk in response:
+            if first_token is None and chunk.choices and chunk.choices[0].delta.content:
+                first_token = time.perf_counter() - start
+        return {"time_to_first_token": first_token or 0.0}
+
+    name = "stream_completion"
+    return {name: run_scenario(name, stream, iterations, concurrency)}
+
+
+def benchmark_comparison(pair, iterations, concurrency, document_intelligence):
+    """Benchmark the full Run Completion flow for one pair of documents."""
+    # pylint: disable=import-outside-toplevel
+    from utils.document_extraction import extract_text
+    from utils.openai_helpers import get_completion, setup_client
+
+    (name1, path1), (name2, path2) = pair
+
+    def compare(_):
+        quote1 = extract_text(path1, use_document_intelligence=document_intelligence)
+        quote2 = extract_text(path2, use_document_intelligence=document_intelligence)
+        prompt = DEFAULT_USER_PROMPT.format(quote1=quote1, quote2=quote2)
+        completion = get_completion(
+            client=setup_client(),
+            deployment_name=MOCK_DEPLOYMENT,
+            system_message=DEFAULT_SYSTEM_MESSAGE,
+            user_prompt=prompt,
+        )
+        if completion.startswith("Error:"):
+            raise RuntimeError(completion)
+        return {"prompt_chars": len(prompt)}
+
+    backend = "document_intelligence" if document_intelligence else "local"
+    name = f"comparison[{backend}][{name1} vs {name2}]"
+    return {name: run_scenario(name, compare, iterations, concurrency)}
+
+
+def git_commit():
+    """Return the current short commit hash, or 'unknown' outside a git checkout."""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(baseline, current):
+    """Print the latency change of every scenario present in both result sets."""
+    print(f"\nComparison against {baseline['git_commit']} ({baseline['timestamp']}):")
+    for name, result in current["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            before, after = previous.get(metric), result.get(metric)
+            if before and after:
+                changes.append(f"{metric}={(after - before) / before * 100:+.1f}%")
+        print(f"{name:<55} {' '.join(changes)}")
+    for module, result in current.get("imports", {}).items():
+        previous = baseline.get("imports", {}).get(module)
+        if previous:
+            before, after = previous["import_ms"], result["import_ms"]
+            print(
+                f"{'import ' + module:<55} "
+                f"import_ms={(after - before) / before * 100:+.1f}% "
+                f"peak_rss_mb={previous['peak_rss_mb']}->{result['peak_rss_mb']}"
+            )
+
+
+def save_results(results, output_dir):
+    """Write benchmark results to a timestamped JSON file."""
+    os.makedirs(output_dir, exist_ok=True)
+    file_path = os.path.join(
+        output_dir, f"benchmark_{results['timestamp']}_{results['git_commit']}.json"
+    )
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+    return file_path
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--synthetic-pages",
+        type=int,
+        default=100,
+        help="Pages in each synthetic document (0 to skip them)",
+    )
+    parser.add_argument(
+        "--skip-document-intelligence",
+        action="store_true",
+        help="Skip the Document Intelligence extraction scenarios",
+    )
+    parser.add_argument(
+        "--skip-imports",
+        action="store_true",
+        help="Skip the cold start import time and memory measurements",
+    )
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    for option in (
+        "latency_ms",
+        "stream_chunk_ms",
+        "rate_limit_ratio",
+        "analyze_ms",
+        "upload_bytes_per_second",
+    ):
+        parser.add_argument(
+            f"--{option.replace('_', '-')}",
+            type=type(DEFAULT_CONFIG[option]),
+            default=DEFAULT_CONFIG[option],
+        )
+    return parser.parse_args()
+
+
+def main():
+    """Run all benchmark scenarios and save the results."""
+    args = parse_args()
+    mock_config = {
+        "latency_ms": args.latency_ms,
+        "stream_chunk_ms": args.stream_chunk_ms,
+        "rate_limit_ratio": args.rate_limit_ratio,
+        "analyze_ms": args.analyze_ms,
+        "upload_bytes_per_second": args.upload_bytes_per_second,
+    }
+
+    imports = {}
+    if not args.skip_imports:
+        imports = measure_imports()
+        for module, result in imports.items():
+            status = "ok" if result["within_budget"] else "OVER BUDGET"
+            print(f"{'import ' + module:<55} {result['import_ms']}ms {status}")
+
+    scenarios = {}
+    with MockAzureServer(**mock_config) as server, tempfile.TemporaryDirectory() as tmp:
+        configure_environment(server.url)
+        documents = collect_documents(tmp, args.synthetic_pages)
+        run = (args.iterations, args.concurrency)
+
+        scenarios.update(benchmark_extraction(documents, *run, False))
+        if not args.skip_document_intelligence:
+            scenarios.update(benchmark_extraction(documents, *run, True))
+            scenarios.update(benchmark_image_preprocessing(documents, *run))
+
+        bundled = [(n, p) for n, p in documents.items() if n.startswith("quote_")]
+        if len(bundled) >= 2:
+            # pylint: disable=import-outside-toplevel
+            from utils.document_extraction import extract_text
+
+            prompt = DEFAULT_USER_PROMPT.format(
+                quote1=extract_text(bundled[0][1], use_document_intelligence=False),
+                quote2=extract_text(bundled[1][1], use_document_intelligence=False),
+            )
+            scenarios.update(benchmark_completion(prompt, *run))
+            scenarios.update(benchmark_streaming(prompt, *run))
+            scenarios.update(benchmark_comparison(bundled[:2], *run, False))
+
+        synthetic = [(n, p) for n, p in documents.items() if n.startswith("synthetic")]
+        if len(synthetic) >= 2:
+            scenarios.update(benchmark_comparison(synthetic[:2], *run, False))
+        server_stats = dict(server.stats)
+
+    results = {
+        "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {**vars(args), "mock": mock_config},
+        "mock_server_stats": server_stats,
+        "imports": imports,
+        "scenarios": scenarios,
+    }
+    file_path = save_results(results, args.output_dir)
+    print(f"\nResults saved to {file_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare_results(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""Generate large synthetic quote documents for benchmarking."""
+
+import json
+import os
+
+SECTIONS = [
+    "Policy Overview",
+    "Buildings Cover",
+    "Contents Cover",
+    "Accidental Damage",
+    "Optional Extras",
+    "Exclusions",
+]
+
+LINE = (
+    "The insurer will pay up to the stated limit for loss or damage caused by "
+    "fire, flood, storm or theft, less the excess shown in the schedule."
+)
+
+
+def _page_lines(page, lines_per_page):
+    section = SECTIONS[page % len(SECTIONS)]
+    lines = [f"{section} - page {page + 1}"]
+    for i in range(lines_per_page - 1):
+        lines.append(f"{i + 1}. {LINE}")
+    return lines
+
+
+def write_txt(path, pages, lines_per_page=40):
+    """Write a plain-text document with the given number of pages."""
+    with open(path, "w", encoding="utf-8") as f:
+        for page in range(pages):
+            f.write("\n".join(_page_lines(page, lines_per_page)))
+            f.write("\n\n")
+    return path
+
+
+def write_html(path, pages, lines_per_page=40):
+    """Write an HTML document with a heading, paragraphs and a table per page."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body>\n")
+        for page in range(pages):
+            lines = _page_lines(page, lines_per_page)
+            f.write(f"<h2>{lines[0]}</h2>\n")
+            for line in lines[1:]:
+                f.write(f"<p>{line}</p>\n")
+            f.write("<table><tr><th>Item</th><th>Limit</th><th>Excess</th></tr>")
+            for row in range(5):
+                f.write(f"<tr><td>Item {row}</td><td>£{(row + 1) * 1000}</td>")
+                f.write(f"<td>£{(row + 1) * 50}</td></tr>")
+            f.write("</table>\n")
+        f.write("</body></html>\n")
+    return path
+
+
+def write_json(path, pages, lines_per_page=40):
+    """Write a JSON quote with one section per page."""
+    data = {
+        f"{SECTIONS[page % len(SECTIONS)]} {page + 1}": {
+            "description": " ".join(_page_lines(page, lines_per_page)[1:]),
+            "Limit": f"£{(page + 1) * 1000}",
+            "Excess": f"£{(page % 5 + 1) * 50}",
+        }
+        for page in range(pages)
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def write_pdf(path, pages, lines_per_page=40):
+    """Write a minimal text PDF without third-party dependencies."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages object, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        commands = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        for line in _page_lines(page, lines_per_page):
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            commands.append(f"({escaped}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, xref_offset)
+        )
+    return path
+
+
+def write_docx(path, pages, lines_per_page=40):
+    """Write a DOCX document with headings, paragraphs and tables with merged cells."""
+    import docx  # pylint: disable=import-outside-toplevel
+
+    document = docx.Document()
+    for page in range(pages):
+        lines = _page_lines(page, lines_per_page)
+        document.add_heading(lines[0], level=2)
+        for line in lines[1:]:
+            document.add_paragraph(line)
+        table = document.add_table(rows=6, cols=3)
+        for col, header in enumerate(["Item", "Limit", "Excess"]):
+            table.cell(0, col).text = header
+        for row in range(1, 6):
+            table.cell(row, 0).text = f"Item {row}"
+            table.cell(row, 1).text = f"£{row * 1000}"
+            table.cell(row, 2).text = f"£{row * 50}"
+        # Merged cells, as in real quote schedules
+        table.cell(1, 1).merge(table.cell(1, 2))
+        table.cell(2, 0).merge(table.cell(3, 0))
+        document.add_page_break()
+    document.save(path)
+    return path
+
+
+def _escape_xml(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>{overrides}</Types>'
+)
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    "{relationships}</Relationships>"
+)
+_OFFICE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _relationship(rel_id, rel_type, target):
+    return (
+        f'<Relationship Id="{rel_id}" Type="{_OFFICE_REL}/{rel_type}" '
+        f'Target="{target}"/>'
+    )
+
+
+def _override(part, content_type):
+    return (
+        f'<Override PartName="/{part}" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.{content_type}"/>'
+    )
+
+
+def write_xlsx(path, pages, lines_per_page=40):
+    """Write an XLSX workbook with one sheet of schedule rows per page.
+
+    The OOXML parts are written directly, so no spreadsheet library is needed.
+    Cells mix shared strings, inline strings, numbers and dates.
+    """
+    import zipfile  # pylint: disable=import-outside-toplevel
+
+    strings = []
+    string_ids = {}
+
+    def shared(text):
+        if text not in string_ids:
+            string_ids[text] = len(strings)
+            strings.append(text)
+        return string_ids[text]
+
+    sheets = []
+    for page in range(pages):
+        lines = _page_lines(page, lines_per_page)
+        rows = [
+            '<c r="A1" t="s"><v>%d</v></c><c r="B1" t="s"><v>%d</v></c>'
+            '<c r="C1" t="s"><v>%d</v></c><c r="D1" t="s"><v>%d</v></c>'
+            % (shared("Item"), shared("Limit"), shared("Start date"), shared("Terms"))
+        ]
+        for number, line in enumerate(lines[1:], start=2):
+            rows.append(
+                f'<c r="A{number}" t="s"><v>{shared(f"Item {number - 1}")}</v></c>'
+                f'<c r="B{number}"><v>{(number - 1) * 1000}</v></c>'
+                f'<c r="C{number}" s="1"><v>{45658 + number}</v></c>'
+                f'<c r="D{number}" t="inlineStr"><is><t>{_escape_xml(line)}</t></is></c>'
+            )
+        sheets.append(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            "<sheetData>"
+            + "".join(
+                f'<row r="{number}">{cells}</row>'
+                for number, cells in enumerate(rows, start=1)
+            )
+            + "</sheetData></worksheet>"
+        )
+
+    main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    sheet_list = "".join(
+        f'<sheet name="{_escape_xml(_page_lines(page, 1)[0])}" sheetId="{page + 1}" '
+        f'r:id="rId{page + 3}"/>'
+        for page in range(pages)
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(
+                overrides=_override("xl/workbook.xml", "spreadsheetml.sheet.main+xml")
+                + _override("xl/styles.xml", "spreadsheetml.styles+xml")
+                + _override("xl/sharedStrings.xml", "spreadsheetml.sharedStrings+xml")
+                + "".join(
+                    _override(
+                        f"xl/worksheets/sheet{page + 1}.xml",
+                        "spreadsheetml.worksheet+xml",
+                    )
+                    for page in range(pages)
+                )
+            ),
+        )
+        archive.writestr(
+            "_rels/.rels",
+            _RELS.format(
+                relationships=_relationship("rId1", "officeDocument", "xl/workbook.xml")
+            ),
+        )
+        archive.writestr(
+            "xl/workbook.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{main}" xmlns:r="{_OFFICE_REL}">'
+            f"<sheets>{sheet_list}</sheets></workbook>",
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            _RELS.format(
+                relationships=_relationship("rId1", "styles", "styles.xml")
+                + _relationship("rId2", "sharedStrings", "sharedStrings.xml")
+                + "".join(
+                    _relationship(
+                        f"rId{page + 3}", "worksheet", f"worksheets/sheet{page + 1}.xml"
+                    )
+                    for page in range(pages)
+                )
+            ),
+        )
+        archive.writestr(
+            "xl/styles.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<styleSheet xmlns="{main}"><cellXfs count="2">'
+            '<xf numFmtId="0"/><xf numFmtId="14" applyNumberFormat="1"/>'
+            "</cellXfs></styleSheet>",
+        )
+        archive.writestr(
+            "xl/sharedStrings.xml",
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<sst xmlns="{main}" count="{len(strings)}" uniqueCount="{len(strings)}">'
+            + "".join(f"<si><t>{_escape_xml(text)}</t></si>" for text in strings)
+            + "</sst>",
+        )
+        for page, sheet in enumerate(sheets):
+            archive.writestr(f"xl/worksheets/sheet{page + 1}.xml", sheet)
+    return path
+
+
+def _pptx_shape(shape_id, paragraphs, placeholder=""):
+    body = "".join(
+        f"<a:p><a:r><a:t>{_escape_xml(text)}</a:t></a:r></a:p>" for text in paragraphs
+    )
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="Shape {shape_id}"/>'
+        f"<p:cNvSpPr/><p:nvPr>{placeholder}</p:nvPr></p:nvSpPr><p:spPr/>"
+        f"<p:txBody><a:bodyPr/>{body}</p:txBody></p:sp>"
+    )
+
+
+def write_pptx(path, pages, lines_per_page=40):
+    """Write a PPTX presentation with a title, bullets, a table and notes per slide.
+
+    Like write_xlsx, the OOXML parts are written directly.
+    """
+    import zipfile  # pylint: disable=import-outside-toplevel
+
+    namespaces = (
+        'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+        f'xmlns:r="{_OFFICE_REL}" '
+        'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+    )
+    header = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            _CONTENT_TYPES.format(
+                overrides=_override(
+                    "ppt/presentation.xml", "presentationml.presentation.main+xml"
+                )
+                + "".join(
+                    _override(
+                        f"ppt/slides/slide{page + 1}.xml", "presentationml.slide+xml"
+                    )
+                    + _override(
+                        f"ppt/notesSlides/notesSlide{page + 1}.xml",
+                        "presentationml.notesSlide+xml",
+                    )
+                    for page in range(pages)
+                )
+            ),
+        )
+        archive.writestr(
+            "_rels/.rels",
+            _RELS.format(
+                relationships=_relationship(
+                    "rId1", "officeDocument", "ppt/presentation.xml"
+                )
+            ),
+        )
+        archive.writestr(
+            "ppt/presentation.xml",
+            f"{header}<p:presentation {namespaces}><p:sldIdLst>"
+            + "".join(
+                f'<p:sldId id="{256 + page}" r:id="rId{page + 1}"/>'
+                for page in range(pages)
+            )
+            + "</p:sldIdLst></p:presentation>",
+        )
+        archive.writestr(
+            "ppt/_rels/presentation.xml.rels",
+            _RELS.format(
+                relationships="".join(
+                    _relationship(
+                        f"rId{page + 1}", "slide", f"slides/slide{page + 1}.xml"
+                    )
+                    for page in range(pages)
+                )
+            ),
+        )
+        for page in range(pages):
+            lines = _page_lines(page, lines_per_page)
+            rows = "".join(
+                "<a:tr>"
+                + "".join(
+                    f"<a:tc><a:txBody><a:bodyPr/><a:p><a:r><a:t>{cell}</a:t></a:r></a:p>"
+                    "</a:txBody></a:tc>"
+                    for cell in cells
+                )
+                + "</a:tr>"
+                for cells in [("Item", "Limit", "Excess")]
+                + [
+                    (f"Item {row}", f"£{row * 1000}", f"£{row * 50}")
+                    for row in range(1, 6)
+                ]
+            )
+            table = (
+                '<p:graphicFrame><p:nvGraphicFramePr><p:cNvPr id="4" name="Table"/>'
+                "<p:cNvGraphicFramePr/><p:nvPr/></p:nvGraphicFramePr><p:xfrm/>"
+                '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/'
+                f'drawingml/2006/table"><a:tbl>{rows}</a:tbl></a:graphicData>'
+                "</a:graphic></p:graphicFrame>"
+            )
+            half = len(lines) // 2
+            archive.writestr(
+                f"ppt/slides/slide{page + 1}.xml",
+                f"{header}<p:sld {namespaces}><p:cSld><p:spTree>"
+                + _pptx_shape(2, [lines[0]], '<p:ph type="title"/>')
+                + _pptx_shape(3, lines[1:half], '<p:ph idx="1"/>')
+                + table
+                + "</p:spTree></p:cSld></p:sld>",
+            )
+            archive.writestr(
+                f"ppt/slides/_rels/slide{page + 1}.xml.rels",
+                _RELS.format(
+                    relationships=_relationship(
+                        "rId1", "notesSlide", f"../notesSlides/notesSlide{page + 1}.xml"
+                    )
+                ),
+            )
+            archive.writestr(
+                f"ppt/notesSlides/notesSlide{page + 1}.xml",
+                f"{header}<p:notes {namespaces}><p:cSld><p:spTree>"
+                + _pptx_shape(2, lines[half:], '<p:ph type="body" idx="1"/>')
+                + "</p:spTree></p:cSld></p:notes>",
+            )
+    return path
+
+
+def _draw_page(page, lines_per_page, size, mode):
+    from PIL import Image, ImageDraw  # pylint: disable=import-outside-toplevel
+
+    image = Image.new(mode, size, "white")
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(_page_lines(page, lines_per_page)):
+        draw.text((60, 60 + i * 30), line, fill="black")
+    return image
+
+
+def write_jpg(path, pages, lines_per_page=40):
+    """Write a large colour "phone photo" of the first page, with EXIF metadata."""
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    del pages  # A photo is always a single page
+    image = _draw_page(0, lines_per_page, (4032, 3024), "RGB")
+    exif = Image.Exif()
+    exif[0x010F] = "Synthetic Phone"  # Make
+    exif[0x0110] = "Benchmark Camera"  # Model
+    image.save(path, format="JPEG", quality=95, exif=exif)
+    return path
+
+
+def write_tiff(path, pages, lines_per_page=40):
+    """Write an uncompressed multi-page scan where every page appears twice."""
+    scan_pages = []
+    for page in range(min(pages, 3)):
+        image = _draw_page(page, lines_per_page, (2480, 3508), "RGB")
+        scan_pages.extend([image, image.copy()])
+    scan_pages[0].save(path, format="TIFF", save_all=True, append_images=scan_pages[1:])
+    return path
+
+
+def write_bmp(path, pages, lines_per_page=40):
+    """Write an uncompressed A4 scan at 300 dpi."""
+    del pages
+    _draw_page(0, lines_per_page, (2480, 3508), "RGB").save(path, format="BMP")
+    return path
+
+
+WRITERS = {
+    ".txt": write_txt,
+    ".html": write_html,
+    ".json": write_json,
+    ".pdf": write_pdf,
+    ".docx": write_docx,
+    ".xlsx": write_xlsx,
+    ".pptx": write_pptx,
+    ".jpg": write_jpg,
+    ".tiff": write_tiff,
+    ".bmp": write_bmp,
+}
+
+
+def generate_documents(directory, pages, extensions=None):
+    """Generate one synthetic document per extension and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for extension in extensions or WRITERS:
+        path = os.path.join(directory, f"synthetic_{pages}p{extension}")
+        try:
+            paths[os.path.basename(path)] = WRITERS[extension](path, pages)
+        except ImportError as e:
+            print(f"Skipping synthetic {extension} document: {str(e)}")
+    return paths
@@ -0,0 +1,76 @@
+"""Export completion history to Parquet or CSV and print aggregate reports.
+
+Usage:
+    python export_history.py                          # full Parquet export
+    python export_history.py --incremental            # append changed completions only
+    python export_history.py --format csv --output exports/history_csv
+    python export_history.py --report by_model by_day --no-export
+
+The export is a directory of part files that other tools (pandas, DuckDB, Spark) can
+read as one dataset. See utils/history_export.py for the columns.
+"""
+
+import argparse
+import time
+
+from utils.constants import EXPORTS_DIR
+from utils.history_export import REPORTS, export_history, format_report, run_report
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=f"{EXPORTS_DIR}/completions")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only add completions saved, changed or deleted since the last export",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--report",
+        nargs="+",
+        choices=sorted(REPORTS),
+        default=[],
+        help="Reports to print after exporting",
+    )
+    parser.add_argument(
+        "--no-export", action="store_true", help="Only run reports on the export"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Export the history and print the requested reports."""
+    args = parse_args()
+
+    if not args.no_export:
+        start = time.perf_counter()
+        try:
+            rows, part_path = export_history(
+                args.output,
+                file_format=args.format,
+                incremental=args.incremental,
+                batch_size=args.batch_size,
+            )
+        except ValueError as e:
+            raise SystemExit(f"Error: {str(e)}") from e
+        elapsed = time.perf_counter() - start
+        if part_path:
+            print(f"Exported {rows} completions to {part_path} in {elapsed:.2f}s")
+        else:
+            print("No new completions to export.")
+
+    for name in args.report:
+        start = time.perf_counter()
+        try:
+            rows = run_report(args.output, name)
+        except FileNotFoundError as e:
+            raise SystemExit(f"Error: {str(e)}") from e
+        print(f"\n{name} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        print(format_report(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Watch the data directory and pre-process new documents into the shared cache.
+
+Usage:
+    python ingest.py                  # ingest existing files, then keep watching
+    python ingest.py --once           # ingest existing files and exit
+    python ingest.py --workers 4 --no-document-intelligence
+
+Extraction uses the same backend as the app (Azure Document Intelligence when it is
+configured), so documents compared in the app afterwards are served from the cache.
+"""
+
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+from utils.catalog import get_catalog
+from utils.constants import DATA_DIR
+from utils.file_helpers import DATA_FILE_PATTERNS
+from utils.ingestion import IngestionQueue
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument(
+        "--once", action="store_true", help="Exit after ingesting existing files"
+    )
+    parser.add_argument(
+        "--no-document-intelligence",
+        action="store_true",
+        help="Extract documents locally even if Document Intelligence is configured",
+    )
+    return parser.parse_args()
+
+
+def _report(result):
+    source = "cache" if result["cached"] else result["backend"]
+    print(
+        f"{result['file']}: {result['chars']} chars, {result['tokens']} tokens "
+        f"({source}, {result['total_seconds']:.2f}s)"
+    )
+
+
+def main():
+    """Ingest every data file, then follow changes to the data directory."""
+    load_dotenv()
+    args = parse_args()
+
+    ingestion = IngestionQueue(
+        workers=args.workers,
+        use_document_intelligence=not args.no_document_intelligence,
+        on_done=_report,
+    )
+    catalog = get_catalog(DATA_DIR, DATA_FILE_PATTERNS, lambda path: path)
+    if not args.once:
+        catalog.subscribe(ingestion.submit)
+    for path in catalog.items().values():
+        ingestion.submit(path)
+    ingestion.join()
+
+    if args.once:
+        return
+    print(f"Watching {DATA_DIR}/ for new documents. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Run a grid of system message × user prompt × model × quote pair × temperature × layout experiments.
+
+Usage:
+    python run_experiments.py --name prompts-v2 \
+        --system-messages Default "Insurance Advisor" \
+        --models gpt-4o-mini o3-mini \
+        --pairs quote_1.json,quote_2.json \
+        --temperatures 0.0 0.7 \
+        --layouts inline documents_first
+
+Progress is checkpointed to experiments/<name>/checkpoint.jsonl; re-running the same
+command resumes an interrupted grid. A summary matrix of latency, tokens and cost
+per cell is printed and saved as summary.json / summary.csv. Comparing the
+documents_first layout with inline shows the latency and cost saved by prompt caching.
+"""
+
+import argparse
+import itertools
+import sys
+
+from dotenv import load_dotenv
+
+from utils.experiments import (
+    ExperimentRunner,
+    build_grid,
+    format_matrix,
+    save_summary,
+    summarize_results,
+)
+from utils.file_helpers import load_data_files, load_system_messages, load_user_prompts
+from utils.openai_helpers import PROMPT_LAYOUTS, get_available_models
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--name", required=True, help="Experiment name (resume key)")
+    parser.add_argument("--system-messages", nargs="+", help="Default: all")
+    parser.add_argument("--user-prompts", nargs="+", help="Default: all")
+    parser.add_argument("--models", nargs="+", help="Default: all configured models")
+    parser.add_argument(
+        "--pairs",
+        nargs="+",
+        help="Quote pairs as file1,file2 (default: every pair of data files)",
+    )
+    parser.add_argument("--temperatures", nargs="+", type=float, default=[0.7])
+    parser.add_argument(
+        "--layouts", nargs="+", choices=PROMPT_LAYOUTS, default=["inline"]
+    )
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument(
+        "--no-document-intelligence",
+        action="store_true",
+        help="Extract documents locally even if Document Intelligence is configured",
+    )
+    args = parser.parse_args()
+    for pair in args.pairs or []:
+        names = pair.split(",", 1)
+        if len(names) != 2 or not all(names):
+            parser.error(f"--pairs expects file1,file2, got {pair!r}")
+    return args
+
+
+def _select(available, requested, label):
+    if not requested:
+        return list(available)
+    missing = [name for name in requested if name not in available]
+    if missing:
+        sys.exit(f"Unknown {label}: {', '.join(missing)}")
+    return requested
+
+
+def main():
+    """Build the grid, run it and print the summary matrix."""
+    load_dotenv()
+    args = parse_args()
+
+    system_messages = load_system_messages()
+    user_prompts = load_user_prompts()
+    data_files = load_data_files()
+    available_models = get_available_models()
+    model_names = [model["name"] for model in available_models]
+    if not model_names:
+        sys.exit("No models configured. See the README for the .env settings.")
+
+    if args.pairs:
+        pairs = [tuple(pair.split(",", 1)) for pair in args.pairs]
+        _select(data_files, [name for pair in pairs for name in pair], "data files")
+    else:
+        pairs = list(itertools.combinations(sorted(data_files), 2))
+
+    system_names = _select(system_messages, args.system_messages, "system messages")
+    prompt_names = _select(user_prompts, args.user_prompts, "user prompts")
+    cells = build_grid(
+        {name: system_messages[name] for name in system_names},
+        {name: user_prompts[name] for name in prompt_names},
+        _select(model_names, args.models, "models"),
+        pairs,
+        args.temperatures,
+        data_files,
+        args.layouts,
+    )
+
+    runner = ExperimentRunner(
+        args.name,
+        system_messages,
+        user_prompts,
+        data_files,
+        available_models,
+        max_tokens=args.max_tokens,
+        use_document_intelligence=not args.no_document_intelligence,
+    )
+    print(f"Running {len(cells)} cells, checkpointing to {runner.checkpoint_path}")
+
+    def progress(done, total, record):
+        status = "cached" if record.get("cached") else record["status"]
+        detail = record.get("error") or f"{record.get('latency_seconds')}s"
+        print(f"[{done}/{total}] {record['cell_id']} {status} {detail}")
+
+    results = runner.run(cells, progress=progress)
+    matrix = summarize_results(results)
+    save_summary(runner.directory, matrix)
+
+    print()
+    print(format_matrix(matrix))
+    print(
+        f"\n{len(results)}/{len(cells)} cells complete. Summary in {runner.directory}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Compare Quotes Tab"""
+
+import streamlit as st
+from utils.constants import (
+    COMPLETIONS_DIR,
+    DEFAULT_CONDENSE_PROMPT,
+    DEFAULT_CONDENSE_SYSTEM_MESSAGE,
+    DEFAULT_MULTI_COMPARISON_PROMPT,
+    DEFAULT_MULTI_SYSTEM_MESSAGE,
+    DEFAULT_RECORD_NARRATIVE_PROMPT,
+    DEFAULT_RECORD_PROMPT,
+    DEFAULT_RECORD_SYSTEM_MESSAGE,
+)
+from utils.document_extraction import is_document_intelligence_available
+from utils.file_helpers import save_completion
+from utils.multi_compare import compare_quotes
+from utils.openai_helpers import get_model_id, setup_client
+from utils.quote_records import compare_quote_records
+
+STRUCTURED = "Structured records (ranked locally)"
+CONDENSED = "Condensed summaries"
+
+
+def render(
+    data_files,
+    available_models,
+    selected_model,
+    deployment_name,
+    temperature,
+    max_tokens,
+    save_completion_history=False,
+):
+    """Render the Compare Quotes tab
+    Args:
+        data_files (dict): Dictionary of data files.
+        available_models (list): List of available models.
+        selected_model (str): Selected model name.
+        deployment_name (str): Deployment name for Azure OpenAI.
+        temperature (float): Temperature for the final comparison.
+        max_tokens (int): Maximum tokens for each completion.
+        save_completion_history (bool): Flag to save completion history.
+    """
+    st.header("Compare Multiple Quotes")
+    method = st.radio("Method", [STRUCTURED, CONDENSED], horizontal=True)
+    if method == STRUCTURED:
+        st.markdown(
+            "Each quote is extracted once into a structured record (premium, excess, "
+            "limits and cover). Records are compared and ranked locally, and the "
+            "model only writes an optional summary of the records. Records are "
+            "cached, so adding a quote to a comparison only extracts the new one."
+        )
+    else:
+        st.markdown(
+            "Each quote is condensed once into a short summary, and the summaries "
+            "are compared and ranked in a single request. Summaries are cached, so "
+            "adding a quote to a comparison only condenses the new one."
+        )
+
+    selected_files = st.multiselect(
+        "Select Quote Documents",
+        list(data_files.keys()),
+        key="multi_quotes",
+    )
+
+    doc_intelligence_available = is_document_intelligence_available()
+    use_document_intelligence = st.checkbox(
+        "Use Azure Document Intelligence (better quality)",
+        value=doc_intelligence_available,
+        disabled=not doc_intelligence_available,
+        key="multi_document_intelligence",
+    )
+
+    if method == STRUCTURED:
+        with st.expander("Record Extraction Prompt", expanded=False):
+            record_system_message = st.text_area(
+                "Extraction System Message", DEFAULT_RECORD_SYSTEM_MESSAGE, height=100
+            )
+            record_prompt = st.text_area(
+                "Extraction Prompt Template ({schema} and {quote} are filled in)",
+                DEFAULT_RECORD_PROMPT,
+                height=200,
+            )
+        narrative = st.checkbox("Write a summary of the ranking", value=True)
+        with st.expander("Summary Prompt", expanded=False):
+            system_message = st.text_area(
+                "Summary System Message", DEFAULT_MULTI_SYSTEM_MESSAGE, height=100
+            )
+            comparison_prompt = st.text_area(
+                "Summary Prompt Template ({count}, {ranking} and {records} are "
+                "filled in)",
+                DEFAULT_RECORD_NARRATIVE_PROMPT,
+                height=200,
+            )
+    else:
+        with st.expander("Condensing Prompt", expanded=False):
+            condense_system_message = st.text_area(
+                "Condensing System Message",
+                DEFAULT_CONDENSE_SYSTEM_MESSAGE,
+                height=100,
+            )
+            condense_prompt = st.text_area(
+                "Condensing Prompt Template ({quote} is replaced by the document)",
+                DEFAULT_CONDENSE_PROMPT,
+                height=200,
+            )
+
+        with st.expander("Comparison Prompt", expanded=False):
+            system_message = st.text_area(
+                "Comparison System Message", DEFAULT_MULTI_SYSTEM_MESSAGE, height=100
+            )
+            comparison_prompt = st.text_area(
+                "Comparison Prompt Template ({quotes} and {count} are filled in)",
+                DEFAULT_MULTI_COMPARISON_PROMPT,
+                height=150,
+            )
+
+    # The last result is kept across reruns and shown while its inputs are selected
+    selection = (
+        method,
+        tuple(selected_files),
+        use_document_intelligence,
+        selected_model,
+        deployment_name,
+    )
+    if st.button(
+        "Compare Quotes",
+        type="primary",
+        use_container_width=True,
+        disabled=len(selected_files) < 2,
+    ):
+        if not selected_model and not deployment_name:
+            st.error("Please select a model or provide a deployment name")
+            return
+
+        model_id = get_model_id(available_models, selected_model)
+        client = setup_client(model_id)
+        if not client:
+            return
+
+        quote_files = {name: data_files[name] for name in selected_files}
+        with st.spinner(f"Comparing {len(selected_files)} quotes..."):
+            try:
+                if method == STRUCTURED:
+                    result = compare_quote_records(
+                        client,
+                        quote_files,
+                        system_message=system_message,
+                        record_system_message=record_system_message,
+                        record_prompt=record_prompt,
+                        narrative_prompt=comparison_prompt,
+                        deployment_name=deployment_name or selected_model,
+                        model_name=model_id,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        use_document_intelligence=use_document_intelligence,
+                        narrative=narrative,
+                    )
+                else:
+                    result = compare_quotes(
+                        client,
+                        quote_files,
+                        system_message=system_message,
+                        comparison_prompt=comparison_prompt,
+                        condense_system_message=condense_system_message,
+                        condense_prompt=condense_prompt,
+                        deployment_name=deployment_name or selected_model,
+                        model_name=model_id,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        use_document_intelligence=use_document_intelligence,
+                    )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                st.error(f"Error comparing quotes: {str(e)}")
+                return
+
+        if method == STRUCTURED:
+            completion = result["table"]
+            if narrative:
+                completion = f"{result['table']}\n\n{result['completion']}"
+        else:
+            completion = result["completion"]
+        # The prompt is only needed to save the comparison, which happens now
+        st.session_state.multi_compare_result = {
+            "selection": selection,
+            "narrative": method == STRUCTURED and narrative,
+            "result": {k: v for k, v in result.items() if k != "user_prompt"},
+        }
+
+        if save_completion_history:
+            filename = save_completion(
+                {
+                    "system_message": system_message,
+                    "user_prompt": result["user_prompt"] or "",
+                    "completion": completion,
+                    "data_files": selected_files,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "model": selected_model,
+                    "latency_seconds": result["latency_seconds"],
+                    "usage": result["usage"],
+                }
+            )
+            st.success(f"Completion saved to {COMPLETIONS_DIR}/{filename}")
+
+    stored = st.session_state.get("multi_compare_result")
+    if stored and stored["selection"] == selection:
+        if method == STRUCTURED:
+            _render_records(stored["result"], stored["narrative"])
+        else:
+            _render_condensed(stored["result"])
+
+
+def _render_condensed(result):
+    """Show the result of a comparison of condensed quotes."""
+    cached = sum(item["cached"] for item in result["condensed"].values())
+    st.caption(
+        f"{result['requests']} requests ({cached} cached summaries), "
+        f"{result['usage']['total_tokens']} tokens, "
+        f"{result['latency_seconds']:.1f}s"
+    )
+
+    st.subheader("Comparison Result")
+    st.markdown(result["completion"])
+
+    st.subheader("Condensed Quotes")
+    for name, item in result["condensed"].items():
+        label = f"{name} ({'cached' if item['cached'] else 'condensed'})"
+        with st.expander(label):
+            st.markdown(item["summary"])
+
+
+def _render_records(result, narrative):
+    """Show the result of a comparison of quote records."""
+    cached = sum(item["cached"] for item in result["records"].values())
+    st.caption(
+        f"{result['requests']} requests ({cached} cached records), "
+        f"{result['usage']['total_tokens']} tokens, "
+        f"{result['latency_seconds']:.1f}s"
+    )
+
+    st.subheader("Ranking")
+    st.markdown(result["table"])
+    if narrative:
+        st.subheader("Summary")
+        st.markdown(result["completion"])
+
+    st.subheader("Quote Records")
+    for name, item in result["records"].items():
+        label = f"{name} ({'cached' if item['cached'] else 'extracted'})"
+        with st.expander(label):
+            st.json(item["record"])
@@ -1,8 +1,128 @@
 """Functionality to render the Completion History tab in the Streamlit app."""
 
+import time
+
 import streamlit as st
+from utils.constants import PREVIEW_CHARS
 from utils.file_helpers import rename_completion, delete_completion, load_completions
-from utils.formatting import format_timestamp, get_friendly_completion_name
+from utils.formatting import (
+    format_timestamp,
+    get_friendly_completion_name,
+    truncate_text,
+)
+from utils.search_index import count_matches, search_completions
+
+# Completions shown per page
+PAGE_SIZE = 20
+
+
+def _page_selector(total, key):
+    """Return the offset of the page chosen by the user."""
+    pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+    if pages == 1:
+        return 0
+    page = st.number_input(
+        f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=key
+    )
+    return (page - 1) * PAGE_SIZE
+
+
+def _render_completion(filename, data):
+    """Render one saved completion with its rename and delete controls."""
+    # Get friendly display name for the expander
+    friendly_name = get_friendly_completion_name(filename)
+
+    with st.expander(f"{friendly_name}"):
+        # Display completion details with formatted timestamp
+        timestamp = data.get("timestamp", "N/A")
+        formatted_time = format_timestamp(timestamp)
+
+        # Create two columns for metadata to improve organization
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown(f"**Timestamp:** {formatted_time}")
+            st.markdown(f"**Model:** {data.get('model', 'N/A')}")
+            if data.get("data_files"):
+                st.markdown(f"**Quotes:** {', '.join(data['data_files'])}")
+            else:
+                for number in (1, 2):
+                    name = data.get(f"data_file{number}", "N/A")
+                    version = data.get(f"data_file{number}_version")
+                    if version:
+                        name = f"{name} (version {version})"
+                    st.markdown(f"**Quote {number}:** {name}")
+
+        with col2:
+            # Add temperature and max_tokens metadata
+            st.markdown(f"**Temperature:** {data.get('temperature', 'N/A')}")
+            st.markdown(f"**Max Tokens:** {data.get('max_tokens', 'N/A')}")
+            if data.get("updated_from"):
+                st.markdown(f"**Updated from:** {data['updated_from']}")
+
+        # Use tabs instead of nested expanders
+        content_tabs = st.tabs(["Completion Result", "System Message", "User Prompt"])
+
+        with content_tabs[0]:
+            st.markdown(data.get("completion", "No completion data available"))
+
+        with content_tabs[1]:
+            # Add unique key for system message text area
+            st.text_area(
+                "System Message",
+                data.get("system_message", ""),
+                height=100,
+                disabled=True,
+                key=f"system_msg_{filename}",
+            )
+
+        with content_tabs[2]:
+            # The prompt holds the documents, so send a preview unless asked
+            user_prompt = data.get("user_prompt", "")
+            show_full_prompt = len(user_prompt) > PREVIEW_CHARS and st.checkbox(
+                f"Show the full prompt ({len(user_prompt):,} characters)",
+                key=f"full_prompt_{filename}",
+            )
+            # A keyed widget keeps its value, so each mode needs its own key
+            mode = "full" if show_full_prompt else "preview"
+            st.text_area(
+                "User Prompt",
+                (
+                    user_prompt
+                    if show_full_prompt
+                    else truncate_text(user_prompt, PREVIEW_CHARS)
+                ),
+                height=100,
+                disabled=True,
+                key=f"user_prompt_{filename}_{mode}",
+            )
+
+        # Rename and delete functionality
+        st.markdown("---")
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            new_name = st.text_input(
+                f"New name for {filename}", key=f"new_name_{filename}"
+            )
+        with col2:
+            if st.button("Rename", key=f"rename_{filename}"):
+                if new_name:
+                    success, message = rename_completion(filename, new_name)
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
+                else:
+                    st.error("Please provide a new name")
+        with col3:
+            if st.button("🗑️ Delete", key=f"delete_{filename}"):
+                success, message = delete_completion(filename)
+                if success:
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error(message)
 
 
 def render(_):
@@ -20,87 +140,35 @@ def render(_):
         st.info("No saved completions found.")
         return
 
+    query = st.text_input(
+        "🔍 Search completions",
+        placeholder='e.g. flood excess, "accidental damage", cover*',
+        help="Searches completion text, system messages, names and data files.",
+    )
+
+    if query.strip():
+        start = time.perf_counter()
+        total = count_matches(query)
+        offset = _page_selector(total, key=f"search_page_{query}")
+        results = search_completions(query, limit=PAGE_SIZE, offset=offset)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.info(f"Found {total} matching completions ({elapsed_ms:.0f} ms).")
+        for result in results:
+            data = fresh_completions.get(result["filename"])
+            if data is None:
+                continue
+            st.markdown(result["snippet"])
+            _render_completion(result["filename"], data)
+        return
+
     st.info(f"Found {len(fresh_completions)} saved completions.")
 
     # Display completions
-    for filename, data in sorted(
+    ordered = sorted(
         fresh_completions.items(),
         key=lambda x: x[1].get("timestamp", ""),
         reverse=True,
-    ):
-        # Get friendly display name for the expander
-        friendly_name = get_friendly_completion_name(filename)
-
-        with st.expander(f"{friendly_name}"):
-            # Display completion details with formatted timestamp
-            timestamp = data.get("timestamp", "N/A")
-            formatted_time = format_timestamp(timestamp)
-
-            # Create two columns for metadata to improve organization
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.markdown(f"**Timestamp:** {formatted_time}")
-                st.markdown(f"**Model:** {data.get('model', 'N/A')}")
-                st.markdown(f"**Quote 1:** {data.get('data_file1', 'N/A')}")
-                st.markdown(f"**Quote 2:** {data.get('data_file2', 'N/A')}")
-
-            with col2:
-                # Add temperature and max_tokens metadata
-                st.markdown(f"**Temperature:** {data.get('temperature', 'N/A')}")
-                st.markdown(f"**Max Tokens:** {data.get('max_tokens', 'N/A')}")
-
-            # Use tabs instead of nested expanders
-            content_tabs = st.tabs(
-                ["Completion Result", "System Message", "User Prompt"]
-            )
-
-            with content_tabs[0]:
-                st.markdown(data.get("completion", "No completion data available"))
-
-            with content_tabs[1]:
-                # Add unique key for system message text area
-                st.text_area(
-                    "System Message",
-                    data.get("system_message", ""),
-                    height=100,
-                    disabled=True,
-                    key=f"system_msg_{filename}",
-                )
-
-            with content_tabs[2]:
-                # Add unique key for user prompt text area
-                st.text_area(
-                    "User Prompt",
-                    data.get("user_prompt", ""),
-                    height=100,
-                    disabled=True,
-                    key=f"user_prompt_{filename}",
-                )
-
-            # Rename and delete functionality
-            st.markdown("---")
-            col1, col2, col3 = st.columns([3, 1, 1])
-            with col1:
-                new_name = st.text_input(
-                    f"New name for {filename}", key=f"new_name_{filename}"
-                )
-            with col2:
-                if st.button("Rename", key=f"rename_{filename}"):
-                    if new_name:
-                        success, message = rename_completion(filename, new_name)
-                        if success:
-                            st.success(message)
-                            st.rerun()
-                        else:
-                            st.error(message)
-                    else:
-                        st.error("Please provide a new name")
-            with col3:
-                if st.button("🗑️ Delete", key=f"delete_{filename}"):
-                    success, message = delete_completion(filename)
-                    if success:
-                        st.success(message)
-                        st.rerun()
-                    else:
-                        st.error(message)
+    )
+    offset = _page_selector(len(ordered), key="history_page")
+    for filename, data in ordered[offset : offset + PAGE_SIZE]:
+        _render_completion(filename, data)
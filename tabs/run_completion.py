@@ -2,12 +2,165 @@
 
 import json
 import os
+from concurrent.futures import wait
 import streamlit as st
-from utils.openai_helpers import get_completion, setup_client
-from utils.file_helpers import save_completion
-from utils.constants import COMPLETIONS_DIR
-from utils.document_extraction import extract_text
+from utils.openai_helpers import (
+    get_completion_result,
+    get_model_id,
+    get_prompt_layout,
+    setup_client,
+)
+from utils.file_helpers import load_completions, save_completion
+from utils.constants import COMPLETIONS_DIR, PREVIEW_CHARS
+from utils.formatting import truncate_text
+from utils.text_store import get_text, put_text
+from utils.tokens import count_tokens
+from utils.document_extraction import DocumentTooLargeError
 from utils.document_extraction import is_document_intelligence_available
+from utils.document_versions import (
+    INCREMENTAL_MAX_CHANGED_SHARE,
+    build_incremental_prompt,
+    changed_share,
+    document_changes,
+    find_previous_completion,
+)
+from utils.prefetch import prefetch_document
+
+# How long the page waits for selected documents before showing them as pending
+PREFETCH_WAIT_SECONDS = 0.3
+
+
+def _resolve_completion_data(completion_data):
+    """Return completion data with its stored text handles replaced by the texts."""
+    texts = {}
+    for field in ("system_message", "user_prompt"):
+        texts[field] = get_text(completion_data[f"{field}_handle"])
+        if texts[field] is None:
+            return None
+    return {
+        **texts,
+        **{k: v for k, v in completion_data.items() if not k.endswith("_handle")},
+    }
+
+
+def _save_completion_data(completion_data):
+    """Save completion data from session state; return the filename or None."""
+    data = _resolve_completion_data(completion_data)
+    if data is None:
+        st.error("The prompt of this completion has expired. Please run it again.")
+        return None
+    return save_completion(data)
+
+
+def _render_document_preview(file_path, future):
+    """Show a selected document's type, token count and content preview.
+
+    future is the document's background extraction; the preview is left out until
+    it has finished rather than blocking the page.
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    details = f"File type: {file_ext[1:].upper()}"
+    if future.done() and not future.exception():
+        details += f", {future.result()['tokens']:,} tokens"
+    st.caption(details)
+
+    # For JSON files, show the parsed content
+    if file_ext == ".json":
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                st.json(json.load(f), expanded=False)
+        except json.JSONDecodeError as e:
+            st.error(f"Error parsing JSON: {str(e)}")
+    # For other files, show preview in expander
+    else:
+        with st.expander("Preview content"):
+            if not future.done():
+                st.caption("Extracting in the background...")
+            elif isinstance(future.exception(), DocumentTooLargeError):
+                st.error(str(future.exception()))
+            elif not future.exception():
+                st.markdown(
+                    truncate_text(future.result()["text"], 1000),
+                    unsafe_allow_html=True,
+                )
+
+
+def _load_documents(prepared, data_file1, data_file2):
+    """Return the texts of both documents, waiting for their extraction."""
+    try:
+        return (
+            prepared[data_file1].result()["text"],
+            prepared[data_file2].result()["text"],
+        )
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        st.error(f"Error loading data files: {str(e)}")
+        return "", ""
+
+
+def _find_revision(data_files, prepared, selected, quotes):
+    """Return the update of the latest saved comparison of the selected documents.
+
+    selected and quotes are the names and texts of Quote 1 and Quote 2, which must
+    both have been extracted. Returns None unless a saved comparison was made on
+    earlier versions of them.
+    """
+    filename, previous = find_previous_completion(load_completions(), *selected)
+    if previous is None:
+        return None
+    versions = tuple(prepared[name].result()["version"] for name in selected)
+    updates = []
+    share = 0.0
+    for number, (name, text) in enumerate(zip(selected, quotes), start=1):
+        old_version = previous[f"data_file{number}_version"]
+        new_version = versions[number - 1]
+        if old_version == new_version:
+            continue
+        changes = document_changes(data_files[name], old_version, text)
+        if changes is None:
+            return None  # The version history of the document was lost
+        if changes:
+            updates.append((f"Quote {number}", name, old_version, new_version, changes))
+            share = max(share, changed_share(changes, text))
+    if not updates:
+        return None
+    return {
+        "filename": filename,
+        "previous": previous,
+        "prompt": build_incremental_prompt(previous["completion"], updates),
+        "versions": versions,
+        "changed_share": share,
+    }
+
+
+def _show_result(result, completion_data, save_completion_history):
+    """Keep a completion in session state, show it and save it if enabled."""
+    st.session_state.completion_data = completion_data
+    st.session_state.completion_generated = True
+
+    # Display completion
+    st.subheader("Completion Result")
+    usage = result["usage"]
+    if usage:
+        st.caption(
+            f"{usage['prompt_tokens']} prompt tokens "
+            f"({usage['cached_tokens']} cached), "
+            f"{usage['completion_tokens']} completion tokens, "
+            f"{result['latency_seconds']:.1f}s"
+        )
+    st.markdown(result["completion"])
+
+    # Save completion with model information only if enabled
+    if save_completion_history:
+        filename = _save_completion_data(completion_data)
+        if filename:
+            st.success(f"Completion saved to {COMPLETIONS_DIR}/{filename}")
+
+
+@st.fragment(run_every=1)
+def _rerun_when_ready(futures):
+    """Rerun the page once the background extractions have finished."""
+    if all(future.done() for future in futures):
+        st.rerun()
 
 
 def render(
@@ -46,7 +199,7 @@ def render(
 
     # Updated supported formats to include all Document Intelligence formats
     st.markdown(
-        "Supported formats: **PDF**, **JPEG**, **JPG**, **PNG**, **BMP**, **TIFF**, **DOCX**, **XLSX**, **PPTX**, **HTML**, **TXT**, **JSON**"
+        "Supported formats: **PDF**, **JPEG**, **JPG**, **PNG**, **BMP**, **TIFF**, **TIF**, **DOCX**, **XLSX**, **PPTX**, **HTML**, **TXT**, **JSON**"
     )
 
     # Document Processing Options moved here
@@ -71,32 +224,6 @@ def render(
         data_file1 = st.selectbox(
             "Select Quote 1 Document", data_file_keys, key="data1"
         )
-        # Display file content based on file type
-        if data_file1 in data_files:
-            file_path = data_files[data_file1]
-            file_ext = os.path.splitext(file_path)[1].lower()
-
-            st.caption(f"File type: {file_ext[1:].upper()}")
-
-            # For JSON files, show the parsed content
-            if file_ext == ".json":
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        quote1_data = json.load(f)
-                    st.json(quote1_data, expanded=False)
-                except json.JSONDecodeError as e:
-                    st.error(f"Error parsing JSON: {str(e)}")
-            # For other files, show preview in expander
-            else:
-                with st.expander("Preview content"):
-                    # Pass the use_document_intelligence flag to extract_text for previews
-                    content = extract_text(
-                        file_path, use_document_intelligence=use_document_intelligence
-                    )
-                    st.markdown(
-                        content[:1000] + ("..." if len(content) > 1000 else ""),
-                        unsafe_allow_html=True,
-                    )
 
     with col2:
         # Set default index to 1 (second file) if multiple files exist, otherwise 0
@@ -109,32 +236,25 @@ def render(
             index=default_index,
             key="data2",
         )
-        # Display file content based on file type
+
+    # Start extracting the selected documents in the background right away, so
+    # they are ready by the time the prompt is edited and the completion is run
+    prepared = {
+        name: prefetch_document(data_files[name], use_document_intelligence)
+        for name in (data_file1, data_file2)
+        if name in data_files
+    }
+    # Cached documents are ready almost at once; wait briefly for them so only
+    # real extractions show as pending
+    wait(prepared.values(), timeout=PREFETCH_WAIT_SECONDS)
+
+    with col1:
+        if data_file1 in data_files:
+            _render_document_preview(data_files[data_file1], prepared[data_file1])
+
+    with col2:
         if data_file2 in data_files:
-            file_path = data_files[data_file2]
-            file_ext = os.path.splitext(file_path)[1].lower()
-
-            st.caption(f"File type: {file_ext[1:].upper()}")
-
-            # For JSON files, show the parsed content
-            if file_ext == ".json":
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        quote2_data = json.load(f)
-                    st.json(quote2_data, expanded=False)
-                except json.JSONDecodeError as e:
-                    st.error(f"Error parsing JSON: {str(e)}")
-            # For other files, show preview in expander
-            else:
-                with st.expander("Preview content"):
-                    # Pass the use_document_intelligence flag to extract_text for previews
-                    content = extract_text(
-                        file_path, use_document_intelligence=use_document_intelligence
-                    )
-                    st.markdown(
-                        content[:1000] + ("..." if len(content) > 1000 else ""),
-                        unsafe_allow_html=True,
-                    )
+            _render_document_preview(data_files[data_file2], prepared[data_file2])
 
     # SYSTEM MESSAGE SECTION (collapsed by default)
     st.subheader("2. Configure Prompt")
@@ -160,30 +280,44 @@ def render(
             "Edit User Prompt Template", user_prompt_template, height=200
         )
 
-    # Load data files using the document extraction functionality
+    # Use the extracted documents if they are ready; otherwise the page reruns
+    # when they are, and running the completion waits for them
     quote1 = ""
     quote2 = ""
-    if data_files and data_file1 in data_files and data_file2 in data_files:
-        try:
-            quote1 = extract_text(
-                data_files[data_file1],
-                use_document_intelligence=use_document_intelligence,
-            )
-            quote2 = extract_text(
-                data_files[data_file2],
-                use_document_intelligence=use_document_intelligence,
-            )
-        except Exception as e:
-            st.error(f"Error loading data files: {str(e)}")
+    documents_loaded = False
+    if data_file1 in prepared and data_file2 in prepared:
+        if all(future.done() for future in prepared.values()):
+            quote1, quote2 = _load_documents(prepared, data_file1, data_file2)
+            documents_loaded = True
+        else:
+            st.info("Extracting the selected documents in the background...")
+            _rerun_when_ready(list(prepared.values()))
+
+    documents_first = st.checkbox(
+        "Send documents before the prompt (prompt caching)",
+        value=get_prompt_layout() == "documents_first",
+        help="Sends the system message and each document as separate messages ahead "
+        "of the user prompt, so repeated runs on the same documents reuse Azure "
+        "OpenAI's prompt cache and are faster and cheaper.",
+    )
+    layout = "documents_first" if documents_first else "inline"
 
     # Format user prompt with data
     formatted_user_prompt = user_prompt_editor.format(quote1=quote1, quote2=quote2)
 
-    # Display formatted user prompt
+    # Display formatted user prompt; only a preview is sent to the browser unless
+    # the full prompt is requested, as it contains both documents
     with st.expander("View Formatted User Prompt", expanded=False):
+        show_full_prompt = len(formatted_user_prompt) > PREVIEW_CHARS and st.checkbox(
+            f"Show the full prompt ({len(formatted_user_prompt):,} characters)"
+        )
         st.text_area(
             "Formatted User Prompt",
-            formatted_user_prompt,
+            (
+                formatted_user_prompt
+                if show_full_prompt
+                else truncate_text(formatted_user_prompt, PREVIEW_CHARS)
+            ),
             height=200,
             disabled=True,
         )
@@ -200,6 +334,37 @@ def render(
             "Completion history saving is disabled. Results will not be saved automatically."
         )
 
+    # Offer to update the last saved comparison of these documents if they were
+    # revised since, sending only the changed sections
+    revision = None
+    if documents_loaded and not any(f.exception() for f in prepared.values()):
+        revision = _find_revision(
+            data_files, prepared, (data_file1, data_file2), (quote1, quote2)
+        )
+    update_button_clicked = False
+    if revision:
+        st.info(
+            f"The selected quotes were revised since the comparison saved in "
+            f"{revision['filename']}. It can be updated with the changed sections "
+            f"only: about {count_tokens(revision['prompt']):,} prompt tokens instead "
+            f"of {count_tokens(formatted_user_prompt):,}."
+        )
+        if revision["changed_share"] > INCREMENTAL_MAX_CHANGED_SHARE:
+            st.warning(
+                "Most of a quote changed in this revision; a full comparison is "
+                "advised."
+            )
+        with st.expander("View the changes", expanded=False):
+            st.text_area(
+                "Update prompt",
+                truncate_text(revision["prompt"], PREVIEW_CHARS),
+                height=200,
+                disabled=True,
+            )
+        update_button_clicked = st.button(
+            "Update the saved comparison", use_container_width=True
+        )
+
     run_button_clicked = st.button(
         "Run Completion", type="primary", use_container_width=True
     )
@@ -208,55 +373,93 @@ def render(
         if not selected_model and not deployment_name:
             st.error("Please select a model or provide a deployment name")
         else:
+            if not documents_loaded and prepared:
+                with st.spinner("Waiting for the documents to be extracted..."):
+                    quote1, quote2 = _load_documents(prepared, data_file1, data_file2)
+                formatted_user_prompt = user_prompt_editor.format(
+                    quote1=quote1, quote2=quote2
+                )
             with st.spinner("Getting completion from Azure OpenAI..."):
                 # Get the model ID for specific models
-                model_id = None
-                for model in available_models:
-                    if model["name"] == selected_model and model["type"] == "specific":
-                        model_id = model["id"]
+                model_id = get_model_id(available_models, selected_model)
 
                 # Setup client with model-specific credentials if available
                 client = setup_client(model_id)
                 if client:
                     # Get completion using selected model
-                    completion = get_completion(
+                    result = get_completion_result(
                         client=client,
                         deployment_name=deployment_name if deployment_name else None,
                         system_message=system_message_editor,
-                        user_prompt=formatted_user_prompt,
+                        user_prompt=user_prompt_editor,
                         temperature=temperature,
                         max_tokens=max_tokens,
                         model_name=model_id,
+                        documents={"quote1": quote1, "quote2": quote2},
+                        layout=layout,
                     )
-
-                    # Store the completion data in session state
-                    st.session_state.completion_data = {
-                        "system_message": system_message_editor,
-                        "user_prompt": formatted_user_prompt,
-                        "completion": completion,
+                    # Store the completion data in session state, with handles
+                    # to the shared text store instead of the long prompts
+                    completion_data = {
+                        "system_message_handle": put_text(system_message_editor),
+                        "user_prompt_handle": put_text(formatted_user_prompt),
+                        "completion": result["completion"],
                         "data_file1": data_file1,
                         "data_file2": data_file2,
                         "temperature": temperature,
                         "max_tokens": max_tokens,
                         "model": selected_model,
+                        "latency_seconds": result["latency_seconds"],
+                        "usage": result["usage"],
+                        "layout": layout,
                     }
-                    st.session_state.completion_generated = True
-
-                    # Display completion
-                    st.subheader("Completion Result")
-                    st.markdown(completion)
+                    # The document versions let a later revision update it
+                    for number, name in enumerate((data_file1, data_file2), 1):
+                        if name in prepared and not prepared[name].exception():
+                            completion_data[f"data_file{number}_version"] = prepared[
+                                name
+                            ].result()["version"]
+                    _show_result(result, completion_data, save_completion_history)
 
-                    # Save completion with model information only if enabled
-                    if save_completion_history:
-                        filename = save_completion(st.session_state.completion_data)
-                        st.success(f"Completion saved to {COMPLETIONS_DIR}/{filename}")
+    if update_button_clicked:
+        with st.spinner("Updating the saved comparison..."):
+            model_id = get_model_id(available_models, selected_model)
+            client = setup_client(model_id)
+            if client:
+                previous = revision["previous"]
+                result = get_completion_result(
+                    client=client,
+                    deployment_name=deployment_name if deployment_name else None,
+                    system_message=previous["system_message"],
+                    user_prompt=revision["prompt"],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    model_name=model_id,
+                )
+                completion_data = {
+                    "system_message_handle": put_text(previous["system_message"]),
+                    "user_prompt_handle": put_text(revision["prompt"]),
+                    "completion": result["completion"],
+                    "data_file1": data_file1,
+                    "data_file2": data_file2,
+                    "data_file1_version": revision["versions"][0],
+                    "data_file2_version": revision["versions"][1],
+                    "updated_from": revision["filename"],
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "model": selected_model,
+                    "latency_seconds": result["latency_seconds"],
+                    "usage": result["usage"],
+                }
+                _show_result(result, completion_data, save_completion_history)
 
     # Show manual save button if completiSSon was generated and auto-save is disabled
     if st.session_state.completion_generated and not save_completion_history:
         if st.button(
             "💾 Save This Completion", type="secondary", key="manual_save_button"
         ):
-            filename = save_completion(st.session_state.completion_data)
-            st.success(f"Completion manually saved to {COMPLETIONS_DIR}/{filename}")
+            filename = _save_completion_data(st.session_state.completion_data)
+            if filename:
+                st.success(f"Completion manually saved to {COMPLETIONS_DIR}/{filename}")
             # Reset the completion generated flag to avoid double saves
             st.session_state.completion_generated = False
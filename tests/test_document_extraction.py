@@ -0,0 +1,28 @@
+"""Tests for utils.document_extraction."""
+
+import html2text
+
+from utils.document_extraction import READ_CHUNK_SIZE, iter_html
+
+
+def _handle(html):
+    h = html2text.HTML2Text()
+    h.body_width = 0
+    return h.handle(html)
+
+
+def test_html_matches_handle_past_chunk_size(tmp_path):
+    head = "<html><body><h1>Quote</h1>\n"
+    filler = "<p>Cover details &amp; conditions apply.</p>\n"
+    html = head + filler * ((READ_CHUNK_SIZE - len(head) - 100) // len(filler))
+    # Split a numbered-list-like line, which html2text escapes as "12\.", across
+    # the first READ_CHUNK_SIZE characters
+    html += " " * (READ_CHUNK_SIZE - len(html) - len("<p>12")) + "<p>12"
+    html += ". Buildings cover up to £500,000</p>\n" + filler * 10 + "</body></html>"
+    path = tmp_path / "quote.html"
+    path.write_text(html, encoding="utf-8")
+
+    text = "".join(iter_html(str(path)))
+
+    assert text == _handle(html)
+    assert "12\\. Buildings cover" in text
@@ -0,0 +1,49 @@
+"""Tests for utils.image_preprocessing."""
+
+import io
+
+import pytest
+from PIL import Image, ImageDraw, ImageSequence
+
+from utils.image_preprocessing import preprocess_image
+
+
+def _page(mode, color, text):
+    page = Image.new(mode, (800, 600), color)
+    ImageDraw.Draw(page).text((10, 10), text, fill=0)
+    return page
+
+
+@pytest.fixture
+def mixed_tiff(tmp_path):
+    """A scan whose first page is bilevel and whose later pages are not."""
+    path = tmp_path / "mixed.tif"
+    pages = [_page("1", 1, "bilevel"), _page("L", 200, "grey")]
+    pages.append(_page("RGB", (200, 100, 50), "color"))
+    pages[0].save(path, save_all=True, append_images=pages[1:])
+    return str(path)
+
+
+@pytest.mark.parametrize("grayscale", ["true", "false"])
+def test_mixed_mode_tiff(mixed_tiff, monkeypatch, grayscale):
+    monkeypatch.setenv("DOCUMENT_INTELLIGENCE_GRAYSCALE", grayscale)
+    image_bytes, stats = preprocess_image(mixed_tiff)
+
+    assert image_bytes is not None
+    assert stats["pages"] == 3
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        modes = [frame.mode for frame in ImageSequence.Iterator(image)]
+    assert modes[0] == "1"
+    assert len(modes) == 3
+
+
+def test_encoder_error_uploads_original(mixed_tiff, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("encoder error -2 when writing image file")
+
+    monkeypatch.setattr(Image.Image, "save", fail)
+    image_bytes, stats = preprocess_image(mixed_tiff)
+
+    assert image_bytes is None
+    assert stats["uploaded_bytes"] == stats["original_bytes"]
+    assert stats["bytes_saved"] == 0
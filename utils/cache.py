@@ -0,0 +1,79 @@
+"""Content-addressed disk cache shared by the app, the ingestion worker and the CLIs.
+
+Entries are JSON documents stored under ``CACHE_DIR/<namespace>/<key[:2]>/<key>.json``
+and written atomically, so several processes can fill and read the cache at once.
+Keys are built from the content hash of the source file, so renaming or copying a
+document keeps its cache entries and editing it invalidates them.
+
+Set ``CACHE_ENABLED=false`` to bypass the cache.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+from utils.constants import CACHE_DIR
+
+# Size of the blocks hashed from files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def is_cache_enabled():
+    """Check if the disk cache is enabled."""
+    return os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+@functools.lru_cache(maxsize=1024)
+def _file_digest(path, mtime_ns, size):  # pylint: disable=unused-argument
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """Return the SHA-256 of a file's content, memoized by path, mtime and size."""
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def cache_key(*parts):
+    """Combine the parts that determine a cached value into one key."""
+    return hashlib.sha256(
+        "\x1f".join(str(part) for part in parts).encode("utf-8")
+    ).hexdigest()
+
+
+def _entry_path(namespace, key):
+    return os.path.join(CACHE_DIR, namespace, key[:2], f"{key}.json")
+
+
+def cache_get(namespace, key):
+    """Return the value stored for key, or None if there is none."""
+    if not is_cache_enabled():
+        return None
+    try:
+        with open(_entry_path(namespace, key), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def cache_put(namespace, key, value):
+    """Store a JSON-serializable value for key."""
+    if not is_cache_enabled():
+        return
+    path = _entry_path(namespace, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so readers never see a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,201 @@
+"""In-memory catalogs of the app's directories, kept current by watching the filesystem.
+
+Each catalog is built once per process and shared by every Streamlit session. It is
+kept up to date by filesystem events when ``watchdog`` is installed, and by a
+background polling thread otherwise (or when ``CATALOG_WATCH=poll``, e.g. on network
+mounts where inotify events are not delivered). Files are only re-read when their
+mtime or size changes, so looking up a catalog on a rerun costs a dictionary copy.
+"""
+
+import fnmatch
+import os
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional dependency, fall back to polling
+    FileSystemEventHandler = object
+    Observer = None
+
+
+class Catalog:
+    """Cache of the files in one directory matching a set of glob patterns.
+
+    loader(path) returns the value stored for a file; returning None leaves the file
+    out of the catalog (e.g. a completion that is not valid JSON yet).
+    """
+
+    def __init__(self, directory, patterns, loader, name_func=os.path.basename):
+        self.directory = directory
+        self.patterns = list(patterns)
+        self._loader = loader
+        self._name_func = name_func
+        self._entries = {}
+        self._view = None
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.scan()
+
+    def _pattern_index(self, path):
+        name = os.path.basename(path)
+        for index, pattern in enumerate(self.patterns):
+            if fnmatch.fnmatchcase(name, pattern):
+                return index
+        return None
+
+    def scan(self):
+        """Reconcile the catalog with the directory, reloading changed files only."""
+        os.makedirs(self.directory, exist_ok=True)
+        seen = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and self._pattern_index(entry.path) is not None:
+                    path = os.path.join(self.directory, entry.name)
+                    seen.add(path)
+                    self.refresh_path(path, entry.stat())
+        with self._lock:
+            removed = [path for path in self._entries if path not in seen]
+        for path in removed:
+            self.refresh_path(path)
+
+    def refresh_path(self, path, stat=None):
+        """Reload one file if its mtime or size changed, or drop it if it is gone."""
+        path = os.path.join(self.directory, os.path.basename(path))
+        if self._pattern_index(path) is None:
+            return
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+
+        with self._lock:
+            current = self._entries.get(path)
+            if stat is None:
+                if current is None:
+                    return
+                del self._entries[path]
+            else:
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if current is not None and current[0] == signature:
+                    return
+                try:
+                    value = self._loader(path)
+                except FileNotFoundError:
+                    value = None
+                if value is None:
+                    if current is None:
+                        return
+                    del self._entries[path]
+                else:
+                    self._entries[path] = (signature, value)
+            self._view = None
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            listener(path)
+
+    def subscribe(self, listener):
+        """Call listener(path) whenever a file is added, changed or removed."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def items(self):
+        """Return {name: value} ordered by pattern, then by name.
+
+        The dict is a copy but the values are shared with every caller, so they must
+        not be modified.
+        """
+        with self._lock:
+            if self._view is None:
+                ordered = sorted(
+                    self._entries.items(),
+                    key=lambda item: (
+                        self._pattern_index(item[0]),
+                        self._name_func(item[0]),
+                    ),
+                )
+                self._view = {
+                    self._name_func(path): value for path, (_, value) in ordered
+                }
+            return dict(self._view)
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, catalog):
+        super().__init__()
+        self._catalog = catalog
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path and os.path.dirname(os.path.abspath(path)) == os.path.abspath(
+                self._catalog.directory
+            ):
+                self._catalog.refresh_path(path)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+_observer = None
+_poll_thread = None
+
+
+def _use_polling():
+    return Observer is None or os.getenv("CATALOG_WATCH", "").lower() == "poll"
+
+
+def _poll_forever():
+    interval = float(os.getenv("CATALOG_POLL_INTERVAL", "2"))
+    while True:
+        time.sleep(interval)
+        with _catalogs_lock:
+            catalogs = list(_catalogs.values())
+        for catalog in catalogs:
+            try:
+                catalog.scan()
+            except OSError as e:
+                print(f"Error scanning {catalog.directory}: {str(e)}")
+
+
+def _watch(catalog):
+    global _observer, _poll_thread  # pylint: disable=global-statement
+    if not _use_polling():
+        try:
+            if _observer is None:
+                _observer = Observer()
+                _observer.daemon = True
+                _observer.start()
+            _observer.schedule(_EventHandler(catalog), catalog.directory)
+            return
+        except OSError as e:
+            print(f"File watching unavailable ({str(e)}). Falling back to polling.")
+    if _poll_thread is None:
+        _poll_thread = threading.Thread(
+            target=_poll_forever, name="catalog-poller", daemon=True
+        )
+        _poll_thread.start()
+
+
+def get_catalog(directory, patterns, loader, name_func=os.path.basename):
+    """Return the process-wide catalog for directory, building it on first use."""
+    key = os.path.abspath(directory)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = Catalog(directory, patterns, loader, name_func)
+            _catalogs[key] = catalog
+            _watch(catalog)
+        return catalog
+
+
+def refresh_catalog_path(path):
+    """Update whichever catalog covers path after the app itself wrote to it."""
+    key = os.path.abspath(os.path.dirname(path))
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+    if catalog is not None:
+        catalog.refresh_path(path)
@@ -4,7 +4,21 @@
 SYSTEM_MESSAGES_DIR = "system_messages"
 USER_PROMPTS_DIR = "user_prompts"
 DATA_DIR = "data"
+DOCUMENT_VERSIONS_DIR = f"{DATA_DIR}/.versions"
 COMPLETIONS_DIR = "completions"
+CASSETTES_DIR = "cassettes"
+EXPERIMENTS_DIR = "experiments"
+EXPORTS_DIR = "exports"
+CACHE_DIR = ".cache"
+SEARCH_INDEX_PATH = f"{CACHE_DIR}/search_index.sqlite3"
+EXTRACTION_POLICY_PATH = "extraction_policy.json"
+
+# Version of the local extractors' output; bump it when an extractor's output
+# changes to invalidate the text they cached
+EXTRACTOR_VERSION = "2"
+
+# Characters of long texts (prompts, documents) sent to the browser in previews
+PREVIEW_CHARS = 3000
 
 # pylint: disable=line-too-long
 # Default system message
@@ -54,10 +68,80 @@ Quote 2:
 {quote2}
 """
 
+# Version of the condensing prompts; bump it to invalidate cached condensed quotes
+CONDENSE_PROMPT_VERSION = "1"
+
+# System message used to condense each quote before an N-way comparison
+DEFAULT_CONDENSE_SYSTEM_MESSAGE = """You are an insurance analyst who extracts the facts of an insurance quote into a compact summary. Keep every figure exactly as written in the quote and do not add information that is not in it."""
+
+# Prompt used to condense each quote before an N-way comparison
+DEFAULT_CONDENSE_PROMPT = """Summarize the following insurance quote as a compact list with these headings:
+
+- Insurer and product
+- Premium (annual and monthly, if given)
+- Excesses
+- Cover and limits by section
+- Optional extras and benefits
+- Exclusions and conditions
+
+Quote:
+{quote}
+"""
+
+# System message for comparing several condensed quotes
+DEFAULT_MULTI_SYSTEM_MESSAGE = """You are an insurance advisor who helps customers compare several insurance quotes. Your goal is to assist the customer in making an informed decision based solely on the information provided in the quote summaries. Be objective and fact-based, and include all relevant differences, even if minor."""
+
+# Prompt for comparing several condensed quotes
+DEFAULT_MULTI_COMPARISON_PROMPT = """Compare the following {count} insurance quotes. Provide a table of their key features, rank them from best to worst value, and explain the key differences that determine the ranking.
+
+{quotes}
+"""
+
+# Version of the quote record schema and prompts; bump it to invalidate cached records
+QUOTE_RECORD_VERSION = "1"
+
+# System message used to extract a structured record from each quote
+DEFAULT_RECORD_SYSTEM_MESSAGE = """You are an insurance analyst who extracts the facts of an insurance quote into a structured record. Copy every amount from the quote as a plain number without currency symbols, and use null for anything the quote does not state."""
+
+# Prompt used to extract a structured record from each quote
+DEFAULT_RECORD_PROMPT = """Extract the following insurance quote into a JSON object with this schema. Excess amounts are the total excess for a claim (voluntary plus compulsory).
+
+Schema:
+{schema}
+
+Quote:
+{quote}
+"""
+
+# Prompt for the narrative summary of ranked quote records
+DEFAULT_RECORD_NARRATIVE_PROMPT = """The following {count} insurance quotes have been extracted into records and ranked by a weighted score (higher is better) on premium, excess and cover limits.
+
+Ranking:
+{ranking}
+
+Records:
+{records}
+
+Write a short summary for the customer explaining the ranking, the key differences between the quotes and any trade-offs the score does not capture. Do not repeat the full records.
+"""
+
+# Prompt for updating a saved comparison with the sections of revised quotes
+DEFAULT_INCREMENTAL_PROMPT = """One or both insurance quotes have been revised since the comparison below was written. The sections of the quotes that changed are listed under "Changes"; everything else in the quotes is the same.
+
+Update the comparison to reflect the changes and keep everything they do not affect. Return the complete updated comparison in the same format, followed by a short list of what changed in the revision.
+
+Previous comparison:
+{completion}
+
+Changes:
+{changes}
+"""
+
 ABOUT_THIS_APP = """
 This tool helps compare insurance quotes using AI. You can:
 
 - Compare two insurance quotes with customizable prompts
+- Compare and rank several quotes at once
 - Choose from different AI models and adjust settings
 - Create and manage your own system messages and prompts
 - Save completion results for future reference
@@ -1,18 +1,43 @@
-"""Functions for extracting text from various document types."""
+"""Functions for extracting text from various document types.
 
+Extraction backends (pypdf, lxml, html2text, pytesseract and the Azure Document
+Intelligence SDK) are imported on first use, so importing this module is cheap.
+
+When Document Intelligence is available, the extraction policy picks it or the
+local extractor per file type (see get_extraction_policy).
+
+Inputs are streamed rather than read whole, and text is produced as an iterator of
+chunks by iter_text, so memory per document stays bounded. HTML is the exception:
+html2text's output depends on the whole document, so it is converted in one pass.
+extract_text keeps the text of local files in the disk cache (utils/cache.py).
+Documents larger than DOCUMENT_MAX_SIZE_MB (default 50) are rejected and only the
+first DOCUMENT_MAX_PAGES pages (default 500) are extracted.
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import datetime
+import functools
+import importlib.util
+import io
+import json
+import logging
 import os
-import html2text
-from pypdf import PdfReader
-import docx
-
-# Add imports for Azure Document Intelligence
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import (
-    AnalyzeDocumentRequest,
-    DocumentContentFormat,
+import posixpath
+import re
+import shutil
+import time
+
+from utils.cache import cache_get, cache_key, cache_put, file_digest, is_cache_enabled
+from utils.constants import EXTRACTION_POLICY_PATH, EXTRACTOR_VERSION
+from utils.image_preprocessing import (
+    IMAGE_FORMATS,
+    is_preprocessing_enabled,
+    preprocess_image,
 )
 
+logger = logging.getLogger(__name__)
+
 # Document Intelligence supported file types
 DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS = [
     ".pdf",
@@ -21,12 +46,53 @@ DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS = [
     ".png",
     ".bmp",
     ".tiff",
+    ".tif",
     ".docx",
     ".xlsx",
     ".pptx",
     ".html",
 ]
 
+# Local extractors by file extension, filled in by @register_extractor.
+# Each extractor is a generator yielding chunks of text.
+EXTRACTORS = {}
+
+# Size of the blocks read from text files
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Backend used per file type when Document Intelligence is available: "local" or
+# "remote" (the default). Spreadsheet cells and slide text are read exactly and far
+# faster by the local extractors. benchmarks/extraction_backends.py measures both
+# backends and can write a policy file that overrides these defaults.
+DEFAULT_EXTRACTION_POLICY = {".xlsx": "local", ".pptx": "local"}
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when a document exceeds the configured size limit."""
+
+
+def get_document_limits():
+    """Return (max_bytes, max_pages) from the environment; 0 disables a limit."""
+    max_size_mb = float(os.getenv("DOCUMENT_MAX_SIZE_MB", "50"))
+    max_pages = int(os.getenv("DOCUMENT_MAX_PAGES", "500"))
+    return int(max_size_mb * 1024 * 1024), max_pages
+
+
+def is_url(file_path):
+    """Check if a document path is an http(s) URL rather than a local file."""
+    return file_path.startswith(("http://", "https://"))
+
+
+def register_extractor(*extensions):
+    """Register a local extractor generator for the given file extensions."""
+
+    def decorator(func):
+        for extension in extensions:
+            EXTRACTORS[extension] = func
+        return func
+
+    return decorator
+
 
 def is_document_intelligence_available():
     """Check if Azure Document Intelligence credentials are available."""
@@ -36,73 +102,285 @@ def is_document_intelligence_available():
 
 
 def extract_using_document_intelligence(file_path):
-    """Extract text from a document using Azure Document Intelligence."""
+    """Extract text from a document using Azure Document Intelligence.
+
+    Local files are streamed to the service instead of being read into memory,
+    and URLs are passed to the service to download itself.
+    """
+    from azure.core.credentials import AzureKeyCredential
+    from azure.ai.documentintelligence import DocumentIntelligenceClient
+    from azure.ai.documentintelligence.models import (
+        AnalyzeDocumentRequest,
+        DocumentContentFormat,
+    )
+    from utils.transport import get_document_intelligence_transport
+
     endpoint = os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
     api_key = os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_API_KEY")
+    _, max_pages = get_document_limits()
 
-    # Open the file in binary mode
-    with open(file_path, "rb") as f:
-        document_bytes = f.read()
+    client_kwargs = {}
+    transport = get_document_intelligence_transport()
+    if transport is not None:
+        client_kwargs["transport"] = transport
 
     document_intelligence_client = DocumentIntelligenceClient(
-        endpoint=endpoint, credential=AzureKeyCredential(api_key)
+        endpoint=endpoint, credential=AzureKeyCredential(api_key), **client_kwargs
     )
 
-    poller = document_intelligence_client.begin_analyze_document(
-        "prebuilt-layout",
-        AnalyzeDocumentRequest(bytes_source=document_bytes),
-        output_content_format=DocumentContentFormat.MARKDOWN,
-    )
+    analyze_kwargs = {
+        "output_content_format": DocumentContentFormat.MARKDOWN,
+        # Seconds between polls of the analyze operation (the SDK defaults to 1)
+        "polling_interval": float(
+            os.environ.get("DOCUMENT_INTELLIGENCE_POLLING_INTERVAL", "1")
+        ),
+    }
+    if max_pages:
+        analyze_kwargs["pages"] = f"1-{max_pages}"
+
+    file_extension = os.path.splitext(file_path)[1].lower()
+    preprocessing = None
+    start = time.perf_counter()
+    if is_url(file_path):
+        poller = document_intelligence_client.begin_analyze_document(
+            "prebuilt-layout",
+            AnalyzeDocumentRequest(url_source=file_path),
+            **analyze_kwargs,
+        )
+        result = poller.result()
+    else:
+        image_bytes = None
+        if file_extension in IMAGE_FORMATS and is_preprocessing_enabled():
+            image_bytes, preprocessing = preprocess_image(file_path)
 
-    result = poller.result()
+        # Stream the raw document instead of sending it base64 encoded in JSON
+        with (
+            io.BytesIO(image_bytes) if image_bytes else open(file_path, "rb")
+        ) as document:
+            poller = document_intelligence_client.begin_analyze_document(
+                "prebuilt-layout",
+                document,
+                content_type="application/octet-stream",
+                **analyze_kwargs,
+            )
+            result = poller.result()
+
+    if preprocessing:
+        logger.info(
+            "Document Intelligence %s: uploaded %d of %d bytes (%d saved, "
+            "%d duplicate pages dropped), preprocessing %s ms, analysis %.0f ms",
+            os.path.basename(file_path),
+            preprocessing["uploaded_bytes"],
+            preprocessing["original_bytes"],
+            preprocessing["bytes_saved"],
+            preprocessing["duplicate_pages"],
+            preprocessing["preprocess_ms"],
+            (time.perf_counter() - start) * 1000,
+        )
     return result.content
 
 
-def extract_text(file_path, use_document_intelligence=True):
-    """Extract text from various document types (PDF, HTML, TXT, DOCX, JSON)"""
-    file_extension = os.path.splitext(file_path)[1].lower()
+def check_document_size(file_path):
+    """Raise DocumentTooLargeError if a local file exceeds DOCUMENT_MAX_SIZE_MB."""
+    max_bytes, _ = get_document_limits()
+    if max_bytes and not is_url(file_path):
+        size = os.path.getsize(file_path)
+        if size > max_bytes:
+            raise DocumentTooLargeError(
+                f"{os.path.basename(file_path)} is {size / (1024 * 1024):.1f} MB, "
+                f"above the {max_bytes / (1024 * 1024):.0f} MB limit "
+                "(DOCUMENT_MAX_SIZE_MB)."
+            )
 
-    # Check if Document Intelligence should be used and is available
-    if use_document_intelligence and is_document_intelligence_available():
-        if file_extension in DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS:
-            try:
-                return extract_using_document_intelligence(file_path)
-            except Exception as e:
-                print(
-                    f"Document Intelligence failed: {str(e)}. Falling back to local processing."
-                )
-                # Continue to local processing methods
-
-    # Local processing methods
-    if file_extension == ".pdf":
-        return extract_from_pdf(file_path)
-    elif file_extension == ".html" or file_extension == ".htm":
-        return extract_from_html(file_path)
-    elif file_extension == ".txt":
-        return extract_from_txt(file_path)
-    elif file_extension == ".docx":
-        return extract_from_docx(file_path)
-    elif file_extension == ".json":
-        return extract_from_json(file_path)
+
+def _file_extension(file_path):
+    return os.path.splitext(file_path.split("?", 1)[0])[1].lower()
+
+
+@functools.lru_cache(maxsize=1)
+def is_ocr_available():
+    """Check if local OCR is installed: pytesseract and the tesseract program."""
+    return importlib.util.find_spec("pytesseract") is not None and bool(
+        shutil.which(os.getenv("TESSERACT_CMD", "tesseract"))
+    )
+
+
+def get_local_extractor(file_extension):
+    """Return the local extractor for a file extension, or None if there is none."""
+    if file_extension in IMAGE_FORMATS and not is_ocr_available():
+        return None
+    return EXTRACTORS.get(file_extension)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_policy_file(path, mtime_ns):  # pylint: disable=unused-argument
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_extraction_policy():
+    """Return {extension: "local" | "remote"} for Document Intelligence formats.
+
+    DEFAULT_EXTRACTION_POLICY is overridden by the EXTRACTION_POLICY_PATH file, if
+    it exists, and then by EXTRACTION_POLICY (e.g. "xlsx=local,pdf=remote").
+    """
+    policy = dict(DEFAULT_EXTRACTION_POLICY)
+    if os.path.exists(EXTRACTION_POLICY_PATH):
+        mtime_ns = os.stat(EXTRACTION_POLICY_PATH).st_mtime_ns
+        policy.update(_load_policy_file(EXTRACTION_POLICY_PATH, mtime_ns))
+    for item in os.getenv("EXTRACTION_POLICY", "").split(","):
+        if "=" in item:
+            extension, backend = (part.strip().lower() for part in item.split("=", 1))
+            policy["." + extension.lstrip(".")] = backend
+    return policy
+
+
+def get_extraction_backend(file_path, use_document_intelligence=True):
+    """Return "document-intelligence" or "local", the backend tried first."""
+    file_extension = _file_extension(file_path)
+    if (
+        not use_document_intelligence
+        or not is_document_intelligence_available()
+        or file_extension not in DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS
+    ):
+        return "local"
+    if (
+        get_extraction_policy().get(file_extension) == "local"
+        and not is_url(file_path)
+        and get_local_extractor(file_extension) is not None
+    ):
+        return "local"
+    return "document-intelligence"
+
+
+def _try_document_intelligence(file_path):
+    """Return the Document Intelligence text, or None if the service failed."""
+    try:
+        return extract_using_document_intelligence(file_path)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.warning(
+            "Document Intelligence failed: %s. Falling back to local processing.", e
+        )
+        return None
+
+
+def iter_local_text(file_path):
+    """Extract text from a document with the local extractors."""
+    if is_url(file_path):
+        raise ValueError("Extracting from a URL requires Azure Document Intelligence.")
+
+    file_extension = _file_extension(file_path)
+    extractor = get_local_extractor(file_extension)
+    if extractor is not None:
+        yield from extractor(file_path)
     elif file_extension in DOCUMENT_INTELLIGENCE_SUPPORTED_FORMATS:
-        return f"This file format ({file_extension}) requires Azure Document Intelligence, which is not available."
+        yield f"This file format ({file_extension}) requires Azure Document Intelligence, which is not available."
     else:
-        return f"Unsupported file type: {file_extension}"
+        yield f"Unsupported file type: {file_extension}"
+
+
+def iter_text(file_path, use_document_intelligence=True):
+    """Extract text from a document as an iterator of chunks.
+
+    Raises DocumentTooLargeError if the file exceeds DOCUMENT_MAX_SIZE_MB.
+    """
+    check_document_size(file_path)
+    if get_extraction_backend(file_path, use_document_intelligence) == (
+        "document-intelligence"
+    ):
+        text = _try_document_intelligence(file_path)
+        if text is not None:
+            yield text
+            return
+    yield from iter_local_text(file_path)
+
+
+def extraction_cache_key(file_path, backend):
+    """Return the disk cache key of a local file's text extracted by backend.
 
+    Local text is keyed by EXTRACTOR_VERSION too, so it is extracted again when the
+    extractors change; Document Intelligence text is kept.
+    """
+    _, max_pages = get_document_limits()
+    parts = [file_digest(file_path), backend, max_pages]
+    if backend == "local":
+        parts.append(EXTRACTOR_VERSION)
+    return cache_key(*parts)
 
-def extract_from_pdf(file_path):
-    """Extract text from PDF files."""
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n\n"
+
+def extract_document(file_path, use_document_intelligence=True):
+    """Extract text from a document; return (text, backend that produced it).
+
+    The backend is "local" when Document Intelligence failed and the local
+    extractors were used instead. Text extracted from local files is kept in the
+    disk cache, keyed by the file's content hash and the backend that produced it.
+    """
+    check_document_size(file_path)
+    backend = get_extraction_backend(file_path, use_document_intelligence)
+    use_cache = not is_url(file_path) and is_cache_enabled()
+    if use_cache:
+        cached = cache_get("extraction", extraction_cache_key(file_path, backend))
+        if cached is not None:
+            return cached["text"], backend
+
+    text = None
+    if backend == "document-intelligence":
+        text = _try_document_intelligence(file_path)
+    if text is None:
+        # Cache a fallback as local text so the service is retried next time
+        backend = "local"
+        text = "".join(iter_local_text(file_path))
+        if get_local_extractor(_file_extension(file_path)) is None:
+            # Only an "unsupported" notice; a later extractor may handle the file
+            return text, backend
+
+    if use_cache:
+        cache_put(
+            "extraction",
+            extraction_cache_key(file_path, backend),
+            {"text": text, "backend": backend, "source": os.path.basename(file_path)},
+        )
+    return text, backend
+
+
+def extract_text(file_path, use_document_intelligence=True):
+    """Extract text from various document types (PDF, HTML, TXT, Office, JSON, images)
+
+    Text extracted from local files is kept in the disk cache, keyed by the file's
+    content hash and the backend that produced it.
+    """
+    text, _ = extract_document(file_path, use_document_intelligence)
     return text
 
 
-def extract_from_html(file_path):
+def _read_chunks(file):
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+@register_extractor(".pdf")
+def iter_pdf(file_path):
+    """Extract text from PDF files, one page at a time."""
+    from pypdf import PdfReader
+
+    _, max_pages = get_document_limits()
+    # Passing an open file lets pypdf seek instead of copying the file into memory
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        for number, page in enumerate(reader.pages):
+            if max_pages and number >= max_pages:
+                yield f"[Truncated after {max_pages} pages (DOCUMENT_MAX_PAGES)]\n\n"
+                break
+            yield page.extract_text() + "\n\n"
+
+
+@register_extractor(".html", ".htm")
+def iter_html(file_path):
     """Extract text from HTML files."""
-    with open(file_path, "r", encoding="utf-8") as file:
-        html_content = file.read()
+    import html2text
 
     # Convert HTML to markdown to preserve structure
     h = html2text.HTML2Text()
@@ -111,54 +389,484 @@ def extract_from_html(file_path):
     h.ignore_tables = False
     h.body_width = 0  # No wrapping
 
-    markdown_text = h.handle(html_content)
-    return markdown_text
+    with open(file_path, "r", encoding="utf-8") as file:
+        yield h.handle(file.read())
 
 
-def extract_from_txt(file_path):
+@register_extractor(".txt")
+def iter_txt(file_path):
     """Extract text from TXT files."""
     with open(file_path, "r", encoding="utf-8") as file:
-        return file.read()
-
-
-def extract_from_docx(file_path):
-    """Extract text from DOCX files."""
-    doc = docx.Document(file_path)
-    text = ""
-
-    # Extract headers and preserve their level
-    for paragraph in doc.paragraphs:
-        if paragraph.style.name.startswith("Heading"):
-            level = paragraph.style.name.replace("Heading", "")
-            try:
-                level_num = int(level.strip())
-                text += "#" * level_num + " " + paragraph.text + "\n\n"
-            except ValueError:
-                text += paragraph.text + "\n\n"
-        else:
-            text += paragraph.text + "\n\n"
-
-    # Handle tables
-    for table in doc.tables:
-        text += "\n|"
-        for cell in table.rows[0].cells:
-            text += f" {cell.text} |"
-        text += "\n|"
-        for _ in table.rows[0].cells:
-            text += " --- |"
-        text += "\n"
-
-        for row in table.rows[1:]:
-            text += "|"
-            for cell in row.cells:
-                text += f" {cell.text} |"
-            text += "\n"
-        text += "\n"
+        yield from _read_chunks(file)
 
-    return text
+
+# WordprocessingML namespace and the tags read by iter_docx
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_RUN_TEXT = {
+    _W + "t": None,
+    _W + "tab": "\t",
+    _W + "ptab": "\t",
+    _W + "cr": "\n",
+    _W + "noBreakHyphen": "-",
+}
+
+# Size of the text blocks yielded by the DOCX and XLSX extractors
+OOXML_BLOCK_SIZE = 64 * 1024
+
+
+def _docx_heading_levels(archive):
+    """Map paragraph style ids to heading levels from word/styles.xml."""
+    from lxml import etree
+
+    levels = {}
+    try:
+        styles = etree.fromstring(archive.read("word/styles.xml"))
+    except KeyError:
+        return levels
+    for style in styles.iter(_W + "style"):
+        name = style.find(_W + "name")
+        if name is None:
+            continue
+        # Built-in headings are stored as "heading 1" and shown as "Heading 1"
+        match = re.fullmatch(r"[Hh]eading\s*(\d+)", name.get(_W + "val", "").strip())
+        if match:
+            levels[style.get(_W + "styleId")] = int(match.group(1))
+    return levels
+
+
+def _docx_run_text(run):
+    parts = []
+    for child in run:
+        if child.tag in _RUN_TEXT:
+            parts.append(
+                child.text or "" if child.tag == _W + "t" else _RUN_TEXT[child.tag]
+            )
+        elif child.tag == _W + "br":
+            # Line breaks become newlines; page and column breaks are dropped
+            if child.get(_W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+    return "".join(parts)
+
+
+def _docx_paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == _W + "r":
+            parts.append(_docx_run_text(child))
+        elif child.tag == _W + "hyperlink":
+            parts.extend(_docx_run_text(run) for run in child.iter(_W + "r"))
+    return "".join(parts)
+
+
+def _docx_int(element, path, default):
+    found = element.find(path)
+    return int(found.get(_W + "val")) if found is not None else default
+
+
+def _docx_table(table, out):
+    """Write a table as Markdown, resolving horizontally and vertically merged cells."""
+    above = {}
+    for number, row in enumerate(table.iterchildren(_W + "tr")):
+        cells = []
+        current = {}
+        column = _docx_int(row, f"{_W}trPr/{_W}gridBefore", 0)
+        for cell in row.iterchildren(_W + "tc"):
+            span = _docx_int(cell, f"{_W}tcPr/{_W}gridSpan", 1)
+            merge = cell.find(f"{_W}tcPr/{_W}vMerge")
+            if merge is not None and merge.get(_W + "val", "continue") == "continue":
+                # Continuation of a vertical merge repeats the cell above
+                text = above.get(column, "")
+            else:
+                text = "\n".join(
+                    _docx_paragraph_text(p) for p in cell.iterchildren(_W + "p")
+                )
+            for offset in range(span):
+                current[column + offset] = text
+                cells.append(text)
+            column += span
+        above = current
+
+        out.write("\n|" if number == 0 else "|")
+        for text in cells:
+            out.write(f" {text} |")
+        out.write("\n")
+        if number == 0:
+            out.write("|" + " --- |" * len(cells) + "\n")
+    out.write("\n")
+
+
+@register_extractor(".docx")
+def iter_docx(file_path):
+    """Extract text from DOCX files, keeping paragraphs and tables in document order.
+
+    The document XML is parsed incrementally and each top-level paragraph or table
+    is released once written, so time and memory stay linear in the document size.
+    """
+    import zipfile
+
+    from lxml import etree
+
+    body_tag = _W + "body"
+    out = io.StringIO()
+    with zipfile.ZipFile(file_path) as archive:
+        heading_levels = _docx_heading_levels(archive)
+        with archive.open("word/document.xml") as document:
+            for _, element in etree.iterparse(
+                document, events=("end",), tag=(_W + "p", _W + "tbl")
+            ):
+                parent = element.getparent()
+                if parent is None or parent.tag != body_tag:
+                    continue  # Nested in a table; written with the table
+
+                if element.tag == _W + "tbl":
+                    _docx_table(element, out)
+                else:
+                    style = element.find(f"{_W}pPr/{_W}pStyle")
+                    level = heading_levels.get(
+                        style.get(_W + "val") if style is not None else None
+                    )
+                    if level:
+                        out.write("#" * level + " ")
+                    out.write(_docx_paragraph_text(element))
+                    out.write("\n\n")
+
+                # Drop the processed element and everything before it
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+                if out.tell() >= OOXML_BLOCK_SIZE:
+                    yield out.getvalue()
+                    out = io.StringIO()
+    yield out.getvalue()
+
+
+# Namespaces of the package relationships, SpreadsheetML, PresentationML and
+# DrawingML parts read by iter_xlsx and iter_pptx
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+# Built-in SpreadsheetML number formats that display dates
+_XLSX_DATE_FORMATS = set(range(14, 23)) | set(range(45, 48))
+
+
+def _ooxml_relationships(archive, part):
+    """Return {relationship id: (target part, type)} of a part in an OOXML package."""
+    from lxml import etree
+
+    directory, name = posixpath.split(part)
+    rels_path = posixpath.join(directory, "_rels", f"{name}.rels")
+    if rels_path not in archive.namelist():
+        return {}
+    with archive.open(rels_path) as f:
+        root = etree.parse(f).getroot()
+    relationships = {}
+    for rel in root.iterchildren(_PKG_REL + "Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        target = (
+            target.lstrip("/")
+            if target.startswith("/")
+            else posixpath.normpath(posixpath.join(directory, target))
+        )
+        relationships[rel.get("Id")] = (target, rel.get("Type", ""))
+    return relationships
+
+
+def _table_cell(text):
+    return text.replace("|", "\\|").replace("\n", " ").strip()
+
+
+def _write_table_row(out, cells, header):
+    out.write("|")
+    for text in cells:
+        out.write(f" {_table_cell(text)} |")
+    out.write("\n")
+    if header:
+        out.write("|" + " --- |" * len(cells) + "\n")
+
+
+def _xlsx_shared_strings(archive):
+    from lxml import etree
+
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, item in etree.iterparse(f, events=("end",), tag=_S + "si"):
+            # Phonetic runs (rPh) hold pronunciation hints, not cell text
+            strings.append(
+                "".join(
+                    t.text or ""
+                    for t in item.iter(_S + "t")
+                    if t.getparent().tag != _S + "rPh"
+                )
+            )
+            item.clear()
+    return strings
+
+
+def _xlsx_date_styles(archive):
+    """Return the indexes of the cell styles that display numbers as dates."""
+    from lxml import etree
+
+    if "xl/styles.xml" not in archive.namelist():
+        return set()
+    with archive.open("xl/styles.xml") as f:
+        root = etree.parse(f).getroot()
+    date_formats = set(_XLSX_DATE_FORMATS)
+    for number_format in root.iter(_S + "numFmt"):
+        # Drop quoted text, [colors/conditions] and escapes before looking for d/m/y
+        code = re.sub(
+            r'"[^"]*"|\[[^\]]*\]|\\.', "", number_format.get("formatCode", "")
+        )
+        if re.search(r"[dmy]", code.lower()):
+            date_formats.add(int(number_format.get("numFmtId")))
+    cell_formats = root.find(_S + "cellXfs")
+    if cell_formats is None:
+        return set()
+    return {
+        index
+        for index, xf in enumerate(cell_formats.iterchildren(_S + "xf"))
+        if int(xf.get("numFmtId", "0")) in date_formats
+    }
+
+
+def _xlsx_column(reference):
+    column = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        column = column * 26 + ord(char.upper()) - ord("A") + 1
+    return column - 1
+
+
+def _xlsx_value(cell, shared_strings, date_styles, epoch):
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(_S + "t"))
+    value = cell.find(_S + "v")
+    if value is None or value.text is None:
+        return ""
+    if kind == "s":
+        return shared_strings[int(value.text)]
+    if kind == "b":
+        return "TRUE" if value.text == "1" else "FALSE"
+    if kind != "n":
+        return value.text
+    number = float(value.text)
+    if int(cell.get("s", "0")) in date_styles:
+        moment = epoch + datetime.timedelta(days=number)
+        return (
+            moment.date().isoformat()
+            if number.is_integer()
+            else moment.isoformat(sep=" ", timespec="minutes")
+        )
+    return f"{number:.15g}"
+
+
+@register_extractor(".xlsx", ".xlsm")
+def iter_xlsx(file_path):
+    """Extract text from XLSX files as one Markdown table per sheet.
+
+    Each sheet is parsed a row at a time and rows are released once written, so
+    large sheets stream in bounded memory. Cells hold the values last calculated by
+    the spreadsheet program, and date cells are written as ISO dates. Sheets count
+    as pages for DOCUMENT_MAX_PAGES.
+    """
+    import zipfile
+
+    from lxml import etree
+
+    _, max_pages = get_document_limits()
+    out = io.StringIO()
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("xl/workbook.xml") as f:
+            workbook = etree.parse(f).getroot()
+        properties = workbook.find(_S + "workbookPr")
+        epoch = (
+            datetime.datetime(1904, 1, 1)
+            if properties is not None and properties.get("date1904") in ("1", "true")
+            else datetime.datetime(1899, 12, 30)
+        )
+        relationships = _ooxml_relationships(archive, "xl/workbook.xml")
+        shared_strings = _xlsx_shared_strings(archive)
+        date_styles = _xlsx_date_styles(archive)
+
+        for number, sheet in enumerate(workbook.iter(_S + "sheet")):
+            if max_pages and number >= max_pages:
+                out.write(
+                    f"[Truncated after {max_pages} sheets (DOCUMENT_MAX_PAGES)]\n\n"
+                )
+                break
+            part, _ = relationships.get(sheet.get(_R + "id"), (None, None))
+            if part is None or part not in archive.namelist():
+                continue  # A chart sheet or a missing part
+
+            out.write(f"## {sheet.get('name')}\n\n")
+            width = None
+            with archive.open(part) as f:
+                for _, row in etree.iterparse(f, events=("end",), tag=_S + "row"):
+                    values = {}
+                    for position, cell in enumerate(row.iterchildren(_S + "c")):
+                        reference = cell.get("r")
+                        column = _xlsx_column(reference) if reference else position
+                        text = _xlsx_value(cell, shared_strings, date_styles, epoch)
+                        if text:
+                            values[column] = text
+
+                    # Drop the processed row and everything before it
+                    row.clear()
+                    while row.getprevious() is not None:
+                        del row.getparent()[0]
+
+                    if not values:
+                        continue
+                    cells = [
+                        values.get(column, "")
+                        for column in range(max(max(values) + 1, width or 0))
+                    ]
+                    _write_table_row(out, cells, header=width is None)
+                    width = width or len(cells)
+                    if out.tell() >= OOXML_BLOCK_SIZE:
+                        yield out.getvalue()
+                        out = io.StringIO()
+            out.write("\n")
+    yield out.getvalue()
+
+
+def _pptx_paragraphs(body):
+    """Return the text of the DrawingML paragraphs in a text body, one per line."""
+    lines = []
+    for paragraph in body.iter(_A + "p"):
+        text = "".join(
+            "\n" if child.tag == _A + "br" else child.findtext(_A + "t") or ""
+            for child in paragraph.iterchildren(_A + "r", _A + "fld", _A + "br")
+        )
+        if text.strip():
+            properties = paragraph.find(_A + "pPr")
+            level = int(properties.get("lvl", "0")) if properties is not None else 0
+            lines.append("  " * level + text)
+    return "\n".join(lines)
+
+
+def _pptx_table(table, out):
+    """Write a DrawingML table as Markdown, repeating the text of merged cells."""
+    above = {}
+    for number, row in enumerate(table.iterchildren(_A + "tr")):
+        cells = []
+        for column, cell in enumerate(row.iterchildren(_A + "tc")):
+            if cell.get("hMerge") in ("1", "true") and cells:
+                text = cells[-1]
+            elif cell.get("vMerge") in ("1", "true"):
+                text = above.get(column, "")
+            else:
+                body = cell.find(_A + "txBody")
+                text = _pptx_paragraphs(body) if body is not None else ""
+            cells.append(text)
+        above = dict(enumerate(cells))
+        _write_table_row(out, cells, header=number == 0)
+    out.write("\n")
+
+
+def _pptx_slide_text(root, out):
+    """Write the title, text boxes and tables of a slide; return the title."""
+    title = None
+    for element in root.iter(_P + "sp", _A + "tbl"):
+        if element.tag == _A + "tbl":
+            _pptx_table(element, out)
+            continue
+        body = element.find(_P + "txBody")
+        if body is None:
+            continue
+        text = _pptx_paragraphs(body)
+        placeholder = element.find(f"{_P}nvSpPr/{_P}nvPr/{_P}ph")
+        kind = placeholder.get("type") if placeholder is not None else None
+        if kind in ("title", "ctrTitle") and title is None:
+            title = text.replace("\n", " ")
+        elif text:
+            out.write(text + "\n\n")
+    return title
+
+
+@register_extractor(".pptx")
+def iter_pptx(file_path):
+    """Extract text from PPTX files, one slide at a time in presentation order.
+
+    Each slide is written as a heading with its title, followed by its text boxes,
+    tables and speaker notes.
+    """
+    import zipfile
+
+    from lxml import etree
+
+    _, max_pages = get_document_limits()
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("ppt/presentation.xml") as f:
+            presentation = etree.parse(f).getroot()
+        relationships = _ooxml_relationships(archive, "ppt/presentation.xml")
+
+        for number, slide_id in enumerate(presentation.iter(_P + "sldId"), start=1):
+            if max_pages and number > max_pages:
+                yield f"[Truncated after {max_pages} slides (DOCUMENT_MAX_PAGES)]\n\n"
+                break
+            part, _ = relationships.get(slide_id.get(_R + "id"), (None, None))
+            if part is None or part not in archive.namelist():
+                continue
+            with archive.open(part) as f:
+                slide = etree.parse(f).getroot()
+            body = io.StringIO()
+            title = _pptx_slide_text(slide, body)
+
+            notes = ""
+            for target, kind in _ooxml_relationships(archive, part).values():
+                if kind.endswith("/notesSlide") and target in archive.namelist():
+                    with archive.open(target) as f:
+                        notes_root = etree.parse(f).getroot()
+                    notes = "\n".join(
+                        _pptx_paragraphs(shape.find(_P + "txBody"))
+                        for shape in notes_root.iter(_P + "sp")
+                        if shape.find(f"{_P}nvSpPr/{_P}nvPr/{_P}ph[@type='body']")
+                        is not None
+                        and shape.find(_P + "txBody") is not None
+                    )
+
+            heading = f"## Slide {number}" + (f": {title}" if title else "")
+            text = f"{heading}\n\n{body.getvalue()}"
+            if notes.strip():
+                text += f"Notes:\n{notes}\n\n"
+            yield text
+
+
+@register_extractor(*IMAGE_FORMATS)
+def iter_image(file_path):
+    """Extract text from images with local OCR (pytesseract), one frame at a time.
+
+    Only used when is_ocr_available(). TESSERACT_CMD sets the tesseract program and
+    TESSERACT_LANG the languages (default eng).
+    """
+    import pytesseract
+    from PIL import Image, ImageSequence
+
+    if os.getenv("TESSERACT_CMD"):
+        pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_CMD")
+    language = os.getenv("TESSERACT_LANG", "eng")
+    _, max_pages = get_document_limits()
+    with Image.open(file_path) as image:
+        for number, frame in enumerate(ImageSequence.Iterator(image)):
+            if max_pages and number >= max_pages:
+                yield f"[Truncated after {max_pages} pages (DOCUMENT_MAX_PAGES)]\n\n"
+                break
+            yield pytesseract.image_to_string(frame.convert("L"), lang=language)
+            yield "\n\n"
 
 
-def extract_from_json(file_path):
+@register_extractor(".json")
+def iter_json(file_path):
     """Extract text from JSON files."""
     with open(file_path, "r", encoding="utf-8") as file:
-        return file.read()
+        yield from _read_chunks(file)
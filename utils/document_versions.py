@@ -0,0 +1,298 @@
+"""Version history of data files, with section-level hashes of each version.
+
+Each time a data file's content changes, its extracted text is split into sections
+and a new version listing their titles and hashes is appended to the file's history
+in DOCUMENT_VERSIONS_DIR. The section texts of each version are kept in the disk
+cache. Comparing the section hashes of two versions gives the sections that were
+changed, added or removed, so a revised quote can update a saved comparison by
+sending only those sections with the previous completion.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+
+from utils.cache import cache_get, cache_key, cache_put, file_digest
+from utils.constants import DEFAULT_INCREMENTAL_PROMPT, DOCUMENT_VERSIONS_DIR
+
+# Text without headings is cut into sections of at least SECTION_MIN_CHARS and at
+# most SECTION_MAX_CHARS, ending after about one in SECTION_BOUNDARY_ODDS lines
+SECTION_MIN_CHARS = 1000
+SECTION_MAX_CHARS = 6000
+SECTION_BOUNDARY_ODDS = 8
+
+# Share of a revision's text that may change before a full comparison is advised
+INCREMENTAL_MAX_CHANGED_SHARE = 0.5
+
+_HEADING = re.compile(r"^#{1,6}\s+(.*\S)")
+
+_lock = threading.Lock()
+
+
+def section_hash(text):
+    """Return the hash of a section's text, ignoring differences in whitespace."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def _heading_blocks(text):
+    """Split text into (title, lines) blocks at Markdown headings."""
+    title, lines = None, []
+    for line in text.splitlines(keepends=True):
+        match = _HEADING.match(line)
+        if match and any(existing.strip() for existing in lines):
+            yield title, lines
+            title, lines = None, []
+        if match and title is None:
+            title = match.group(1)
+        lines.append(line)
+    if any(line.strip() for line in lines):
+        yield title, lines
+
+
+def _cut_block(lines):
+    """Cut a long block into sections at content-defined line boundaries.
+
+    Whether a line ends a section depends on the line itself, not on its position,
+    so inserting or deleting text only moves the boundaries next to the edit.
+    """
+    sections, current, size = [], [], 0
+    for line in lines:
+        current.append(line)
+        size += len(line)
+        stripped = line.strip()
+        boundary = (
+            stripped
+            and zlib.crc32(stripped.encode("utf-8")) % SECTION_BOUNDARY_ODDS == 0
+        )
+        if size >= SECTION_MAX_CHARS or (size >= SECTION_MIN_CHARS and boundary):
+            sections.append("".join(current))
+            current, size = [], 0
+    if any(line.strip() for line in current):
+        sections.append("".join(current))
+    return sections
+
+
+def split_sections(text):
+    """Split extracted text into sections of {"title", "text", "hash", "chars"}.
+
+    Sections start at Markdown headings; long stretches without headings (such as
+    plain PDF text) are cut further.
+    """
+    sections = []
+    for title, lines in _heading_blocks(text):
+        block = "".join(lines)
+        parts = [block] if len(block) <= SECTION_MAX_CHARS else _cut_block(lines)
+        for number, part in enumerate(parts):
+            if title is None:
+                # The first line with words, skipping lines of JSON punctuation
+                part_title = next(
+                    (
+                        line.strip()
+                        for line in part.splitlines()
+                        if re.search(r"\w", line)
+                    ),
+                    "",
+                )[:80]
+            else:
+                part_title = title if number == 0 else f"{title} (continued)"
+            sections.append(
+                {
+                    "title": part_title,
+                    "text": part,
+                    "hash": section_hash(part),
+                    "chars": len(part),
+                }
+            )
+    return sections
+
+
+def _versions_path(file_path):
+    return os.path.join(DOCUMENT_VERSIONS_DIR, f"{os.path.basename(file_path)}.json")
+
+
+def load_versions(file_path):
+    """Return the recorded versions of a data file, oldest first."""
+    try:
+        with open(_versions_path(file_path), "r", encoding="utf-8") as f:
+            return json.load(f)["versions"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return []
+
+
+def get_version(file_path, number):
+    """Return a recorded version of a data file, or None if there is none."""
+    for version in load_versions(file_path):
+        if version["version"] == number:
+            return version
+    return None
+
+
+def _write_versions(file_path, versions):
+    path = _versions_path(file_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so readers never see a partial history
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {"file": os.path.basename(file_path), "versions": versions},
+                f,
+                indent=2,
+            )
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _section_texts_key(version):
+    return cache_key(version["digest"], version["backend"])
+
+
+def record_version(file_path, text, backend):
+    """Record the extracted text of a data file as a new version if it changed.
+
+    Returns the latest version: the new one, or the existing one if the file's
+    content is unchanged.
+    """
+    digest = file_digest(file_path)
+    with _lock:
+        versions = load_versions(file_path)
+        if versions and versions[-1]["digest"] == digest:
+            return versions[-1]
+
+        sections = split_sections(text)
+        version = {
+            "version": len(versions) + 1,
+            "digest": digest,
+            "backend": backend,
+            "recorded": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "sections": [
+                {key: section[key] for key in ("title", "hash", "chars")}
+                for section in sections
+            ],
+        }
+        cache_put(
+            "sections",
+            _section_texts_key(version),
+            {section["hash"]: section["text"] for section in sections},
+        )
+        try:
+            _write_versions(file_path, versions + [version])
+        except OSError as e:
+            print(f"Error recording version of {file_path}: {str(e)}")
+    return version
+
+
+def get_section_texts(version):
+    """Return {section hash: text} of a version, or {} if no longer cached."""
+    return cache_get("sections", _section_texts_key(version)) or {}
+
+
+def diff_sections(old_sections, new_sections):
+    """Return the changes between two lists of sections, in document order.
+
+    Each change is {"kind": "changed" | "added" | "removed", "old": [...],
+    "new": [...]} with the old and new sections involved.
+    """
+    matcher = difflib.SequenceMatcher(
+        a=[section["hash"] for section in old_sections],
+        b=[section["hash"] for section in new_sections],
+        autojunk=False,
+    )
+    kinds = {"replace": "changed", "insert": "added", "delete": "removed"}
+    return [
+        {
+            "kind": kinds[tag],
+            "old": old_sections[old_start:old_end],
+            "new": new_sections[new_start:new_end],
+        }
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def document_changes(file_path, since_version, text):
+    """Return the changes of a data file's text since one of its versions.
+
+    Returns None if the version is unknown. The old sections of the changes carry
+    their text when it is still cached.
+    """
+    version = get_version(file_path, since_version)
+    if version is None:
+        return None
+    old_texts = get_section_texts(version)
+    old_sections = [
+        {**section, "text": old_texts.get(section["hash"])}
+        for section in version["sections"]
+    ]
+    return diff_sections(old_sections, split_sections(text))
+
+
+def changed_share(changes, text):
+    """Return the share of a document's text that is in changed or added sections."""
+    changed = sum(section["chars"] for change in changes for section in change["new"])
+    return changed / len(text) if text else 0.0
+
+
+def format_changes(changes):
+    """Format the changes of one document as Markdown for a prompt."""
+    parts = []
+    for change in changes:
+        titles = "; ".join(
+            section["title"] for section in change["new"] or change["old"]
+        )
+        old_text = "".join(section.get("text") or "" for section in change["old"])
+        new_text = "".join(section["text"] for section in change["new"])
+        if change["kind"] == "added":
+            parts.append(f"#### Added: {titles}\n\n{new_text.strip()}")
+        elif change["kind"] == "removed":
+            parts.append(f"#### Removed: {titles}\n\n{old_text.strip()}".strip())
+        else:
+            before = old_text.strip() or "(previous text not available)"
+            parts.append(
+                f"#### Changed: {titles}\n\nBefore:\n{before}\n\n"
+                f"After:\n{new_text.strip()}"
+            )
+    return "\n\n".join(parts)
+
+
+def find_previous_completion(completions, data_file1, data_file2):
+    """Return (filename, data) of the latest saved comparison of two data files.
+
+    Only completions that recorded the versions of their documents are considered.
+    Returns (None, None) if there is none.
+    """
+    matches = [
+        (data.get("timestamp", ""), filename, data)
+        for filename, data in completions.items()
+        if data.get("data_file1") == data_file1
+        and data.get("data_file2") == data_file2
+        and data.get("data_file1_version")
+        and data.get("data_file2_version")
+    ]
+    if not matches:
+        return None, None
+    _, filename, data = max(matches, key=lambda match: match[:2])
+    return filename, data
+
+
+def build_incremental_prompt(previous_completion, document_updates):
+    """Build the prompt that updates a saved comparison with revised documents.
+
+    document_updates is a list of (label, file name, old version, new version,
+    changes), one per revised document.
+    """
+    changes = "\n\n".join(
+        f"### {label}: {name} (version {old} → {new})\n\n{format_changes(items)}"
+        for label, name, old, new, items in document_updates
+    )
+    return DEFAULT_INCREMENTAL_PROMPT.format(
+        completion=previous_completion, changes=changes
+    )
@@ -0,0 +1,365 @@
+"""Run grids of prompt/model experiments with resumable checkpoints."""
+
+import csv
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from utils.cache import file_digest
+from utils.constants import EXPERIMENTS_DIR
+from utils.document_extraction import extract_text
+from utils.openai_helpers import (
+    get_completion_response,
+    get_model_concurrency,
+    get_model_id,
+    get_usage,
+    get_usage_cost,
+    setup_client,
+)
+
+
+def _hash(*parts):
+    return hashlib.sha256(
+        "\x1f".join(str(p) for p in parts).encode("utf-8")
+    ).hexdigest()
+
+
+def build_grid(
+    system_messages,
+    user_prompts,
+    models,
+    quote_pairs,
+    temperatures,
+    data_files,
+    layouts=None,
+):
+    """Return the cartesian product of the experiment dimensions as cell dicts.
+
+    system_messages and user_prompts are {name: text} and data_files is
+    {name: path}. A cell's id covers the texts and the documents' content, so
+    editing a prompt or a quote re-runs its cells instead of resuming them.
+    layouts are prompt layouts (see build_messages) and default to inline only.
+    """
+    digests = {
+        name: file_digest(data_files[name]) for pair in quote_pairs for name in pair
+    }
+    cells = []
+    for system_name, prompt_name, model, pair, temperature, layout in itertools.product(
+        system_messages,
+        user_prompts,
+        models,
+        quote_pairs,
+        temperatures,
+        layouts or ["inline"],
+    ):
+        cell = {
+            "system_message": system_name,
+            "user_prompt": prompt_name,
+            "model": model,
+            "data_file1": pair[0],
+            "data_file2": pair[1],
+            "temperature": temperature,
+            "layout": layout,
+        }
+        cell["cell_id"] = _hash(
+            *(cell[key] for key in sorted(cell)),
+            system_messages[system_name],
+            user_prompts[prompt_name],
+            digests[pair[0]],
+            digests[pair[1]],
+        )[:16]
+        cells.append(cell)
+    return cells
+
+
+class _OnceCache:
+    """Compute each key at most once, sharing in-flight work between threads."""
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Return (value, hit) for key, computing it if nobody has yet."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+        if not owner:
+            return future.result(), True
+        try:
+            future.set_result(compute())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            future.set_exception(e)
+            with self._lock:
+                # Let a later cell retry instead of caching the failure
+                self._futures.pop(key, None)
+        return future.result(), False
+
+    def seed(self, key, value):
+        """Store an already known value."""
+        with self._lock:
+            future = Future()
+            future.set_result(value)
+            self._futures[key] = future
+
+
+class ExperimentRunner:
+    """Run an experiment grid, checkpointing each finished cell to disk.
+
+    Results are appended to ``<EXPERIMENTS_DIR>/<name>/checkpoint.jsonl``. Re-running
+    a grid with the same name skips cells that already succeeded, so an
+    interrupted grid resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        name,
+        system_messages,
+        user_prompts,
+        data_files,
+        available_models,
+        max_tokens=1000,
+        use_document_intelligence=True,
+        deployment_name=None,
+    ):
+        self.directory = os.path.join(EXPERIMENTS_DIR, name)
+        self.checkpoint_path = os.path.join(self.directory, "checkpoint.jsonl")
+        self.system_messages = system_messages
+        self.user_prompts = user_prompts
+        self.data_files = data_files
+        self.available_models = available_models
+        self.max_tokens = max_tokens
+        self.use_document_intelligence = use_document_intelligence
+        self.deployment_name = deployment_name
+        self._extractions = _OnceCache()
+        self._requests = _OnceCache()
+        self._clients = _OnceCache()
+        self._checkpoint_lock = threading.Lock()
+
+    def load_checkpoint(self):
+        """Return {cell_id: result} for every successful cell in the checkpoint."""
+        results = {}
+        if not os.path.exists(self.checkpoint_path):
+            return results
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A partially written last line from an interrupted run
+                    continue
+                if record.get("status") == "ok":
+                    results[record["cell_id"]] = record
+        return results
+
+    def _write_checkpoint(self, record):
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+
+    def _extract(self, data_file):
+        path = self.data_files[data_file]
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size, self.use_document_intelligence)
+        text, _ = self._extractions.get(
+            key,
+            lambda: extract_text(
+                path, use_document_intelligence=self.use_document_intelligence
+            ),
+        )
+        return text
+
+    def _client(self, model_id):
+        client, _ = self._clients.get(model_id, lambda: setup_client(model_id))
+        if client is None:
+            raise RuntimeError(f"Could not set up a client for {model_id or 'default'}")
+        return client
+
+    def _run_cell(self, cell):
+        model_id = get_model_id(self.available_models, cell["model"])
+        system_message = self.system_messages[cell["system_message"]]
+        documents = {
+            "quote1": self._extract(cell["data_file1"]),
+            "quote2": self._extract(cell["data_file2"]),
+        }
+        params = {
+            "deployment_name": self.deployment_name or cell["model"],
+            "system_message": system_message,
+            "user_prompt": self.user_prompts[cell["user_prompt"]],
+            "temperature": cell["temperature"],
+            "max_tokens": self.max_tokens,
+            "model_name": model_id,
+            "documents": documents,
+            "layout": cell["layout"],
+        }
+        request_hash = _hash(
+            *(params[key] for key in sorted(params) if key != "documents"),
+            *documents.values(),
+        )
+
+        def request():
+            start = time.perf_counter()
+            response = get_completion_response(self._client(model_id), **params)
+            return {
+                "completion": response.choices[0].message.content,
+                "usage": get_usage(response),
+                "latency_seconds": round(time.perf_counter() - start, 3),
+            }
+
+        result, cached = self._requests.get(request_hash, request)
+        cost = get_usage_cost(result["usage"], model_id)
+        return {
+            **cell,
+            **result,
+            "status": "ok",
+            "request_hash": request_hash,
+            "cached": cached,
+            "cost": 0.0 if cached else round(cost, 6),
+        }
+
+    def run(self, cells, progress=None):
+        """Run all cells not already in the checkpoint and return every result."""
+        os.makedirs(self.directory, exist_ok=True)
+        results = self.load_checkpoint()
+        for record in results.values():
+            self._requests.seed(
+                record["request_hash"],
+                {
+                    key: record[key]
+                    for key in ("completion", "usage", "latency_seconds")
+                },
+            )
+        pending = [cell for cell in cells if cell["cell_id"] not in results]
+
+        # One executor per model keeps each model within its own quota
+        executors = {}
+        futures = {}
+        for cell in pending:
+            model = cell["model"]
+            if model not in executors:
+                model_id = get_model_id(self.available_models, model)
+                executors[model] = ThreadPoolExecutor(
+                    max_workers=get_model_concurrency(model_id),
+                    thread_name_prefix=f"experiment-{model}",
+                )
+            futures[executors[model].submit(self._run_cell, cell)] = cell
+
+        try:
+            # Checkpoint each cell as soon as it finishes, so a crash keeps it
+            for done, future in enumerate(as_completed(futures), start=1):
+                cell = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    record = {**cell, "status": "error", "error": str(e)}
+                self._write_checkpoint(record)
+                if record["status"] == "ok":
+                    results[cell["cell_id"]] = record
+                if progress:
+                    progress(done, len(futures), record)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        return [
+            results[cell["cell_id"]] for cell in cells if cell["cell_id"] in results
+        ]
+
+
+def summarize_results(results):
+    """Aggregate results into a matrix of prompt rows × model/temperature columns."""
+    matrix = {}
+    for record in results:
+        row = f"{record['system_message']} / {record['user_prompt']}"
+        column = f"{record['model']} @ {record['temperature']}"
+        layout = record.get("layout", "inline")
+        if layout != "inline":
+            column += f" [{layout}]"
+        cell = matrix.setdefault(row, {}).setdefault(
+            column,
+            {
+                "runs": 0,
+                "latency_seconds": 0.0,
+                "total_tokens": 0,
+                "cached_tokens": 0,
+                "cost": 0.0,
+            },
+        )
+        cell["runs"] += 1
+        cell["latency_seconds"] += record["latency_seconds"]
+        cell["total_tokens"] += record["usage"].get("total_tokens", 0)
+        cell["cached_tokens"] += record["usage"].get("cached_tokens", 0)
+        cell["cost"] += record["cost"]
+
+    for columns in matrix.values():
+        for cell in columns.values():
+            cell["mean_latency_seconds"] = round(
+                cell.pop("latency_seconds") / cell["runs"], 3
+            )
+            cell["cost"] = round(cell["cost"], 6)
+    return matrix
+
+
+def format_matrix(matrix):
+    """Format a summary matrix as a plain text table."""
+    columns = sorted({column for row in matrix.values() for column in row})
+    header = ["System message / User prompt"] + columns
+    rows = [header]
+    for row_name in sorted(matrix):
+        row = [row_name]
+        for column in columns:
+            cell = matrix[row_name].get(column)
+            row.append(
+                f"{cell['mean_latency_seconds']}s / {cell['total_tokens']} tok "
+                f"({cell['cached_tokens']} cached) / ${cell['cost']}"
+                if cell
+                else "-"
+            )
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        " | ".join(value.ljust(width) for value, width in zip(row, widths))
+        for row in rows
+    )
+
+
+def save_summary(directory, matrix):
+    """Write the summary matrix as JSON and CSV next to the checkpoint."""
+    with open(os.path.join(directory, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(matrix, f, indent=4)
+    with open(
+        os.path.join(directory, "summary.csv"), "w", encoding="utf-8", newline=""
+    ) as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "row",
+                "column",
+                "runs",
+                "mean_latency_seconds",
+                "total_tokens",
+                "cached_tokens",
+                "cost",
+            ]
+        )
+        for row_name, columns in sorted(matrix.items()):
+            for column, cell in sorted(columns.items()):
+                writer.writerow(
+                    [
+                        row_name,
+                        column,
+                        cell["runs"],
+                        cell["mean_latency_seconds"],
+                        cell["total_tokens"],
+                        cell["cached_tokens"],
+                        cell["cost"],
+                    ]
+                )
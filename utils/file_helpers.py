@@ -1,10 +1,14 @@
 """File handling functions for system messages, user prompts, and completions."""
 
+import copy
 import os
 import json
-import glob
+import tempfile
+import threading
 from datetime import datetime
 import streamlit as st
+from utils.catalog import get_catalog, refresh_catalog_path
+from utils.search_index import sync_index, update_completion_path
 from utils.constants import (
     SYSTEM_MESSAGES_DIR,
     USER_PROMPTS_DIR,
@@ -15,37 +19,64 @@ from utils.constants import (
 )
 
 
+# Data file extensions listed in the Run Completion tab
+DATA_FILE_PATTERNS = [
+    "*.json",
+    "*.pdf",
+    "*.html",
+    "*.htm",
+    "*.txt",
+    "*.docx",
+    "*.xlsx",
+    "*.xlsm",
+    "*.pptx",
+    "*.jpeg",
+    "*.jpg",
+    "*.png",
+    "*.bmp",
+    "*.tiff",
+    "*.tif",
+]
+
+_completions_lock = threading.Lock()
+_completions_catalog = None
+
+
+def _read_text(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_completion(file_path):
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"Error loading completion {file_path}: {str(e)}")
+        return None
+
+
+def _strip_txt_extension(file_path):
+    return os.path.basename(file_path).replace(".txt", "")
+
+
 def load_system_messages():
     """Load all saved system messages."""
-    system_messages = {"Default": DEFAULT_SYSTEM_MESSAGE}
-    for file_path in glob.glob(f"{SYSTEM_MESSAGES_DIR}/*.txt"):
-        name = os.path.basename(file_path).replace(".txt", "")
-        with open(file_path, "r", encoding="utf-8") as f:
-            system_messages[name] = f.read()
-    return system_messages
+    catalog = get_catalog(
+        SYSTEM_MESSAGES_DIR, ["*.txt"], _read_text, _strip_txt_extension
+    )
+    return {"Default": DEFAULT_SYSTEM_MESSAGE, **catalog.items()}
 
 
 def load_user_prompts():
     """Load all saved user prompts."""
-    user_prompts = {"Default": DEFAULT_USER_PROMPT}
-    for file_path in glob.glob(f"{USER_PROMPTS_DIR}/*.txt"):
-        name = os.path.basename(file_path).replace(".txt", "")
-        with open(file_path, "r", encoding="utf-8") as f:
-            user_prompts[name] = f.read()
-    return user_prompts
+    catalog = get_catalog(USER_PROMPTS_DIR, ["*.txt"], _read_text, _strip_txt_extension)
+    return {"Default": DEFAULT_USER_PROMPT, **catalog.items()}
 
 
 def load_data_files():
     """Load all data files from the data directory."""
-    data_files = {}
-    # Look for files with supported extensions: json, pdf, html, htm, txt, docx
-    supported_extensions = ["*.json", "*.pdf", "*.html", "*.htm", "*.txt", "*.docx"]
-
-    for ext in supported_extensions:
-        for file_path in glob.glob(f"{DATA_DIR}/{ext}"):
-            name = os.path.basename(file_path)
-            data_files[name] = file_path
-    return data_files
+    return get_catalog(DATA_DIR, DATA_FILE_PATTERNS, lambda path: path).items()
 
 
 def save_system_message(name, content):
@@ -53,6 +84,7 @@ def save_system_message(name, content):
     file_path = f"{SYSTEM_MESSAGES_DIR}/{name}.txt"
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(content)
+    refresh_catalog_path(file_path)
     st.success(f"System message '{name}' saved successfully!")
 
 
@@ -61,22 +93,30 @@ def save_user_prompt(name, content):
     file_path = f"{USER_PROMPTS_DIR}/{name}.txt"
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(content)
+    refresh_catalog_path(file_path)
     st.success(f"User prompt '{name}' saved successfully!")
 
 
+def get_completions_catalog():
+    """Return the completions catalog, keeping the search index in step with it."""
+    global _completions_catalog  # pylint: disable=global-statement
+    with _completions_lock:
+        if _completions_catalog is None:
+            catalog = get_catalog(COMPLETIONS_DIR, ["*.json"], _read_completion)
+            # Saves, renames and deletes all go through the catalog
+            catalog.subscribe(update_completion_path)
+            sync_index()
+            _completions_catalog = catalog
+        return _completions_catalog
+
+
 def load_completions():
-    """Load all saved completions from the completions directory."""
-    completions = {}
-    os.makedirs(COMPLETIONS_DIR, exist_ok=True)
-    for file_path in glob.glob(f"{COMPLETIONS_DIR}/*.json"):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                completion_data = json.load(f)
-                file_name = os.path.basename(file_path)
-                completions[file_name] = completion_data
-        except json.JSONDecodeError as e:
-            print(f"Error loading completion {file_path}: {str(e)}")
-    return completions
+    """Load all saved completions from the completions directory.
+
+    The catalog's completion dicts are shared by every session, so each caller gets
+    its own copies (strings are shared, only the containers are copied).
+    """
+    return copy.deepcopy(get_completions_catalog().items())
 
 
 def rename_completion(old_filename, new_name):
@@ -112,6 +152,8 @@ def rename_completion(old_filename, new_name):
 
     try:
         os.rename(old_path, new_path)
+        refresh_catalog_path(old_path)
+        refresh_catalog_path(new_path)
         return True, f"Renamed completion to '{new_name}'"
     except OSError as e:
         return False, f"Error renaming file: {str(e)}"
@@ -123,6 +165,7 @@ def delete_completion(filename):
 
     try:
         os.remove(file_path)
+        refresh_catalog_path(file_path)
         return True, f"Deleted completion '{filename}'"
     except OSError as e:
         return False, f"Error deleting file: {str(e)}"
@@ -131,13 +174,21 @@ def delete_completion(filename):
 def save_completion(completion_data):
     """Save a completion to file with timestamp."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    completion_data["timestamp"] = timestamp
+    completion_data = {**completion_data, "timestamp": timestamp}
 
     os.makedirs(COMPLETIONS_DIR, exist_ok=True)
     filename = f"completion_{timestamp}.json"
     file_path = f"{COMPLETIONS_DIR}/{filename}"
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(completion_data, f, indent=4)
+    # Write to a temporary file first so the catalog never loads a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=COMPLETIONS_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(completion_data, f, indent=4)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    refresh_catalog_path(file_path)
 
     return filename
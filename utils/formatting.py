@@ -15,6 +15,13 @@ def format_timestamp(timestamp_str):
         return timestamp_str
 
 
+def truncate_text(text, limit):
+    """Return at most limit characters of text, marking where it was cut."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n\n[... {len(text) - limit:,} more characters]"
+
+
 def get_friendly_completion_name(filename):
     """Format completion filename to be more user-friendly for display."""
     # Remove .json extension
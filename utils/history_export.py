@@ -0,0 +1,429 @@
+"""Export completion history to columnar files and run aggregate reports over them.
+
+An export is a directory of part files (``part-00001.parquet``, ... or ``.csv``) plus
+``_export_state.json``. Completions are streamed in batches, so memory stays bounded
+by the batch size. Parquet needs ``pyarrow``; CSV works without it.
+
+An incremental export appends a part with a row for each completion that is new or
+changed since the previous export (a renamed completion is a new one), and a
+``deleted`` row for each completion that no longer exists. The export state records
+the modification time exported for each file. Reports only count the row of each
+file name from the latest export (``exported_ns``), and skip it if it is deleted.
+
+Reports read only the columns they aggregate. With ``pyarrow`` installed they run on
+Arrow tables for either format; otherwise CSV parts are aggregated row by row.
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import csv
+import itertools
+import json
+import os
+import time
+
+from utils.constants import COMPLETIONS_DIR
+
+STATE_FILE = "_export_state.json"
+
+# Exported columns and their types
+COLUMNS = {
+    "filename": "string",
+    "timestamp": "string",
+    "date": "string",
+    "model": "string",
+    "temperature": "float",
+    "max_tokens": "int",
+    "data_file1": "string",
+    "data_file2": "string",
+    "latency_seconds": "float",
+    "prompt_tokens": "int",
+    "completion_tokens": "int",
+    "total_tokens": "int",
+    "completion_chars": "int",
+    "completion_words": "int",
+    "user_prompt_chars": "int",
+    "mtime_ns": "int",
+    "deleted": "bool",
+    "exported_ns": "int",
+}
+
+# Report name -> (group by columns, [(column, aggregation), ...])
+REPORTS = {
+    "by_model": (
+        ["model"],
+        [
+            ("filename", "count"),
+            ("latency_seconds", "mean"),
+            ("latency_seconds", "max"),
+            ("completion_tokens", "mean"),
+            ("total_tokens", "sum"),
+        ],
+    ),
+    "by_temperature": (
+        ["model", "temperature"],
+        [
+            ("filename", "count"),
+            ("completion_words", "mean"),
+            ("latency_seconds", "mean"),
+        ],
+    ),
+    "by_day": (
+        ["date"],
+        [
+            ("filename", "count"),
+            ("total_tokens", "sum"),
+            ("latency_seconds", "mean"),
+        ],
+    ),
+}
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "float": pa.float64(),
+        "int": pa.int64(),
+        "bool": pa.bool_(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS.items()])
+
+
+def completion_record(filename, data, mtime_ns):
+    """Flatten one saved completion into an export row."""
+    usage = data.get("usage") or {}
+    timestamp = data.get("timestamp") or ""
+    completion = data.get("completion") or ""
+    return {
+        "filename": filename,
+        "timestamp": timestamp,
+        "date": (
+            f"{timestamp[:4]}-{timestamp[4:6]}-{timestamp[6:8]}"
+            if len(timestamp) >= 8
+            else None
+        ),
+        "model": data.get("model"),
+        "temperature": data.get("temperature"),
+        "max_tokens": data.get("max_tokens"),
+        "data_file1": data.get("data_file1"),
+        "data_file2": data.get("data_file2"),
+        "latency_seconds": data.get("latency_seconds"),
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+        "completion_chars": len(completion),
+        "completion_words": len(completion.split()),
+        "user_prompt_chars": len(data.get("user_prompt") or ""),
+        "mtime_ns": mtime_ns,
+        "deleted": False,
+    }
+
+
+def deleted_record(filename, mtime_ns):
+    """Return the export row marking a completion as deleted."""
+    record = dict.fromkeys(COLUMNS)
+    record.update(filename=filename, mtime_ns=mtime_ns, deleted=True)
+    return record
+
+
+def list_completions(directory=COMPLETIONS_DIR):
+    """Return {filename: mtime_ns} of the saved completions."""
+    if not os.path.isdir(directory):
+        return {}
+    with os.scandir(directory) as entries:
+        return {
+            entry.name: entry.stat().st_mtime_ns
+            for entry in entries
+            if entry.is_file() and entry.name.endswith(".json")
+        }
+
+
+def iter_completion_records(exported=None, directory=COMPLETIONS_DIR):
+    """Yield export rows for completions that changed since they were exported.
+
+    exported maps file names to the modification time they were exported with.
+    Completions that are new or modified get a row, oldest first, followed by a
+    deleted row for each exported completion that no longer exists. Only file names
+    and stat results are held for the whole directory; each completion is loaded,
+    flattened and released in turn.
+    """
+    exported = exported or {}
+    current = list_completions(directory)
+    pending = sorted(
+        (mtime_ns, filename)
+        for filename, mtime_ns in current.items()
+        if exported.get(filename) != mtime_ns
+    )
+    for mtime_ns, filename in pending:
+        try:
+            with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Skipping completion {filename}: {str(e)}")
+            continue
+        yield completion_record(filename, data, mtime_ns)
+    for filename in sorted(set(exported) - set(current)):
+        yield deleted_record(filename, exported[filename])
+
+
+def _batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _load_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_state(output_dir, state):
+    with open(os.path.join(output_dir, STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+
+
+def _part_files(output_dir, file_format):
+    if not os.path.isdir(output_dir):
+        return []
+    return sorted(
+        os.path.join(output_dir, name)
+        for name in os.listdir(output_dir)
+        if name.startswith("part-") and name.endswith(f".{file_format}")
+    )
+
+
+def _write_parquet(path, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            rows += len(batch)
+    return rows
+
+
+def _write_csv(path, batches):
+    rows = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(COLUMNS))
+        writer.writeheader()
+        for batch in batches:
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def export_history(
+    output_dir, file_format="parquet", incremental=False, batch_size=1000
+):
+    """Export completion history and return (rows_written, part_path or None).
+
+    A full export replaces the existing part files; an incremental one adds a part
+    holding only completions that changed since the last export, and deletions.
+    """
+    if file_format not in ("parquet", "csv"):
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = _load_state(output_dir) if incremental else None
+    if state and "files" not in state:
+        state = None  # Written before deletions were tracked: export everything
+    if state and state["format"] != file_format:
+        raise ValueError(
+            f"{output_dir} holds a {state['format']} export; "
+            f"cannot add {file_format} parts to it."
+        )
+    if not state:
+        for path in _part_files(output_dir, "parquet") + _part_files(output_dir, "csv"):
+            os.remove(path)
+        state = {"format": file_format, "files": {}, "rows": 0, "parts": 0}
+
+    records = iter_completion_records(state["files"])
+    first = next(records, None)
+    if first is None:
+        _save_state(output_dir, state)
+        return 0, None
+
+    files = dict(state["files"])
+    exported_ns = time.time_ns()
+
+    def tracked():
+        for record in itertools.chain([first], records):
+            record["exported_ns"] = exported_ns
+            if record["deleted"]:
+                files.pop(record["filename"], None)
+            else:
+                files[record["filename"]] = record["mtime_ns"]
+            yield record
+
+    part_path = os.path.join(output_dir, f"part-{state['parts'] + 1:05d}.{file_format}")
+    writer = _write_parquet if file_format == "parquet" else _write_csv
+    rows = writer(part_path, _batches(tracked(), batch_size))
+
+    state.update(
+        files=files,
+        rows=state["rows"] + rows,
+        parts=state["parts"] + 1,
+    )
+    _save_state(output_dir, state)
+    return rows, part_path
+
+
+def _report_with_arrow(paths, file_format, group_by, metrics):
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    schema = _arrow_schema()
+    if file_format == "csv":
+        import pyarrow.csv as pa_csv
+
+        file_format = ds.CsvFileFormat(
+            convert_options=pa_csv.ConvertOptions(
+                column_types=schema, strings_can_be_null=True
+            )
+        )
+    dataset = ds.dataset(paths, schema=schema, format=file_format)
+    columns = list(
+        dict.fromkeys(
+            group_by
+            + [column for column, _ in metrics]
+            + ["filename", "exported_ns", "deleted"]
+        )
+    )
+    table = dataset.to_table(columns=columns)
+
+    # Keep each completion's row from its latest export, unless it was deleted
+    latest = table.group_by("filename").aggregate([("exported_ns", "max")])
+    table = table.join(latest, "filename")
+    table = table.filter(
+        pc.and_(
+            pc.equal(table["exported_ns"], table["exported_ns_max"]),
+            pc.invert(table["deleted"]),
+        )
+    )
+    result = table.group_by(group_by).aggregate(metrics)
+    return result.sort_by([(column, "ascending") for column in group_by]).to_pylist()
+
+
+def _parse_value(value, kind):
+    if value == "":
+        return None
+    if kind == "float":
+        return float(value)
+    if kind == "int":
+        return int(value)
+    if kind == "bool":
+        return value == "True"
+    return value
+
+
+def _iter_csv_rows(paths):
+    for path in paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def _report_with_csv(paths, group_by, metrics):
+    # First pass: the latest export of each completion
+    latest = {}
+    for row in _iter_csv_rows(paths):
+        exported_ns = int(row["exported_ns"])
+        latest[row["filename"]] = max(exported_ns, latest.get(row["filename"], 0))
+
+    groups = {}
+    for row in _iter_csv_rows(paths):
+        if (
+            row["deleted"] == "True"
+            or int(row["exported_ns"]) != latest[row["filename"]]
+        ):
+            continue
+        key = tuple(_parse_value(row[column], COLUMNS[column]) for column in group_by)
+        accumulators = groups.setdefault(
+            key,
+            [{"count": 0, "sum": 0, "min": None, "max": None} for _ in metrics],
+        )
+        for accumulator, (column, _) in zip(accumulators, metrics):
+            value = _parse_value(row[column], COLUMNS[column])
+            if value is None:
+                continue
+            accumulator["count"] += 1
+            if COLUMNS[column] != "string":
+                accumulator["sum"] += value
+                accumulator["min"] = (
+                    value
+                    if accumulator["min"] is None
+                    else min(accumulator["min"], value)
+                )
+                accumulator["max"] = (
+                    value
+                    if accumulator["max"] is None
+                    else max(accumulator["max"], value)
+                )
+
+    results = []
+    for key in sorted(groups, key=lambda key: tuple((v is None, v) for v in key)):
+        row = dict(zip(group_by, key))
+        for accumulator, (column, aggregation) in zip(groups[key], metrics):
+            if aggregation == "mean":
+                value = (
+                    accumulator["sum"] / accumulator["count"]
+                    if accumulator["count"]
+                    else None
+                )
+            elif aggregation == "sum":
+                value = accumulator["sum"] if accumulator["count"] else None
+            else:
+                value = accumulator[aggregation]
+            row[f"{column}_{aggregation}"] = value
+        results.append(row)
+    return results
+
+
+def run_report(output_dir, name):
+    """Run a named report from REPORTS over an export and return its rows."""
+    group_by, metrics = REPORTS[name]
+    state = _load_state(output_dir)
+    if not state:
+        raise FileNotFoundError(f"No export found in {output_dir}")
+    paths = _part_files(output_dir, state["format"])
+    try:
+        import pyarrow  # pylint: disable=unused-import
+    except ImportError:
+        if state["format"] == "parquet":
+            raise
+        return _report_with_csv(paths, group_by, metrics)
+    return _report_with_arrow(paths, state["format"], group_by, metrics)
+
+
+def format_report(rows):
+    """Format report rows as a plain-text table."""
+    if not rows:
+        return "(no rows)"
+    columns = list(rows[0])
+
+    def cell(value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.3f}"
+        return str(value)
+
+    table = [columns] + [[cell(row[column]) for column in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(line, widths))
+        for line in table
+    )
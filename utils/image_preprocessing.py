@@ -0,0 +1,124 @@
+"""Shrink images and scans before uploading them to Azure Document Intelligence.
+
+Phone photos and scanned TIFF/PNG quotes are often many megabytes, most of which the
+layout model does not need. Images are downscaled, stripped of metadata, converted to
+grayscale and recompressed, and identical pages of multi-page scans are dropped.
+
+Settings (environment variables):
+
+- ``DOCUMENT_INTELLIGENCE_PREPROCESS_IMAGES``: ``true`` (default) or ``false``
+- ``DOCUMENT_INTELLIGENCE_MAX_IMAGE_DIMENSION``: longest side in pixels (default 2500)
+- ``DOCUMENT_INTELLIGENCE_GRAYSCALE``: ``true`` (default) or ``false``
+- ``DOCUMENT_INTELLIGENCE_JPEG_QUALITY``: JPEG quality for photos (default 85)
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import hashlib
+import io
+import os
+import time
+
+IMAGE_FORMATS = [".jpeg", ".jpg", ".png", ".bmp", ".tiff", ".tif"]
+
+
+def _env_flag(name, default="true"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def is_preprocessing_enabled():
+    """Check if image preprocessing is enabled and Pillow is installed."""
+    if not _env_flag("DOCUMENT_INTELLIGENCE_PREPROCESS_IMAGES"):
+        return False
+    try:
+        import PIL  # pylint: disable=unused-import
+    except ImportError:
+        return False
+    return True
+
+
+def _prepare_frame(frame, max_dimension, grayscale):
+    from PIL import ImageOps
+
+    # Apply the EXIF orientation before the metadata is dropped
+    frame = ImageOps.exif_transpose(frame)
+    if grayscale and frame.mode != "1":
+        frame = frame.convert("L")
+    elif frame.mode not in ("1", "L", "RGB"):
+        frame = frame.convert("RGB")
+    if max(frame.size) > max_dimension:
+        frame.thumbnail((max_dimension, max_dimension))
+    return frame
+
+
+def preprocess_image(file_path):
+    """Return (image_bytes, stats) for an image, ready to upload.
+
+    image_bytes is None if preprocessing would not make the upload smaller, in
+    which case the original file should be uploaded. stats reports the original and
+    uploaded sizes, the pages kept and dropped, and the time spent preprocessing.
+    """
+    from PIL import Image, ImageSequence
+
+    max_dimension = int(os.getenv("DOCUMENT_INTELLIGENCE_MAX_IMAGE_DIMENSION", "2500"))
+    grayscale = _env_flag("DOCUMENT_INTELLIGENCE_GRAYSCALE")
+    jpeg_quality = int(os.getenv("DOCUMENT_INTELLIGENCE_JPEG_QUALITY", "85"))
+
+    start = time.perf_counter()
+    original_bytes = os.path.getsize(file_path)
+
+    with Image.open(file_path) as image:
+        source_format = image.format
+        frames, seen, duplicates = [], set(), 0
+        for frame in ImageSequence.Iterator(image):
+            prepared = _prepare_frame(frame, max_dimension, grayscale)
+            digest = hashlib.sha256(
+                prepared.mode.encode()
+                + str(prepared.size).encode()
+                + prepared.tobytes()
+            ).digest()
+            if digest in seen:
+                duplicates += 1
+                continue
+            seen.add(digest)
+            frames.append(prepared)
+
+    output = io.BytesIO()
+    try:
+        if len(frames) > 1 or source_format == "TIFF":
+            # Group 4 only encodes bilevel pages, so scans that mix bilevel pages
+            # with grayscale or color ones are deflated
+            bilevel = all(frame.mode == "1" for frame in frames)
+            frames[0].save(
+                output,
+                format="TIFF",
+                save_all=True,
+                append_images=frames[1:],
+                compression="group4" if bilevel else "tiff_deflate",
+            )
+        elif source_format == "JPEG":
+            frames[0].save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+        else:
+            frames[0].save(output, format="PNG", optimize=True)
+        processed = output.getvalue()
+    except (OSError, ValueError) as e:
+        print(f"Error preprocessing {os.path.basename(file_path)}: {str(e)}")
+        processed = None
+    pages = len(frames)
+
+    uploaded_bytes = len(processed) if processed is not None else original_bytes
+
+    if uploaded_bytes >= original_bytes:
+        processed = None
+        uploaded_bytes = original_bytes
+        pages += duplicates
+        duplicates = 0
+
+    return processed, {
+        "original_bytes": original_bytes,
+        "uploaded_bytes": uploaded_bytes,
+        "bytes_saved": original_bytes - uploaded_bytes,
+        "pages": pages,
+        "duplicate_pages": duplicates,
+        "preprocess_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
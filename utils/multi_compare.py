@@ -0,0 +1,138 @@
+"""Compare any number of quotes by condensing each one once and comparing the summaries.
+
+Each quote is extracted and condensed by its own request, run concurrently within the
+model's concurrency limit, and the condensed quotes are combined into one final
+comparison request. Comparing N quotes therefore costs N + 1 requests, each sending a
+single document or the summaries, instead of one full two-document request per pair.
+
+Condensed quotes are kept in the disk cache, keyed by the document's content hash,
+CONDENSE_PROMPT_VERSION, the condensing prompts and the model, so a quote is only
+condensed again when one of these changes.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import cache_get, cache_key, cache_put
+from utils.constants import CONDENSE_PROMPT_VERSION
+from utils.document_extraction import (
+    extract_text,
+    extraction_cache_key,
+    get_extraction_backend,
+)
+from utils.openai_helpers import (
+    get_model_concurrency,
+    get_usage_cost,
+    request_completion,
+    sum_usage,
+)
+
+
+def condense_quote(
+    client,
+    file_path,
+    condense_system_message,
+    condense_prompt,
+    deployment_name,
+    model_name=None,
+    max_tokens=1000,
+    use_document_intelligence=True,
+):
+    """Return the condensed form of one quote, from the cache when possible.
+
+    The result has the summary, usage and latency of the condensing request, and
+    cached=True (with empty usage) when it came from the cache.
+    """
+    backend = get_extraction_backend(file_path, use_document_intelligence)
+    key = cache_key(
+        extraction_cache_key(file_path, backend),
+        CONDENSE_PROMPT_VERSION,
+        condense_system_message,
+        condense_prompt,
+        deployment_name,
+        model_name,
+        max_tokens,
+    )
+    cached = cache_get("condensed", key)
+    if cached is not None:
+        return {**cached, "usage": {}, "latency_seconds": 0.0, "cached": True}
+
+    text = extract_text(file_path, use_document_intelligence=use_document_intelligence)
+    result = request_completion(
+        client,
+        deployment_name=deployment_name,
+        system_message=condense_system_message,
+        user_prompt=condense_prompt.format(quote=text),
+        temperature=0.0,
+        max_tokens=max_tokens,
+        model_name=model_name,
+    )
+    summary = {"summary": result["completion"], "source_chars": len(text)}
+    cache_put("condensed", key, summary)
+    return {**summary, **result, "cached": False}
+
+
+def compare_quotes(
+    client,
+    quote_files,
+    system_message,
+    comparison_prompt,
+    condense_system_message,
+    condense_prompt,
+    deployment_name,
+    model_name=None,
+    temperature=0.7,
+    max_tokens=1000,
+    use_document_intelligence=True,
+):
+    """Condense every quote concurrently, then compare the condensed quotes.
+
+    quote_files maps quote names to file paths. Returns a dict with the condensed
+    quotes by name, the final completion, and the total usage, cost and latency.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(
+        max_workers=get_model_concurrency(model_name),
+        thread_name_prefix="condense",
+    ) as executor:
+        futures = {
+            name: executor.submit(
+                condense_quote,
+                client,
+                path,
+                condense_system_message,
+                condense_prompt,
+                deployment_name,
+                model_name,
+                max_tokens,
+                use_document_intelligence,
+            )
+            for name, path in quote_files.items()
+        }
+        condensed = {name: future.result() for name, future in futures.items()}
+
+    quotes = "\n\n".join(
+        f"Quote {number} ({name}):\n{result['summary']}"
+        for number, (name, result) in enumerate(condensed.items(), start=1)
+    )
+    user_prompt = comparison_prompt.format(quotes=quotes, count=len(quote_files))
+    final = request_completion(
+        client,
+        deployment_name=deployment_name,
+        system_message=system_message,
+        user_prompt=user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        model_name=model_name,
+    )
+
+    usage = sum_usage(result["usage"] for result in [*condensed.values(), final])
+    return {
+        "condensed": condensed,
+        "completion": final["completion"],
+        "user_prompt": user_prompt,
+        "usage": usage,
+        "requests": 1 + sum(not result["cached"] for result in condensed.values()),
+        "cost": round(get_usage_cost(usage, model_name), 6),
+        "latency_seconds": round(time.perf_counter() - start, 3),
+    }
@@ -1,8 +1,23 @@
 """Azure OpenAI Helpers"""
 
 import os
+import time
 import streamlit as st
 from openai import AzureOpenAI
+from utils.transport import get_openai_http_client
+
+# How documents are placed in the prompt, see build_messages
+PROMPT_LAYOUTS = ["inline", "documents_first"]
+
+# Azure OpenAI API version used when none is configured. Structured output
+# (json_schema response formats) needs 2024-08-01-preview or later, and cached
+# prompt token counts in the usage need 2024-10-01-preview or later.
+DEFAULT_API_VERSION = "2024-10-21"
+
+
+def _model_prefix(model_name):
+    """Return the environment variable prefix for a model-specific configuration."""
+    return f"MODEL_{model_name.upper().replace('-', '_')}"
 
 
 def setup_client(model_name=None):
@@ -14,15 +29,15 @@ def setup_client(model_name=None):
         # Use model-specific credentials if provided
         if model_name:
             # Create prefix for model-specific env vars
-            prefix = f"MODEL_{model_name.upper().replace('-', '_')}"
+            prefix = _model_prefix(model_name)
             api_key = os.getenv(f"{prefix}_API_KEY")
             endpoint = os.getenv(f"{prefix}_ENDPOINT")
-            api_version = os.getenv(f"{prefix}_API_VERSION", "2024-02-15-preview")
+            api_version = os.getenv(f"{prefix}_API_VERSION", DEFAULT_API_VERSION)
         else:
             # Fallback to default credentials
             api_key = os.getenv("AZURE_OPENAI_API_KEY")
             endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-            api_version = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+            api_version = os.getenv("AZURE_OPENAI_API_VERSION", DEFAULT_API_VERSION)
 
         if not api_key or not endpoint:
             st.error(
@@ -34,6 +49,7 @@ def setup_client(model_name=None):
             api_key=api_key,
             api_version=api_version,
             azure_endpoint=endpoint,
+            http_client=get_openai_http_client(),
         )
         return client
     except (ValueError, KeyError, RuntimeError) as e:
@@ -41,6 +57,162 @@ def setup_client(model_name=None):
         return None
 
 
+def get_prompt_layout():
+    """Return the default prompt layout from PROMPT_LAYOUT (inline if unset)."""
+    layout = os.getenv("PROMPT_LAYOUT", "inline")
+    return layout if layout in PROMPT_LAYOUTS else "inline"
+
+
+def build_messages(system_message, user_prompt, documents=None, layout="inline"):
+    """Return the chat messages for a user prompt and the documents it refers to.
+
+    documents maps template fields (e.g. quote1, quote2) to document text. With the
+    inline layout they are formatted into the user prompt. With documents_first each
+    document is its own message after the system message and the prompt comes last,
+    with the fields replaced by references to those messages. Requests that share a
+    system message and leading documents then share a prompt prefix, which Azure
+    OpenAI caches.
+    """
+    messages = [{"role": "system", "content": system_message}]
+    if not documents:
+        messages.append({"role": "user", "content": user_prompt})
+    elif layout == "inline":
+        messages.append({"role": "user", "content": user_prompt.format(**documents)})
+    elif layout == "documents_first":
+        for field, text in documents.items():
+            messages.append(
+                {"role": "user", "content": f"<{field}>\n{text}\n</{field}>"}
+            )
+        references = {field: f"(see <{field}> above)" for field in documents}
+        messages.append({"role": "user", "content": user_prompt.format(**references)})
+    else:
+        raise ValueError(f"Unknown prompt layout: {layout}")
+    return messages
+
+
+def build_completion_params(
+    deployment_name,
+    system_message,
+    user_prompt,
+    temperature=0.7,
+    max_tokens=1000,
+    model_name=None,
+    documents=None,
+    layout="inline",
+    response_format=None,
+):
+    """Build the chat completion request parameters for the specified model.
+
+    If documents is given, user_prompt is a template for them; see build_messages.
+    response_format (e.g. a JSON schema) is dropped for models that list it in
+    their UNSUPPORTED_PARAMS.
+    """
+    # If model_name is provided, use model-specific deployment name and parameters
+    if model_name:
+        prefix = _model_prefix(model_name)
+        model_deployment = os.getenv(f"{prefix}_DEPLOYMENT_NAME", deployment_name)
+        token_param = os.getenv(f"{prefix}_TOKEN_PARAM", "max_tokens")
+        unsupported_params = (
+            os.getenv(f"{prefix}_UNSUPPORTED_PARAMS", "").lower().split(",")
+        )
+    else:
+        model_deployment = deployment_name
+        token_param = os.getenv("AZURE_OPENAI_TOKEN_PARAM", "max_tokens")
+        unsupported_params = (
+            os.getenv("AZURE_OPENAI_UNSUPPORTED_PARAMS", "").lower().split(",")
+        )
+
+    # Base parameters for the API call
+    params = {
+        "model": model_deployment,
+        "messages": build_messages(system_message, user_prompt, documents, layout),
+    }
+
+    # Add temperature if supported
+    if "temperature" not in unsupported_params:
+        params["temperature"] = temperature
+
+    # Add the appropriate token parameter based on the model
+    if token_param == "max_completion_tokens":
+        params["max_completion_tokens"] = max_tokens
+    else:
+        params["max_tokens"] = max_tokens
+
+    # Request structured output if supported
+    if response_format and "response_format" not in unsupported_params:
+        params["response_format"] = response_format
+
+    return params
+
+
+def get_completion_response(client, **kwargs):
+    """Get the raw chat completion response; accepts build_completion_params args."""
+    return client.chat.completions.create(**build_completion_params(**kwargs))
+
+
+def stream_completion(client, **kwargs):
+    """Yield the completion text as it is generated; accepts build_completion_params args."""
+    params = build_completion_params(**kwargs)
+    for chunk in client.chat.completions.create(stream=True, **params):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def request_completion(client, **kwargs):
+    """Get a completion with its usage and latency; accepts build_completion_params args.
+
+    Unlike get_completion_result, errors are raised instead of returned as text.
+    """
+    start = time.perf_counter()
+    response = get_completion_response(client, **kwargs)
+    return {
+        "completion": response.choices[0].message.content,
+        "usage": get_usage(response),
+        "latency_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def get_completion_result(
+    client,
+    deployment_name,
+    system_message,
+    user_prompt,
+    temperature=0.7,
+    max_tokens=1000,
+    model_name=None,
+    documents=None,
+    layout="inline",
+):
+    """Get a completion with its token usage and latency in seconds.
+
+    Returns a dict with completion, usage and latency_seconds; on error the
+    completion holds the error message and usage is empty.
+    """
+    start = time.perf_counter()
+    try:
+        response = get_completion_response(
+            client,
+            deployment_name=deployment_name,
+            system_message=system_message,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model_name=model_name,
+            documents=documents,
+            layout=layout,
+        )
+        completion = response.choices[0].message.content
+        usage = get_usage(response)
+    except (ValueError, KeyError, RuntimeError) as e:
+        completion = f"Error: {str(e)}"
+        usage = {}
+    return {
+        "completion": completion,
+        "usage": usage,
+        "latency_seconds": round(time.perf_counter() - start, 3),
+    }
+
+
 def get_completion(
     client,
     deployment_name,
@@ -49,47 +221,101 @@ def get_completion(
     temperature=0.7,
     max_tokens=1000,
     model_name=None,
+    documents=None,
+    layout="inline",
 ):
     """Get a completion from the specified model."""
-    try:
-        # If model_name is provided, use model-specific deployment name and parameters
-        if model_name:
-            prefix = f"MODEL_{model_name.upper().replace('-', '_')}"
-            model_deployment = os.getenv(f"{prefix}_DEPLOYMENT_NAME", deployment_name)
-            token_param = os.getenv(f"{prefix}_TOKEN_PARAM", "max_tokens")
-            unsupported_params = (
-                os.getenv(f"{prefix}_UNSUPPORTED_PARAMS", "").lower().split(",")
-            )
-        else:
-            model_deployment = deployment_name
-            token_param = os.getenv("AZURE_OPENAI_TOKEN_PARAM", "max_tokens")
-            unsupported_params = (
-                os.getenv("AZURE_OPENAI_UNSUPPORTED_PARAMS", "").lower().split(",")
-            )
+    return get_completion_result(
+        client,
+        deployment_name,
+        system_message,
+        user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        model_name=model_name,
+        documents=documents,
+        layout=layout,
+    )["completion"]
 
-        # Base parameters for the API call
-        params = {
-            "model": model_deployment,
-            "messages": [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_prompt},
-            ],
-        }
-
-        # Add temperature if supported
-        if "temperature" not in unsupported_params:
-            params["temperature"] = temperature
-
-        # Add the appropriate token parameter based on the model
-        if token_param == "max_completion_tokens":
-            params["max_completion_tokens"] = max_tokens
-        else:
-            params["max_tokens"] = max_tokens
 
-        response = client.chat.completions.create(**params)
-        return response.choices[0].message.content
-    except (ValueError, KeyError, RuntimeError) as e:
-        return f"Error: {str(e)}"
+def get_usage(response):
+    """Return the token usage of a chat completion response as a dict.
+
+    cached_tokens is the part of the prompt served from the provider's prompt cache.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+    }
+
+
+def get_model_pricing(model_name=None):
+    """Return (input, output) cost per 1K tokens from environment variables.
+
+    Uses MODEL_<ID>_INPUT_COST_PER_1K / MODEL_<ID>_OUTPUT_COST_PER_1K for specific
+    models and AZURE_OPENAI_INPUT_COST_PER_1K / AZURE_OPENAI_OUTPUT_COST_PER_1K for
+    the default one. Missing prices are treated as zero.
+    """
+    prefix = _model_prefix(model_name) if model_name else "AZURE_OPENAI"
+    return (
+        float(os.getenv(f"{prefix}_INPUT_COST_PER_1K", "0")),
+        float(os.getenv(f"{prefix}_OUTPUT_COST_PER_1K", "0")),
+    )
+
+
+def sum_usage(usages):
+    """Add up the token usage dicts of several requests."""
+    total = {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+    }
+    for usage in usages:
+        for field in total:
+            total[field] += usage.get(field, 0)
+    return total
+
+
+def get_usage_cost(usage, model_name=None):
+    """Return the cost of a request's token usage.
+
+    Cached prompt tokens are priced with MODEL_<ID>_CACHED_INPUT_COST_PER_1K (or
+    AZURE_OPENAI_CACHED_INPUT_COST_PER_1K), which defaults to the input price.
+    """
+    input_cost, output_cost = get_model_pricing(model_name)
+    prefix = _model_prefix(model_name) if model_name else "AZURE_OPENAI"
+    cached_cost = float(os.getenv(f"{prefix}_CACHED_INPUT_COST_PER_1K", input_cost))
+    cached_tokens = usage.get("cached_tokens", 0)
+    return (
+        (usage.get("prompt_tokens", 0) - cached_tokens) * input_cost
+        + cached_tokens * cached_cost
+        + usage.get("completion_tokens", 0) * output_cost
+    ) / 1000
+
+
+def get_model_concurrency(model_name=None, default=2):
+    """Return the number of concurrent requests allowed for a model.
+
+    Uses MODEL_<ID>_MAX_CONCURRENCY for specific models and
+    AZURE_OPENAI_MAX_CONCURRENCY for the default one.
+    """
+    prefix = _model_prefix(model_name) if model_name else "AZURE_OPENAI"
+    return max(1, int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(default))))
+
+
+def get_model_id(available_models, selected_model):
+    """Return the configuration id of a specific model, or None for the default."""
+    for model in available_models:
+        if model["name"] == selected_model and model["type"] == "specific":
+            return model["id"]
+    return None
 
 
 def get_available_models():
@@ -0,0 +1,79 @@
+"""Extract documents in the background as soon as they are selected.
+
+Selecting a document queues its extraction and token count on a small thread pool
+(PREFETCH_WORKERS, default 2), so the work overlaps with the user editing the
+prompt instead of blocking the page when the prompt is built.
+
+Jobs are shared by all sessions and reruns and keyed by the file's path, mtime,
+size and extraction options, so selecting the same document again reuses the
+in-flight or finished job instead of starting another. Failed jobs are retried
+the next time the document is requested.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.document_extraction import extract_document
+from utils.document_versions import record_version
+from utils.ingestion import document_tokens
+
+# Finished jobs kept for reuse; in-flight jobs are always kept
+MAX_FINISHED_JOBS = 32
+
+_jobs = OrderedDict()
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PREFETCH_WORKERS", "2")),
+            thread_name_prefix="prefetch",
+        )
+    return _executor
+
+
+def prepare_document(file_path, use_document_intelligence=True):
+    """Extract a document, count its tokens and record it as a new version if it changed.
+
+    The token count is read from the disk cache when the file was ingested.
+    """
+    text, backend = extract_document(file_path, use_document_intelligence)
+    version = record_version(file_path, text, backend)
+    return {
+        "text": text,
+        "tokens": document_tokens(file_path, backend, text),
+        "version": version["version"],
+    }
+
+
+def prefetch_document(file_path, use_document_intelligence=True):
+    """Queue the preparation of a document, or reuse its job; return the future.
+
+    The future's result is the dict returned by prepare_document.
+    """
+    stat = os.stat(file_path)
+    key = (
+        os.path.abspath(file_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+        use_document_intelligence,
+    )
+    with _lock:
+        future = _jobs.get(key)
+        if future is not None and not (future.done() and future.exception()):
+            _jobs.move_to_end(key)
+            return future
+
+        future = _get_executor().submit(
+            prepare_document, file_path, use_document_intelligence
+        )
+        _jobs[key] = future
+        finished = [k for k, job in _jobs.items() if job.done()]
+        for old_key in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del _jobs[old_key]
+    return future
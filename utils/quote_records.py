@@ -0,0 +1,409 @@
+"""Extract quotes into structured records once, then compare and rank them locally.
+
+Each quote is turned into a typed record following QUOTE_RECORD_SCHEMA by one
+structured-output request, run concurrently within the model's concurrency limit.
+Records are kept in the disk cache, keyed by the document's content hash,
+QUOTE_RECORD_VERSION, the extraction prompts and the model, so a quote is only
+extracted again when one of these changes.
+
+Comparing, sorting and ranking records is plain local code and needs no requests.
+The model is only asked for an optional narrative summary over the compact records.
+"""
+
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import cache_get, cache_key, cache_put
+from utils.constants import QUOTE_RECORD_VERSION
+from utils.document_extraction import (
+    extract_text,
+    extraction_cache_key,
+    get_extraction_backend,
+)
+from utils.openai_helpers import (
+    get_model_concurrency,
+    get_usage_cost,
+    request_completion,
+    sum_usage,
+)
+
+
+def _nullable(kind, description):
+    return {"type": [kind, "null"], "description": description}
+
+
+# JSON schema of a quote record, in the strict form required by structured output
+QUOTE_RECORD_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "insurer": _nullable("string", "Insurer or brand name"),
+        "product": _nullable("string", "Product or policy name"),
+        "quote_reference": _nullable("string", "Quote reference number"),
+        "cover_type": _nullable("string", "Buildings, Contents or both"),
+        "currency": _nullable("string", "ISO currency code, e.g. GBP"),
+        "annual_premium": _nullable("number", "Yearly premium"),
+        "monthly_premium": _nullable("number", "Monthly premium"),
+        "buildings_cover_limit": _nullable("number", "Buildings sum insured"),
+        "contents_cover_limit": _nullable("number", "Contents sum insured"),
+        "buildings_excess": _nullable("number", "Total buildings excess"),
+        "contents_excess": _nullable("number", "Total contents excess"),
+        "single_item_limit": _nullable("number", "Unspecified valuables limit"),
+        "accidental_damage": _nullable("boolean", "Accidental damage included"),
+        "personal_possessions": _nullable("boolean", "Cover away from home"),
+        "legal_expenses": _nullable("boolean", "Legal expenses included"),
+        "home_emergency": _nullable("boolean", "Home emergency included"),
+        "optional_extras": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Extras available at additional cost",
+        },
+        "exclusions": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Notable exclusions and conditions",
+        },
+    },
+}
+QUOTE_RECORD_SCHEMA["required"] = list(QUOTE_RECORD_SCHEMA["properties"])
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "quote_record",
+        "strict": True,
+        "schema": QUOTE_RECORD_SCHEMA,
+    },
+}
+
+# Ranking field -> weight; a negative weight means lower values are better
+RANKING_WEIGHTS = {
+    "annual_premium": -3,
+    "buildings_excess": -1,
+    "contents_excess": -1,
+    "buildings_cover_limit": 1,
+    "contents_cover_limit": 1,
+    "single_item_limit": 0.5,
+    "included_cover": 1,
+}
+
+# Boolean cover fields counted by the included_cover ranking field
+COVER_FIELDS = [
+    "accidental_damage",
+    "personal_possessions",
+    "legal_expenses",
+    "home_emergency",
+]
+
+# Record fields shown in comparison tables, with their labels
+TABLE_FIELDS = {
+    "insurer": "Insurer",
+    "cover_type": "Cover",
+    "annual_premium": "Annual premium",
+    "buildings_excess": "Buildings excess",
+    "contents_excess": "Contents excess",
+    "buildings_cover_limit": "Buildings limit",
+    "contents_cover_limit": "Contents limit",
+    "single_item_limit": "Single item limit",
+    **{field: field.replace("_", " ").capitalize() for field in COVER_FIELDS},
+}
+
+
+def _to_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str) and "%" not in value:
+        match = re.search(r"\d[\d,]*(?:\.\d+)?", value)
+        if match:
+            return float(match.group().replace(",", ""))
+    return None
+
+
+def _to_bool(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().lower()
+    if text.startswith(("not", "no", "false", "excluded")):
+        return False
+    if text.startswith(("yes", "true", "included")):
+        return True
+    return None
+
+
+def normalize_record(data):
+    """Coerce a parsed record to the schema types, filling missing fields with None.
+
+    Models without structured output may return amounts as text such as "£1,000".
+    """
+    record = {}
+    for field, spec in QUOTE_RECORD_SCHEMA["properties"].items():
+        value = data.get(field)
+        kind = spec["type"][0] if isinstance(spec["type"], list) else spec["type"]
+        if kind == "number":
+            value = _to_number(value)
+        elif kind == "boolean":
+            value = _to_bool(value)
+        elif kind == "array":
+            value = [str(item) for item in value] if isinstance(value, list) else []
+        elif value is not None:
+            value = str(value)
+        record[field] = value
+    return record
+
+
+def parse_record(text):
+    """Parse a record from a completion, tolerating code fences around the JSON."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("The completion does not contain a JSON object.")
+    return normalize_record(json.loads(text[start : end + 1]))
+
+
+def extract_quote_record(
+    client,
+    file_path,
+    system_message,
+    record_prompt,
+    deployment_name,
+    model_name=None,
+    max_tokens=1000,
+    use_document_intelligence=True,
+):
+    """Return the structured record of one quote, from the cache when possible.
+
+    The result has the record, usage and latency of the extraction request, and
+    cached=True (with empty usage) when it came from the cache.
+    """
+    backend = get_extraction_backend(file_path, use_document_intelligence)
+    key = cache_key(
+        extraction_cache_key(file_path, backend),
+        QUOTE_RECORD_VERSION,
+        json.dumps(QUOTE_RECORD_SCHEMA, sort_keys=True),
+        system_message,
+        record_prompt,
+        deployment_name,
+        model_name,
+        max_tokens,
+    )
+    cached = cache_get("quote_records", key)
+    if cached is not None:
+        return {**cached, "usage": {}, "latency_seconds": 0.0, "cached": True}
+
+    text = extract_text(file_path, use_document_intelligence=use_document_intelligence)
+    result = request_completion(
+        client,
+        deployment_name=deployment_name,
+        system_message=system_message,
+        user_prompt=record_prompt.format(
+            schema=json.dumps(QUOTE_RECORD_SCHEMA["properties"], indent=1),
+            quote=text,
+        ),
+        temperature=0.0,
+        max_tokens=max_tokens,
+        model_name=model_name,
+        response_format=RESPONSE_FORMAT,
+    )
+    record = {"record": parse_record(result["completion"]), "source_chars": len(text)}
+    cache_put("quote_records", key, record)
+    return {
+        **record,
+        "usage": result["usage"],
+        "latency_seconds": result["latency_seconds"],
+        "cached": False,
+    }
+
+
+def ranking_values(record):
+    """Return the values of the RANKING_WEIGHTS fields for one record.
+
+    The annual premium falls back to twelve monthly payments, and included_cover
+    counts the cover fields that are included.
+    """
+    values = {field: record.get(field) for field in RANKING_WEIGHTS}
+    if values["annual_premium"] is None and record.get("monthly_premium") is not None:
+        values["annual_premium"] = record["monthly_premium"] * 12
+    values["included_cover"] = sum(bool(record.get(field)) for field in COVER_FIELDS)
+    return values
+
+
+def rank_quotes(records, weights=None):
+    """Rank records by a weighted score from 0 to 100, best first.
+
+    Each field is scaled between the worst and best value among the quotes, so only
+    differences between the quotes count. Fields with the same value for every
+    quote are ignored, and a missing value scores as the worst.
+    records maps quote names to records; returns a list of dicts with the name,
+    rank, score and per-field scores.
+    """
+    weights = weights or RANKING_WEIGHTS
+    values = {name: ranking_values(record) for name, record in records.items()}
+    field_scores = {name: {} for name in records}
+    for field, weight in weights.items():
+        present = [v[field] for v in values.values() if v[field] is not None]
+        if len(set(present)) < 2:
+            continue
+        low, high = min(present), max(present)
+        for name, record_values in values.items():
+            value = record_values[field]
+            if value is None:
+                field_scores[name][field] = 0.0
+            else:
+                scaled = (value - low) / (high - low)
+                field_scores[name][field] = 1 - scaled if weight < 0 else scaled
+
+    ranking = []
+    for name, scores in field_scores.items():
+        total_weight = sum(abs(weights[field]) for field in scores)
+        score = (
+            sum(abs(weights[field]) * scores[field] for field in scores) / total_weight
+            if total_weight
+            else 0.0
+        )
+        ranking.append(
+            {
+                "name": name,
+                "score": round(score * 100, 1),
+                "field_scores": {k: round(v, 3) for k, v in scores.items()},
+            }
+        )
+    ranking.sort(key=lambda item: (-item["score"], item["name"]))
+    for rank, item in enumerate(ranking, start=1):
+        item["rank"] = rank
+    return ranking
+
+
+def sort_quotes(records, field, descending=False):
+    """Return the quote names sorted by a record field, missing values last."""
+    present = [name for name in records if records[name].get(field) is not None]
+    missing = [name for name in records if records[name].get(field) is None]
+    return (
+        sorted(present, key=lambda name: records[name][field], reverse=descending)
+        + missing
+    )
+
+
+def _format_value(value):
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return f"{value:,}"
+    return str(value).replace("|", "/")
+
+
+def format_ranking_table(records, ranking):
+    """Format the ranked quotes and their key fields as a markdown table."""
+    header = ["Rank", "Quote", "Score"] + list(TABLE_FIELDS.values())
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|" + " --- |" * len(header),
+    ]
+    for item in ranking:
+        record = records[item["name"]]
+        row = [str(item["rank"]), item["name"], str(item["score"])] + [
+            _format_value(record.get(field)) for field in TABLE_FIELDS
+        ]
+        lines.append("| " + " | ".join(row) + " |")
+    return "\n".join(lines)
+
+
+def compact_records(records):
+    """Return the records as compact JSON without empty fields, for prompts."""
+    return json.dumps(
+        {
+            name: {k: v for k, v in record.items() if v not in (None, [])}
+            for name, record in records.items()
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+def compare_quote_records(
+    client,
+    quote_files,
+    system_message,
+    record_system_message,
+    record_prompt,
+    narrative_prompt,
+    deployment_name,
+    model_name=None,
+    temperature=0.7,
+    max_tokens=1000,
+    use_document_intelligence=True,
+    narrative=True,
+):
+    """Extract every quote's record concurrently, rank them and optionally summarize.
+
+    quote_files maps quote names to file paths. Returns a dict with the extracted
+    records by name, the ranking, a markdown table, the completion (the narrative,
+    or the table when narrative is False) and the total usage, cost and latency.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(
+        max_workers=get_model_concurrency(model_name),
+        thread_name_prefix="quote-record",
+    ) as executor:
+        futures = {
+            name: executor.submit(
+                extract_quote_record,
+                client,
+                path,
+                record_system_message,
+                record_prompt,
+                deployment_name,
+                model_name,
+                max_tokens,
+                use_document_intelligence,
+            )
+            for name, path in quote_files.items()
+        }
+        extracted = {name: future.result() for name, future in futures.items()}
+
+    records = {name: item["record"] for name, item in extracted.items()}
+    ranking = rank_quotes(records)
+    table = format_ranking_table(records, ranking)
+    results = list(extracted.values())
+
+    user_prompt = None
+    completion = table
+    if narrative:
+        user_prompt = narrative_prompt.format(
+            count=len(records),
+            ranking="\n".join(
+                f"{item['rank']}. {item['name']} (score {item['score']})"
+                for item in ranking
+            ),
+            records=compact_records(records),
+        )
+        final = request_completion(
+            client,
+            deployment_name=deployment_name,
+            system_message=system_message,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            model_name=model_name,
+        )
+        completion = final["completion"]
+        results.append({**final, "cached": False})
+
+    usage = sum_usage(result["usage"] for result in results)
+    return {
+        "records": extracted,
+        "ranking": ranking,
+        "table": table,
+        "completion": completion,
+        "user_prompt": user_prompt,
+        "usage": usage,
+        "requests": sum(not result["cached"] for result in results),
+        "cost": round(get_usage_cost(usage, model_name), 6),
+        "latency_seconds": round(time.perf_counter() - start, 3),
+    }
@@ -0,0 +1,229 @@
+"""Full-text search index over saved completions, backed by SQLite FTS5.
+
+The index lives in ``SEARCH_INDEX_PATH`` and is maintained incrementally: completions
+are indexed when they are saved, renamed or deleted, and ``sync_index`` reconciles it
+with the completions directory (by mtime and size) for changes made outside the app.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from utils.constants import COMPLETIONS_DIR, SEARCH_INDEX_PATH
+
+# bm25 column weights for name, completion, system_message and data_files
+COLUMN_WEIGHTS = (4.0, 1.0, 0.5, 2.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    id INTEGER PRIMARY KEY,
+    filename TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    timestamp TEXT,
+    model TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS completions_fts USING fts5(
+    name, completion, system_message, data_files,
+    tokenize = 'porter unicode61'
+);
+"""
+
+# One connection shared by all threads; hold _lock while using it
+_connection_instance = None
+_lock = threading.Lock()
+
+
+def _connection():
+    """Return the process-wide connection to the index, creating the schema once.
+
+    Callers must hold _lock.
+    """
+    global _connection_instance  # pylint: disable=global-statement
+    if _connection_instance is None:
+        os.makedirs(os.path.dirname(SEARCH_INDEX_PATH), exist_ok=True)
+        connection = sqlite3.connect(
+            SEARCH_INDEX_PATH, timeout=30, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        _connection_instance = connection
+    return _connection_instance
+
+
+def _data_file_names(data):
+    names = list(data.get("data_files") or [])
+    for key in ("data_file1", "data_file2"):
+        if data.get(key) and data[key] not in names:
+            names.append(data[key])
+    return " ".join(names)
+
+
+def _display_name(filename):
+    return os.path.splitext(filename)[0].replace("_", " ")
+
+
+def _delete_row(connection, filename):
+    row = connection.execute(
+        "SELECT id FROM completions WHERE filename = ?", (filename,)
+    ).fetchone()
+    if row:
+        connection.execute("DELETE FROM completions_fts WHERE rowid = ?", row)
+        connection.execute("DELETE FROM completions WHERE id = ?", row)
+
+
+def _insert_row(connection, filename, data, stat):
+    _delete_row(connection, filename)
+    cursor = connection.execute(
+        "INSERT INTO completions (filename, mtime_ns, size, timestamp, model) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            filename,
+            stat.st_mtime_ns,
+            stat.st_size,
+            data.get("timestamp", ""),
+            data.get("model", ""),
+        ),
+    )
+    connection.execute(
+        "INSERT INTO completions_fts "
+        "(rowid, name, completion, system_message, data_files) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            cursor.lastrowid,
+            _display_name(filename),
+            data.get("completion") or "",
+            data.get("system_message") or "",
+            _data_file_names(data),
+        ),
+    )
+
+
+def index_completion(filename, data, stat=None):
+    """Add or replace one completion in the index."""
+    if stat is None:
+        stat = os.stat(os.path.join(COMPLETIONS_DIR, filename))
+    with _lock, _connection() as connection:
+        _insert_row(connection, filename, data, stat)
+
+
+def remove_completion(filename):
+    """Remove one completion from the index."""
+    with _lock, _connection() as connection:
+        _delete_row(connection, filename)
+
+
+def update_completion_path(file_path):
+    """Re-index a completion after its file was added, changed or removed."""
+    filename = os.path.basename(file_path)
+    try:
+        stat = os.stat(file_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        remove_completion(filename)
+        return
+    except json.JSONDecodeError as e:
+        print(f"Error indexing completion {file_path}: {str(e)}")
+        return
+    index_completion(filename, data, stat)
+
+
+def sync_index():
+    """Reconcile the index with the completions directory by mtime and size."""
+    os.makedirs(COMPLETIONS_DIR, exist_ok=True)
+    with _lock:
+        _sync(_connection())
+
+
+def _sync(connection):
+    indexed = {
+        filename: (mtime_ns, size)
+        for filename, mtime_ns, size in connection.execute(
+            "SELECT filename, mtime_ns, size FROM completions"
+        )
+    }
+    seen = set()
+    # One transaction for the whole pass, so a cold start indexes in bulk
+    with connection, os.scandir(COMPLETIONS_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            seen.add(entry.name)
+            stat = entry.stat()
+            if indexed.get(entry.name) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    _insert_row(connection, entry.name, json.load(f), stat)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Error indexing completion {entry.path}: {str(e)}")
+        for filename in set(indexed) - seen:
+            _delete_row(connection, filename)
+
+
+def _to_fts_query(query):
+    """Turn free text into an FTS5 query that matches all terms.
+
+    Quoted phrases are kept together and a trailing * does a prefix search; any
+    other FTS5 syntax is treated as plain text.
+    """
+    terms = []
+    for term in re.findall(r'"[^"]+"|\S+', query):
+        prefix = term.endswith("*") and not term.startswith('"')
+        term = term.strip('"').rstrip("*")
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def count_matches(query):
+    """Return the number of completions matching a search."""
+    fts_query = _to_fts_query(query)
+    if not fts_query:
+        return 0
+    with _lock:
+        (total,) = (
+            _connection()
+            .execute(
+                "SELECT count(*) FROM completions_fts WHERE completions_fts MATCH ?",
+                (fts_query,),
+            )
+            .fetchone()
+        )
+    return total
+
+
+def search_completions(query, limit=20, offset=0):
+    """Return one page of completions matching a search, best matches first.
+
+    Each result has the completion's filename, timestamp, model, bm25 rank and a
+    snippet of the matching completion text with the terms in bold.
+    """
+    fts_query = _to_fts_query(query)
+    if not fts_query:
+        return []
+    sql = f"""
+        SELECT c.filename, c.timestamp, c.model,
+               bm25(completions_fts, {', '.join(map(str, COLUMN_WEIGHTS))}) AS rank,
+               snippet(completions_fts, 1, '**', '**', '…', 16)
+        FROM completions_fts JOIN completions c ON c.id = completions_fts.rowid
+        WHERE completions_fts MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+        """
+    with _lock:
+        rows = _connection().execute(sql, (fts_query, limit, offset)).fetchall()
+    return [
+        {
+            "filename": filename,
+            "timestamp": timestamp,
+            "model": model,
+            "rank": rank,
+            "snippet": snippet,
+        }
+        for filename, timestamp, model, rank, snippet in rows
+    ]
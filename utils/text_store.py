@@ -0,0 +1,105 @@
+"""Shared, bounded store for large texts referenced by content-hash handles.
+
+Streamlit keeps every session's state in server memory, so storing prompts that
+contain whole documents in st.session_state makes memory grow with document size
+times sessions. Sessions store a handle (the SHA-256 of the text) instead, and the
+text is held once in this process-wide store however many sessions refer to it.
+
+The store keeps at most TEXT_STORE_MAX_MB (default 64) of text in memory. The least
+recently used texts are spilled to the disk cache and loaded back on demand.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from utils.cache import cache_get, cache_put
+
+_texts = OrderedDict()
+# Evicted texts still being written to disk, so readers never miss them
+_spilling = {}
+_lock = threading.Lock()
+_stats = {"bytes": 0, "spilled": 0}
+
+
+def get_max_bytes():
+    """Return the in-memory size limit of the store from TEXT_STORE_MAX_MB."""
+    return int(float(os.getenv("TEXT_STORE_MAX_MB", "64")) * 1024 * 1024)
+
+
+def _add(handle, text):
+    """Add a text under the lock and return the texts evicted to make room."""
+    _texts[handle] = text
+    _stats["bytes"] += sys.getsizeof(text)
+    evicted = []
+    max_bytes = get_max_bytes()
+    while _stats["bytes"] > max_bytes and len(_texts) > 1:
+        old_handle, old_text = _texts.popitem(last=False)
+        _stats["bytes"] -= sys.getsizeof(old_text)
+        evicted.append((old_handle, old_text))
+        _spilling[old_handle] = old_text
+    return evicted
+
+
+def _spill(evicted):
+    for handle, text in evicted:
+        cache_put("texts", handle, {"text": text})
+        with _lock:
+            if _spilling.get(handle) is text:
+                del _spilling[handle]
+            _stats["spilled"] += 1
+
+
+def put_text(text):
+    """Store a text and return its handle."""
+    handle = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _lock:
+        if handle in _texts:
+            _texts.move_to_end(handle)
+            return handle
+        evicted = _add(handle, text)
+    _spill(evicted)
+    return handle
+
+
+def get_text(handle):
+    """Return the text for a handle, or None if it is no longer available.
+
+    Texts spilled to disk are only lost if the disk cache is disabled or cleared.
+    """
+    with _lock:
+        if handle in _texts:
+            _texts.move_to_end(handle)
+            return _texts[handle]
+        if handle in _spilling:
+            return _spilling[handle]
+    cached = cache_get("texts", handle)
+    if cached is None:
+        return None
+    with _lock:
+        evicted = [] if handle in _texts else _add(handle, cached["text"])
+    _spill(evicted)
+    return cached["text"]
+
+
+def get_text_store_stats():
+    """Return the number of texts and bytes in memory, the limit and spill count."""
+    with _lock:
+        return {
+            "texts": len(_texts),
+            "bytes": _stats["bytes"],
+            "max_bytes": get_max_bytes(),
+            "spilled": _stats["spilled"],
+        }
+
+
+def estimate_size(value):
+    """Estimate the memory used by a value and the containers and strings in it."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in value)
+    return size
@@ -0,0 +1,47 @@
+"""Token counting for prompts and documents.
+
+Uses ``tiktoken`` when it is installed and falls back to an estimate of four
+characters per token otherwise. The encoding is set with ``TOKENIZER_ENCODING``
+(default ``o200k_base``, used by the GPT-4o and o-series models).
+"""
+
+# pylint: disable=import-outside-toplevel
+
+import math
+import os
+import threading
+
+# Characters per token assumed when tiktoken is not available
+CHARS_PER_TOKEN = 4
+
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _get_encoding(name):
+    with _encodings_lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Not installed, or the encoding could not be downloaded
+                print(f"Token counts are estimated ({str(e)}).")
+                _encodings[name] = None
+        return _encodings[name]
+
+
+def get_tokenizer_name():
+    """Return the encoding used to count tokens, or "estimate" without tiktoken."""
+    name = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+    return name if _get_encoding(name) is not None else "estimate"
+
+
+def count_tokens(text):
+    """Return the number of tokens in text."""
+    encoding = _get_encoding(os.getenv("TOKENIZER_ENCODING", "o200k_base"))
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,453 @@
+"""Record/replay HTTP transports for Azure OpenAI and Document Intelligence.
+
+The transport is selected with the ``TRANSPORT_MODE`` environment variable:
+
+- ``live`` (default): talk to Azure as usual.
+- ``record``: talk to Azure and save every request/response pair to a cassette.
+- ``replay``: answer every request from the cassettes without any network access.
+
+Cassettes are JSON Lines files in ``CASSETTE_DIR`` (default ``cassettes``), one per
+request hash with one line per recorded response. A response identical to the one
+before it is not recorded again, and at most ``CASSETTE_MAX_RESPONSES`` (default 100)
+responses are recorded per request. Responses keep their original
+chunking and timings, so replay can
+run as fast as possible (``REPLAY_SPEED=fast``, the default) or at the recorded
+speed (``REPLAY_SPEED=recorded``).
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.constants import CASSETTES_DIR
+
+TRANSPORT_MODES = ("live", "record", "replay")
+
+# Query parameters and headers that must never be written to disk
+SECRET_QUERY_PARAMS = {"api-key", "code", "sig", "subscription-key"}
+SECRET_HEADERS = {
+    "api-key",
+    "authorization",
+    "ocp-apim-subscription-key",
+    "set-cookie",
+}
+
+
+def get_transport_mode():
+    """Return the configured transport mode."""
+    mode = os.getenv("TRANSPORT_MODE", "live").lower()
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(
+            f"Invalid TRANSPORT_MODE '{mode}'. Expected one of {TRANSPORT_MODES}"
+        )
+    return mode
+
+
+def _body_digest(body):
+    """Hash a request body, canonicalising JSON so key order does not matter."""
+    if hasattr(body, "read"):
+        # Streamed uploads are hashed in blocks and rewound for sending
+        position = body.tell()
+        digest = hashlib.sha256()
+        for block in iter(lambda: body.read(1024 * 1024), b""):
+            digest.update(block)
+        body.seek(position)
+        return digest.hexdigest()
+    if body is None:
+        body = b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True).encode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return hashlib.sha256(body).hexdigest()
+
+
+def request_key(method, url, body):
+    """Hash a request into a cassette key.
+
+    The scheme and host are left out so cassettes recorded against one endpoint
+    replay against another, and secrets in the query string are ignored.
+    """
+    parts = urlsplit(str(url))
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in SECRET_QUERY_PARAMS
+    )
+    canonical = (
+        f"{method.upper()} {parts.path}?{urlencode(query)}\n{_body_digest(body)}"
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _public_headers(headers):
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in SECRET_HEADERS
+    }
+
+
+class CassetteStore:
+    """Thread-safe store of recorded responses, one JSON Lines file per request key.
+
+    Identical requests (e.g. polling an analyze operation) are recorded as a
+    sequence and replayed in order; the last response repeats once exhausted.
+    Recording appends one line per response, so it never rewrites a cassette.
+    """
+
+    def __init__(self, directory, max_responses=100):
+        self.directory = directory
+        self.max_responses = max_responses
+        self._responses = {}
+        self._recorded = {}
+        self._replay_positions = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def _read(self, key):
+        responses = []
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        responses.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A partially written last line from an interrupted run
+                        continue
+        except FileNotFoundError:
+            pass
+        return responses
+
+    def record(self, key, method, url, status, headers, chunks):
+        """Append a response to the cassette for key.
+
+        chunks is a list of (delay_seconds, bytes) pairs, where the delay is the
+        time since the previous chunk (or since the request was sent).
+        """
+        response = {
+            "method": method,
+            "url": _strip_secrets(url),
+            "status": status,
+            "headers": _public_headers(headers),
+            "chunks": [
+                {"delay": round(delay, 6), "data": base64.b64encode(data).decode()}
+                for delay, data in chunks
+            ],
+        }
+        with self._lock:
+            if key not in self._recorded:
+                recorded = self._read(key)
+                self._recorded[key] = (
+                    len(recorded),
+                    _response_content(recorded[-1]) if recorded else None,
+                )
+            count, last_content = self._recorded[key]
+            content = _response_content(response)
+            # Repeated polls of a running operation are recorded once; replay
+            # moves on to the next response all the same
+            if count >= self.max_responses or content == last_content:
+                return
+            self._recorded[key] = (count + 1, content)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(key), "a", encoding="utf-8") as f:
+                f.write(json.dumps(response) + "\n")
+
+    def next_response(self, key):
+        """Return the next recorded response for key, or None if never recorded."""
+        with self._lock:
+            if key not in self._responses:
+                self._responses[key] = self._read(key)
+            responses = self._responses[key]
+            if not responses:
+                return None
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = position + 1
+            response = responses[min(position, len(responses) - 1)]
+        return {
+            "status": response["status"],
+            "headers": response["headers"],
+            "chunks": [
+                (chunk["delay"], base64.b64decode(chunk["data"]))
+                for chunk in response["chunks"]
+            ],
+        }
+
+
+def _response_content(response):
+    return response["status"], [chunk["data"] for chunk in response["chunks"]]
+
+
+def _strip_secrets(url):
+    parts = urlsplit(str(url))
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in SECRET_QUERY_PARAMS
+    ]
+    return parts._replace(query=urlencode(query)).geturl()
+
+
+def _missing_cassette_body(method, url):
+    return json.dumps(
+        {
+            "error": {
+                "code": "CassetteNotFound",
+                "message": f"No recorded response for {method} {_strip_secrets(url)}",
+            }
+        }
+    ).encode("utf-8")
+
+
+def _replay_delays(chunks, realtime):
+    """Yield chunk data, sleeping for the recorded delays when realtime is set."""
+    for delay, data in chunks:
+        if realtime and delay > 0:
+            time.sleep(delay)
+        yield data
+
+
+class _ReplayByteStream(httpx.SyncByteStream):
+    def __init__(self, chunks, realtime):
+        self._chunks = chunks
+        self._realtime = realtime
+
+    def __iter__(self):
+        yield from _replay_delays(self._chunks, self._realtime)
+
+
+class _RecordingByteStream(httpx.SyncByteStream):
+    """Pass a live response body through while capturing its chunks and timings."""
+
+    def __init__(self, response, sent_at, on_complete):
+        self._response = response
+        self._last_chunk_at = sent_at
+        self._on_complete = on_complete
+        self._chunks = []
+        self._complete = False
+
+    def __iter__(self):
+        for data in self._response.stream:
+            now = time.perf_counter()
+            self._chunks.append((now - self._last_chunk_at, data))
+            self._last_chunk_at = now
+            yield data
+        self._complete = True
+
+    def _reached_end(self):
+        if self._complete:
+            return True
+        # The OpenAI client closes an event stream once it reads the [DONE] event
+        tail = b"".join(data for _, data in self._chunks[-2:]).rstrip()
+        return tail.endswith(b"data: [DONE]")
+
+    def close(self):
+        self._response.close()
+        # A stream closed before its end would replay as a truncated response
+        if self._reached_end():
+            self._on_complete(self._chunks)
+
+
+class RecordReplayHTTPXTransport(httpx.BaseTransport):
+    """httpx transport used by the Azure OpenAI client."""
+
+    def __init__(self, store, mode, realtime=False):
+        self._store = store
+        self._mode = mode
+        self._realtime = realtime
+        self._live = httpx.HTTPTransport() if mode == "record" else None
+
+    def handle_request(self, request):
+        body = request.read()
+        key = request_key(request.method, request.url, body)
+
+        if self._mode == "replay":
+            recorded = self._store.next_response(key)
+            if recorded is None:
+                return httpx.Response(
+                    404,
+                    headers={"content-type": "application/json"},
+                    content=_missing_cassette_body(request.method, request.url),
+                    request=request,
+                )
+            return httpx.Response(
+                recorded["status"],
+                headers=recorded["headers"],
+                stream=_ReplayByteStream(recorded["chunks"], self._realtime),
+                request=request,
+            )
+
+        sent_at = time.perf_counter()
+        response = self._live.handle_request(request)
+
+        def save(chunks):
+            self._store.record(
+                key,
+                request.method,
+                request.url,
+                response.status_code,
+                dict(response.headers),
+                chunks,
+            )
+
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_RecordingByteStream(response, sent_at, save),
+            extensions=response.extensions,
+            request=request,
+        )
+
+    def close(self):
+        if self._live:
+            self._live.close()
+
+
+class _ReplayRaw(io.BytesIO):
+    """Minimal stand-in for urllib3's response so requests can read the body."""
+
+    def stream(self, amt=65536, decode_content=None):  # pylint: disable=unused-argument
+        """Yield the body in chunks of at most amt bytes."""
+        while True:
+            data = self.read(amt)
+            if not data:
+                break
+            yield data
+
+
+class RecordReplayAdapter(requests.adapters.HTTPAdapter):
+    """requests adapter used by the Document Intelligence client."""
+
+    def __init__(self, store, mode, realtime=False):
+        super().__init__()
+        self._store = store
+        self._mode = mode
+        self._realtime = realtime
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):  # pylint: disable=too-many-arguments
+        key = request_key(request.method, request.url, request.body)
+
+        if self._mode == "replay":
+            recorded = self._store.next_response(key)
+            if recorded is None:
+                return self._build(
+                    request,
+                    404,
+                    {"Content-Type": "application/json"},
+                    _missing_cassette_body(request.method, request.url),
+                )
+            body = b"".join(_replay_delays(recorded["chunks"], self._realtime))
+            return self._build(request, recorded["status"], recorded["headers"], body)
+
+        sent_at = time.perf_counter()
+        response = super().send(
+            request,
+            stream=True,
+            timeout=timeout,
+            verify=verify,
+            cert=cert,
+            proxies=proxies,
+        )
+        chunks = []
+        last_chunk_at = sent_at
+        for data in response.raw.stream(65536, decode_content=True):
+            now = time.perf_counter()
+            chunks.append((now - last_chunk_at, data))
+            last_chunk_at = now
+        response.close()
+        if not chunks:
+            chunks.append((last_chunk_at - sent_at, b""))
+
+        # The body is stored decoded, so drop headers describing the wire encoding
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in ("content-encoding", "content-length")
+        }
+        self._store.record(
+            key, request.method, request.url, response.status_code, headers, chunks
+        )
+        return self._build(
+            request,
+            response.status_code,
+            headers,
+            b"".join(data for _, data in chunks),
+        )
+
+    def _build(self, request, status, headers, body):
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.headers["Content-Length"] = str(len(body))
+        response.raw = _ReplayRaw(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = "Replayed" if self._mode == "replay" else "Recorded"
+        return response
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_cassette_store():
+    """Return the process-wide cassette store."""
+    global _store  # pylint: disable=global-statement
+    with _store_lock:
+        if _store is None:
+            _store = CassetteStore(
+                os.getenv("CASSETTE_DIR", CASSETTES_DIR),
+                max_responses=int(os.getenv("CASSETTE_MAX_RESPONSES", "100")),
+            )
+        return _store
+
+
+def _replay_realtime():
+    return os.getenv("REPLAY_SPEED", "fast").lower() == "recorded"
+
+
+def get_openai_http_client():
+    """Return an httpx client for AzureOpenAI, or None to use the default one."""
+    mode = get_transport_mode()
+    if mode == "live":
+        return None
+    return httpx.Client(
+        transport=RecordReplayHTTPXTransport(
+            get_cassette_store(), mode, realtime=_replay_realtime()
+        ),
+        timeout=httpx.Timeout(600.0, connect=5.0),
+    )
+
+
+def get_document_intelligence_transport():
+    """Return an azure-core transport for DocumentIntelligenceClient, or None."""
+    mode = get_transport_mode()
+    if mode == "live":
+        return None
+    # pylint: disable=import-outside-toplevel
+    from azure.core.pipeline.transport import RequestsTransport
+
+    session = requests.Session()
+    adapter = RecordReplayAdapter(
+        get_cassette_store(), mode, realtime=_replay_realtime()
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return RequestsTransport(session=session, session_owner=True)